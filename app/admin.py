@@ -3,28 +3,36 @@ import json
 from datetime import datetime
 
 # Core Django imports
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import GroupAdmin, UserAdmin
 from django.contrib.auth.models import Group, User
+from django.core.exceptions import PermissionDenied
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.forms import ModelForm
 from django.http import JsonResponse
+from django.template.response import TemplateResponse
 from django.urls import path
 from django.utils.translation import gettext_lazy as _
 
 # Local app imports
+from app.attendance import rebuild_attendance_summaries
 from app.firebase import FCMDevice
 from app.forms import ParentAdminForm, StaffAdminForm, StudentAdminForm
+from app.metrics import profile_summary
 from app.models import (
     Attendance,
     AttendanceRecord,
+    AttendanceSummary,
     Batch,
     Course,
     CourseTracking,
     Institute,
     InstituteFeedback,
     Notice,
+    NotificationDelivery,
+    NotificationEvent,
     Parent,
     ParentFeedback,
     ParentInstituteFeedback,
@@ -158,6 +166,11 @@ class CustomAdminSite(admin.AdminSite):
                 "group_label": "attendance",
                 "display_name": "Records",
             },
+            "AttendanceSummary": {
+                "group": "Attendance",
+                "group_label": "attendance",
+                "display_name": "Summaries",
+            },
             # Feedback Models
             "StudentFeedback": {
                 "group": "Feedback",
@@ -190,6 +203,16 @@ class CustomAdminSite(admin.AdminSite):
                 "group_label": "device_management",
                 "display_name": "Devices",
             },
+            "NotificationEvent": {
+                "group": "Device Management",
+                "group_label": "device_management",
+                "display_name": "Notifications",
+            },
+            "NotificationDelivery": {
+                "group": "Device Management",
+                "group_label": "device_management",
+                "display_name": "Deliveries",
+            },
         }
 
         # If app_label is specified, return only that app
@@ -238,6 +261,31 @@ class CustomAdminSite(admin.AdminSite):
 
         return grouped_app_list
 
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                "query-profile/",
+                self.admin_view(self.query_profile),
+                name="query-profile",
+            ),
+        ]
+        return custom_urls + urls
+
+    def query_profile(self, request):
+        """Per-view query percentiles recorded by QueryProfilerMiddleware"""
+        if not request.user.is_superuser:
+            raise PermissionDenied
+
+        context = {
+            **self.each_context(request),
+            "title": "Query Profile",
+            "profiles": profile_summary(),
+            "enabled": settings.QUERY_PROFILER_ENABLED,
+            "budget": settings.QUERY_BUDGET,
+        }
+        return TemplateResponse(request, "admin/query_profile.html", context)
+
 
 # Create a custom admin site instance
 custom_admin_site = CustomAdminSite(name="custom_admin")
@@ -374,10 +422,10 @@ class SubjectModel(admin.ModelAdmin):
 @admin.register(Student, site=custom_admin_site)
 class StudentAdmin(admin.ModelAdmin):
     form = StudentAdminForm
-    list_display = ("id", "name", "phone", "course", "status", "fcm_token")
-    search_fields = ("name", "phone", "course__name", "fcm_token")
+    list_display = ("id", "name", "phone", "course", "status")
+    search_fields = ("name", "phone", "course__name")
     list_filter = ("course", "status", "gender", "joining_date")
-    advanced_filter_fields = ("name", "phone", "course", "batch", "status", "fcm_token")
+    advanced_filter_fields = ("name", "phone", "course", "batch", "status")
 
     def has_view_permission(self, request, obj=None):
         """Check if user has view permission"""
@@ -408,10 +456,10 @@ class StudentAdmin(admin.ModelAdmin):
 @admin.register(Staff, site=custom_admin_site)
 class StaffAdmin(admin.ModelAdmin):
     form = StaffAdminForm
-    list_display = ("id", "name", "phone", "designation", "joining_date", "fcm_token")
-    search_fields = ("name", "phone", "designation", "fcm_token")
+    list_display = ("id", "name", "phone", "designation", "joining_date")
+    search_fields = ("name", "phone", "designation")
     list_filter = ("designation", "joining_date", "gender")
-    advanced_filter_fields = ("name", "phone", "designation", "fcm_token")
+    advanced_filter_fields = ("name", "phone", "designation")
     readonly_fields = ("password",)
     ordering = ("name",)
 
@@ -502,6 +550,39 @@ class AttendanceAdmin(admin.ModelAdmin):
         formset.save_m2m()
 
 
+@admin.register(AttendanceSummary, site=custom_admin_site)
+class AttendanceSummaryAdmin(admin.ModelAdmin):
+    list_display = (
+        "student",
+        "subject",
+        "period_or_year",
+        "present_count",
+        "total_count",
+        "last_date",
+        "current_streak",
+        "longest_streak",
+    )
+    list_filter = ("period_or_year", "subject__course")
+    search_fields = ("student__name", "subject__name")
+    list_select_related = ("student", "subject")
+    raw_id_fields = ("student", "subject")
+    list_per_page = 25
+    actions = ["rebuild_summaries"]
+
+    @admin.action(
+        description="Rebuild summaries of the selected students from their records",
+        permissions=["change"],
+    )
+    def rebuild_summaries(self, request, queryset):
+        student_ids = set(queryset.values_list("student_id", flat=True))
+        rebuilt = rebuild_attendance_summaries(student_ids)
+        self.message_user(request, f"Rebuilt {rebuilt} attendance summaries.")
+
+    def has_add_permission(self, request):
+        # Summaries are derived from attendance records
+        return False
+
+
 @admin.register(Notice, site=custom_admin_site)
 class NoticeAdmin(admin.ModelAdmin):
     list_display = ("title", "message", "created_at")
@@ -758,6 +839,15 @@ class CourseTrackingAdmin(admin.ModelAdmin):
     ordering = ("-created_at",)
     raw_id_fields = ("student", "course")
     list_per_page = 25
+    actions = ["recompute_completion"]
+
+    @admin.action(
+        description="Recompute completion for selected trackings",
+        permissions=["change"],
+    )
+    def recompute_completion(self, request, queryset):
+        updated = CourseTracking.objects.recompute_completion(queryset)
+        self.message_user(request, f"Updated completion for {updated} course trackings.")
 
     def has_view_permission(self, request, obj=None):
         return request.user.has_perm("app.view_coursetracking")
@@ -888,24 +978,87 @@ class FCMDeviceAdmin(admin.ModelAdmin):
     list_display = (
         "id",
         "token",
-        "user_type",
+        "role",
+        "owner_model",
+        "owner_id",
+        "course",
         "is_active",
         "created_at",
         "last_active",
     )
     search_fields = ("token",)
-    list_filter = ("user_type", "is_active", "created_at", "last_active")
+    list_filter = ("role", "course", "is_active", "created_at", "last_active")
     readonly_fields = ("created_at", "last_active")
     ordering = ("-last_active",)
 
     fieldsets = (
-        (None, {"fields": ("token", "user_type", "is_active", "is_fallback")}),
+        (None, {"fields": ("token", "role", "is_active", "is_fallback")}),
+        ("Owner", {"fields": ("owner_model", "owner_id", "course")}),
         (
             "Metadata",
             {"fields": ("created_at", "last_active"), "classes": ("collapse",)},
         ),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("course")
+
+
+@admin.register(NotificationEvent, site=custom_admin_site)
+class NotificationEventAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "title",
+        "course",
+        "status",
+        "pending_count",
+        "sent_count",
+        "failed_count",
+        "created_at",
+        "dispatched_at",
+    )
+    search_fields = ("key", "title")
+    list_filter = ("status", "course", "created_at")
+    readonly_fields = ("key", "created_at", "dispatched_at")
+    ordering = ("-created_at",)
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("course")
+            .annotate(
+                pending_total=Count("deliveries", filter=Q(deliveries__status="pending")),
+                sent_total=Count("deliveries", filter=Q(deliveries__status="sent")),
+                failed_total=Count("deliveries", filter=Q(deliveries__status="failed")),
+            )
+        )
+
+    def pending_count(self, obj):
+        return obj.pending_total
+
+    pending_count.short_description = "Pending"
+
+    def sent_count(self, obj):
+        return obj.sent_total
+
+    sent_count.short_description = "Sent"
+
+    def failed_count(self, obj):
+        return obj.failed_total
+
+    failed_count.short_description = "Failed"
+
+
+@admin.register(NotificationDelivery, site=custom_admin_site)
+class NotificationDeliveryAdmin(admin.ModelAdmin):
+    list_display = ("id", "event", "token", "status", "attempts", "next_attempt_at", "sent_at")
+    search_fields = ("token", "event__key")
+    list_filter = ("status", "next_attempt_at")
+    readonly_fields = ("event", "token", "sent_at")
+    ordering = ("-id",)
+    list_select_related = ("event",)
+
 
 @admin.register(SubjectFile, site=custom_admin_site)
 class SubjectFileAdmin(admin.ModelAdmin):
@@ -918,10 +1071,10 @@ class SubjectFileAdmin(admin.ModelAdmin):
 @admin.register(Parent, site=custom_admin_site)
 class ParentAdmin(admin.ModelAdmin):
     form = ParentAdminForm
-    list_display = ("id", "name", "phone", "email", "fcm_token")
-    search_fields = ("name", "phone", "email", "fcm_token")
+    list_display = ("id", "name", "phone", "email")
+    search_fields = ("name", "phone", "email")
     list_filter = ("students",)
-    advanced_filter_fields = ("name", "phone", "email", "students", "fcm_token")
+    advanced_filter_fields = ("name", "phone", "email", "students")
 
     def has_view_permission(self, request, obj=None):
         """Check if user has view permission"""
@@ -23,6 +23,7 @@ from app.models import (
     Notice,
     FEEDBACK_TYPE_CHOICES,
 )
+from app.conditional import versioned_response
 
 
 @login_required
@@ -419,6 +420,7 @@ def add_course_tracking(request):
 
 
 @login_required
+@versioned_response("courses")
 def get_courses(request):
     """View to get courses for dropdowns"""
     try:
@@ -434,6 +436,7 @@ def get_courses(request):
 
 
 @login_required
+@versioned_response("batches")
 def get_batches(request):
     """View to get batches for dropdowns"""
     try:
@@ -456,6 +459,7 @@ def get_batches(request):
 
 
 @login_required
+@versioned_response("students")
 def get_students(request):
     """View to get students for dropdowns"""
     try:
@@ -0,0 +1,156 @@
+# Third-party app imports
+from rest_framework import serializers, viewsets
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import SAFE_METHODS, DjangoModelPermissions
+from rest_framework.routers import DefaultRouter
+
+# Local app imports
+from app.models import Attendance, CourseTracking, Notice, Routine, Staff, Student
+from app.serializers import (
+    AttendanceSerializer,
+    CourseTrackingSerializer,
+    NoticeSerializer,
+    RoutineSerializer,
+    StaffSerializer,
+    StudentSerializer,
+)
+
+# Page sizes of the cursor paginated list endpoints
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+
+# --------------------------------------------------------------------
+# Query Planning
+# --------------------------------------------------------------------
+
+
+def related_lookups(serializer, prefix="", many=False):
+    """
+    Derive the related lookups a serializer will read
+
+    Nested serializers reached through foreign keys are joined with
+    ``select_related``, anything below a to-many relation is prefetched.
+    Method fields contribute the lookups listed in their serializer's
+    ``Meta.method_field_lookups``. Only fields left after ``?fields=``
+    pruning are walked, so unrequested relations are never loaded.
+
+    Args:
+        serializer: Serializer instance describing the response
+        prefix: Lookup path of ``serializer`` from the queryset's model
+        many: Whether ``prefix`` crosses a to-many relation
+
+    Returns:
+        tuple: ``select_related`` and ``prefetch_related`` lookup lists
+    """
+    select, prefetch = [], []
+    method_lookups = getattr(getattr(serializer, "Meta", None), "method_field_lookups", {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            prefetch += [prefix + lookup for lookup in method_lookups.get(name, [])]
+            continue
+
+        nested = getattr(field, "child", field)
+        if not isinstance(nested, serializers.BaseSerializer) or field.source == "*" or "." in field.source:
+            continue
+        lookup = prefix + field.source
+        to_many = many or isinstance(field, serializers.ListSerializer)
+        (prefetch if to_many else select).append(lookup)
+
+        nested_select, nested_prefetch = related_lookups(nested, lookup + "__", to_many)
+        select += nested_select
+        prefetch += nested_prefetch
+    return select, prefetch
+
+
+# --------------------------------------------------------------------
+# Base Classes
+# --------------------------------------------------------------------
+
+
+class APICursorPagination(CursorPagination):
+    """Cursor pagination on the primary key, stable while rows are added"""
+
+    page_size = API_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = API_MAX_PAGE_SIZE
+    ordering = "-id"
+
+
+class ModelViewPermissions(DjangoModelPermissions):
+    """Model permissions that also require the view permission for reads"""
+
+    perms_map = {
+        **DjangoModelPermissions.perms_map,
+        "GET": ["%(app_label)s.view_%(model_name)s"],
+        "HEAD": ["%(app_label)s.view_%(model_name)s"],
+    }
+
+
+class ModelAPIViewSet(viewsets.ModelViewSet):
+    """
+    Read/write viewset with sparse fieldsets and derived query planning
+
+    Reads accept ``?fields=id,name,course.name`` to return only those
+    fields. The queryset joins and prefetches exactly the relations the
+    remaining fields read.
+    """
+
+    pagination_class = APICursorPagination
+    permission_classes = [ModelViewPermissions]
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.request.query_params.get("fields")
+        if fields and self.request.method in SAFE_METHODS:
+            kwargs.setdefault("fields", fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        select, prefetch = related_lookups(self.get_serializer())
+        return super().get_queryset().select_related(*select).prefetch_related(*prefetch)
+
+
+# --------------------------------------------------------------------
+# Version 1
+# --------------------------------------------------------------------
+
+
+class StudentViewSet(ModelAPIViewSet):
+    queryset = Student.objects.all()
+    serializer_class = StudentSerializer
+
+
+class StaffViewSet(ModelAPIViewSet):
+    queryset = Staff.objects.all()
+    serializer_class = StaffSerializer
+
+
+class RoutineViewSet(ModelAPIViewSet):
+    queryset = Routine.objects.all()
+    serializer_class = RoutineSerializer
+
+
+class AttendanceViewSet(ModelAPIViewSet):
+    queryset = Attendance.objects.all()
+    serializer_class = AttendanceSerializer
+
+
+class NoticeViewSet(ModelAPIViewSet):
+    queryset = Notice.objects.all()
+    serializer_class = NoticeSerializer
+
+
+class CourseTrackingViewSet(ModelAPIViewSet):
+    queryset = CourseTracking.objects.all()
+    serializer_class = CourseTrackingSerializer
+
+
+router = DefaultRouter()
+router.register("students", StudentViewSet)
+router.register("staff", StaffViewSet)
+router.register("routines", RoutineViewSet)
+router.register("attendance", AttendanceViewSet)
+router.register("notices", NoticeViewSet)
+router.register("course-tracking", CourseTrackingViewSet)
@@ -0,0 +1,372 @@
+# Core Django imports
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+# Local app imports
+from app.models import (
+    Attendance,
+    AttendanceRecord,
+    AttendanceStreak,
+    AttendanceSummary,
+    Student,
+)
+
+# Summary and streak fields written by incremental updates
+SUMMARY_FIELDS = [
+    "present_count", "total_count", "last_date", "current_streak", "longest_streak", "updated_at",
+]
+STREAK_FIELDS = ["current_streak", "longest_streak", "last_date", "last_present_date", "updated_at"]
+
+
+# --------------------------------------------------------------------
+# Form Helpers
+# --------------------------------------------------------------------
+
+
+def parse_attendance_marks(data):
+    """
+    Extract student attendance marks from submitted form data
+
+    Args:
+        data: QueryDict or mapping with ``student_<id>`` keys
+
+    Returns:
+        dict: Mapping of student id to attended flag
+    """
+    marks = {}
+    for key, value in data.items():
+        if not key.startswith("student_"):
+            continue
+        try:
+            student_id = int(key.replace("student_", ""))
+        except ValueError:
+            continue
+        marks[student_id] = value == "on"
+    return marks
+
+
+# --------------------------------------------------------------------
+# Bulk Attendance Writer
+# --------------------------------------------------------------------
+
+
+def save_attendance_records(attendance, routine, marks):
+    """
+    Write attendance records for a session in a constant number of queries
+
+    Submitted ids are checked against the routine's course roster with a
+    single query and every record is upserted with one ``bulk_create``
+    keyed on ``(attendance, student)``. Attendance summaries and streaks
+    are updated in the same transaction.
+
+    Args:
+        attendance: Attendance session the records belong to
+        routine: Routine the session was taken for
+        marks: Mapping of student id to attended flag
+
+    Returns:
+        int: Number of records written
+    """
+    if not marks:
+        return 0
+
+    roster_ids = set(
+        Student.objects.filter(
+            id__in=marks.keys(), course_id=routine.course_id, status="Active"
+        ).values_list("id", flat=True)
+    )
+
+    # Previous marks decide whether a record is a new session or an edit
+    previous = dict(
+        AttendanceRecord.objects.filter(
+            attendance=attendance, student_id__in=roster_ids
+        ).values_list("student_id", "student_attend")
+    )
+
+    records = [
+        AttendanceRecord(
+            attendance=attendance,
+            student_id=student_id,
+            student_attend=attended,
+        )
+        for student_id, attended in marks.items()
+        if student_id in roster_ids
+    ]
+
+    with transaction.atomic():
+        AttendanceRecord.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=["attendance", "student"],
+            update_fields=["student_attend"],
+        )
+        new_marks = {
+            record.student_id: record.student_attend
+            for record in records
+            if record.student_id not in previous
+        }
+        changed_ids = [
+            record.student_id
+            for record in records
+            if record.student_id in previous and previous[record.student_id] != record.student_attend
+        ]
+        update_attendance_summaries(attendance, routine, new_marks, changed_ids)
+        update_attendance_streaks(attendance.date, new_marks, changed_ids)
+
+    return len(records)
+
+
+def record_attendance(routine, teacher, attendance_date, class_status, teacher_attend, marks):
+    """
+    Create or update an attendance session and all of its student records
+
+    Everything is written inside one transaction so a failed submission
+    never leaves a half-marked class behind.
+
+    Returns:
+        tuple: (attendance, number of records written)
+    """
+    with transaction.atomic():
+        attendance, created = Attendance.objects.get_or_create(
+            routine=routine,
+            date=attendance_date,
+            defaults={
+                "teacher": teacher,
+                "class_status": class_status,
+                "teacher_attend": teacher_attend,
+            },
+        )
+
+        if not created and (
+            attendance.class_status != class_status
+            or attendance.teacher_attend != teacher_attend
+        ):
+            attendance.class_status = class_status
+            attendance.teacher_attend = teacher_attend
+            attendance.save(update_fields=["class_status", "teacher_attend"])
+
+        written = save_attendance_records(attendance, routine, marks)
+
+    return attendance, written
+
+
+# --------------------------------------------------------------------
+# Attendance Summaries
+# --------------------------------------------------------------------
+
+
+def update_attendance_summaries(attendance, routine, new_marks, changed_ids):
+    """
+    Apply a saved session to the attendance summaries of its students
+
+    New sessions dated on or after a summary's last date are added in
+    place. Edited marks and sessions older than the summary are handled by
+    rebuilding the affected students from their records.
+
+    Args:
+        attendance: Attendance session that was saved
+        routine: Routine of the session
+        new_marks: Mapping of student id to attended flag for new records
+        changed_ids: Ids of students whose existing record changed
+    """
+    rebuild_ids = set(changed_ids)
+    to_update = []
+    if new_marks:
+        # Missing summaries are inserted empty first, so concurrent first
+        # sessions never collide on unique_attendance_summary and every
+        # summary is updated under a row lock
+        AttendanceSummary.objects.bulk_create(
+            [
+                AttendanceSummary(
+                    student_id=student_id,
+                    subject_id=routine.subject_id,
+                    period_or_year=routine.period_or_year,
+                )
+                for student_id in new_marks
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        summaries = AttendanceSummary.objects.select_for_update().filter(
+            student_id__in=new_marks.keys(),
+            subject_id=routine.subject_id,
+            period_or_year=routine.period_or_year,
+        ).order_by("pk")
+
+        now = timezone.now()
+        for summary in summaries:
+            if summary.last_date and attendance.date < summary.last_date:
+                rebuild_ids.add(summary.student_id)
+                continue
+            summary.apply_session(attendance.date, new_marks[summary.student_id])
+            summary.updated_at = now
+            to_update.append(summary)
+
+    AttendanceSummary.objects.bulk_update(to_update, SUMMARY_FIELDS, batch_size=1000)
+
+    if rebuild_ids:
+        rebuild_attendance_summaries(rebuild_ids)
+
+
+def rebuild_attendance_summaries(student_ids=None):
+    """
+    Recompute attendance summaries from attendance records
+
+    All records are read in one ordered ``values_list`` scan and folded
+    into summaries in memory, then the old rows are replaced in bulk.
+
+    Args:
+        student_ids: Limit the rebuild to these students (default: everyone)
+
+    Returns:
+        int: Number of summaries written
+    """
+    records = AttendanceRecord.objects.filter(
+        student__isnull=False, attendance__routine__isnull=False
+    )
+    existing = AttendanceSummary.objects.all()
+    if student_ids is not None:
+        records = records.filter(student_id__in=student_ids)
+        existing = existing.filter(student_id__in=student_ids)
+
+    rows = records.order_by(
+        "student_id",
+        "attendance__routine__subject_id",
+        "attendance__routine__period_or_year",
+        "attendance__date",
+        "attendance_id",
+    ).values_list(
+        "student_id",
+        "attendance__routine__subject_id",
+        "attendance__routine__period_or_year",
+        "attendance__date",
+        "student_attend",
+    )
+
+    summaries = {}
+    for student_id, subject_id, period, session_date, attended in rows.iterator(chunk_size=5000):
+        key = (student_id, subject_id, period)
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = AttendanceSummary(
+                student_id=student_id, subject_id=subject_id, period_or_year=period
+            )
+        summary.apply_session(session_date, attended)
+
+    with transaction.atomic():
+        existing.delete()
+        # Rows inserted by a concurrent save are overwritten, not duplicated
+        AttendanceSummary.objects.bulk_create(
+            summaries.values(),
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["student", "subject", "period_or_year"],
+            update_fields=SUMMARY_FIELDS,
+        )
+
+    return len(summaries)
+
+
+def schedule_summary_rebuild(student_ids):
+    """Rebuild the summaries and streaks of these students once the current transaction commits"""
+    student_ids = {student_id for student_id in student_ids if student_id}
+    if student_ids:
+        transaction.on_commit(lambda: rebuild_attendance_summaries(student_ids))
+        transaction.on_commit(lambda: rebuild_attendance_streaks(student_ids))
+
+
+# --------------------------------------------------------------------
+# Attendance Streaks
+# --------------------------------------------------------------------
+
+
+def update_attendance_streaks(session_date, new_marks, changed_ids):
+    """
+    Apply a session's new marks to the attendance streaks of its students
+
+    Each streak is advanced in place; students whose marks were edited or
+    whose day cannot be applied in order are rebuilt from their records.
+
+    Args:
+        session_date: Date of the saved session
+        new_marks: Mapping of student id to attended flag for new records
+        changed_ids: Ids of students whose existing record changed
+    """
+    rebuild_ids = set(changed_ids)
+    to_update = []
+    if new_marks:
+        # Missing streaks are inserted empty first, then every streak is
+        # advanced under a row lock, as for the summaries
+        AttendanceStreak.objects.bulk_create(
+            [AttendanceStreak(student_id=student_id) for student_id in new_marks],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        streaks = AttendanceStreak.objects.select_for_update().filter(
+            student_id__in=new_marks.keys()
+        ).order_by("pk")
+
+        now = timezone.now()
+        for streak in streaks:
+            if not streak.apply_day(session_date, new_marks[streak.student_id]):
+                rebuild_ids.add(streak.student_id)
+                continue
+            streak.updated_at = now
+            to_update.append(streak)
+
+    AttendanceStreak.objects.bulk_update(
+        [streak for streak in to_update if streak.student_id not in rebuild_ids],
+        STREAK_FIELDS,
+        batch_size=1000,
+    )
+
+    if rebuild_ids:
+        rebuild_attendance_streaks(rebuild_ids)
+
+
+def rebuild_attendance_streaks(student_ids=None):
+    """
+    Recompute attendance streaks from attendance records
+
+    Records are collapsed to one present/absent row per student and day in
+    the database, then read with a single ordered ``values_list`` scan and
+    folded into streaks in one pass.
+
+    Args:
+        student_ids: Limit the rebuild to these students (default: everyone)
+
+    Returns:
+        int: Number of streaks written
+    """
+    records = AttendanceRecord.objects.filter(student__isnull=False, attendance__isnull=False)
+    existing = AttendanceStreak.objects.all()
+    if student_ids is not None:
+        records = records.filter(student_id__in=student_ids)
+        existing = existing.filter(student_id__in=student_ids)
+
+    days = (
+        records.values_list("student_id", "attendance__date")
+        .annotate(present=Count("id", filter=Q(student_attend=True)))
+        .order_by("student_id", "attendance__date")
+    )
+
+    streaks = {}
+    for student_id, day, present in days.iterator(chunk_size=5000):
+        streak = streaks.get(student_id)
+        if streak is None:
+            streak = streaks[student_id] = AttendanceStreak(student_id=student_id)
+        streak.apply_day(day, present > 0)
+
+    with transaction.atomic():
+        existing.delete()
+        # Rows inserted by a concurrent save are overwritten, not duplicated
+        AttendanceStreak.objects.bulk_create(
+            streaks.values(),
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["student"],
+            update_fields=STREAK_FIELDS,
+        )
+
+    return len(streaks)
@@ -11,7 +11,7 @@ import re
 import uuid
 
 # Local app imports
-from app.models import Student, Staff, Parent, Institute
+from app.models import Student, Staff, Parent
 from app.utils import (
     generate_otp,
     generate_secret_key,
@@ -36,16 +36,13 @@ def validate_phone_number(phone):
 def reset_password_options(request):
     """View for selecting between phone and email password reset"""
     if not request.user.is_authenticated:
-        institute = Institute.objects.first()
-        return render(request, "login/reset_options.html", {"institute": institute})
+        return render(request, "login/reset_options.html")
     return redirect('dashboard')
 
 @csrf_protect
 def password_reset_phone(request):
     """View for initiating password reset with phone number"""
     if not request.user.is_authenticated:
-        institute = Institute.objects.first()
-        
         if request.method == "POST":
             try:
                 phone = request.POST.get("phone", "").strip()
@@ -58,8 +55,7 @@ def password_reset_phone(request):
                 if not student and not staff:
                     return render(request, "login/password_reset_phone.html", {
                         "error": "No account found with this phone number", 
-                        "is_email": False,
-                        "institute": institute
+                        "is_email": False
                     })
                 
                 # Generate secret key and store it
@@ -73,25 +69,21 @@ def password_reset_phone(request):
                 if send_result:
                     return render(request, "login/password_reset_otp.html", {
                         "phone": phone, 
-                        "is_email": False,
-                        "institute": institute
+                        "is_email": False
                     })
                 else:
                     return render(request, "login/password_reset_phone.html", {
                         "error": "Failed to send OTP. Please try again.", 
-                        "is_email": False,
-                        "institute": institute
+                        "is_email": False
                     })
             except ValidationError as e:
                 return render(request, "login/password_reset_phone.html", {
                     "error": str(e), 
-                    "is_email": False,
-                    "institute": institute
+                    "is_email": False
                 })
         
         return render(request, "login/password_reset_phone.html", {
-            "is_email": False,
-            "institute": institute
+            "is_email": False
         })
     return redirect('dashboard')
 
@@ -99,8 +91,6 @@ def password_reset_phone(request):
 def password_reset_phone_verify(request):
     """View for verifying OTP for password reset"""
     if not request.user.is_authenticated:
-        institute = Institute.objects.first()
-        
         if request.method == "POST":
             try:
                 phone = request.POST.get("phone", "").strip()
@@ -118,22 +108,19 @@ def password_reset_phone_verify(request):
                     return render(request, "login/password_reset_set.html", {
                         "phone": phone,
                         "token": token,
-                        "is_email": False,
-                        "institute": institute
+                        "is_email": False
                     })
                 else:
                     return render(request, "login/password_reset_otp.html", {
                         "error": "Invalid or expired OTP",
                         "phone": phone,
-                        "is_email": False,
-                        "institute": institute
+                        "is_email": False
                     })
             except ValidationError as e:
                 return render(request, "login/password_reset_otp.html", {
                     "error": str(e),
                     "phone": phone if 'phone' in locals() else "",
-                    "is_email": False,
-                    "institute": institute
+                    "is_email": False
                 })
         
         return redirect("phone_reset_password")
@@ -180,8 +167,6 @@ def resend_phone_otp(request):
 def password_reset_email(request):
     """View for initiating password reset with email"""
     if not request.user.is_authenticated:
-        institute = Institute.objects.first()
-        
         if request.method == "POST":
             try:
                 email = request.POST.get("email", "").strip()
@@ -193,8 +178,7 @@ def password_reset_email(request):
                 if not student and not staff:
                     return render(request, "login/email_reset.html", {
                         "error": "No account found with this email address", 
-                        "is_email": True,
-                        "institute": institute
+                        "is_email": True
                     })
                 
                 user = student or staff
@@ -202,25 +186,21 @@ def password_reset_email(request):
                 if send_password_reset_email(user, request, email):
                     return render(request, "login/password_reset_otp.html", {
                         "email": email, 
-                        "is_email": True,
-                        "institute": institute
+                        "is_email": True
                     })
                 else:
                     return render(request, "login/email_reset.html", {
                         "error": "Failed to send verification code. Please try again.", 
-                        "is_email": True,
-                        "institute": institute
+                        "is_email": True
                     })
             except ValidationError as e:
                 return render(request, "login/email_reset.html", {
                     "error": str(e), 
-                    "is_email": True,
-                    "institute": institute
+                    "is_email": True
                 })
         
         return render(request, "login/email_reset.html", {
-            "is_email": True,
-            "institute": institute
+            "is_email": True
         })
     return redirect('dashboard')
 
@@ -228,8 +208,6 @@ def password_reset_email(request):
 def password_reset_email_verify(request):
     """View for verifying reset code for email"""
     if not request.user.is_authenticated:
-        institute = Institute.objects.first()
-        
         if request.method == "POST":
             try:
                 email = request.POST.get("email", "").strip()
@@ -246,23 +224,20 @@ def password_reset_email_verify(request):
                     return render(request, "login/password_reset_set.html", {
                         "email": email,
                         "token": token,
-                        "is_email": True,
-                        "institute": institute
+                        "is_email": True
                     })
                 else:
                     return render(request, "login/password_reset_otp.html", {
                         "error": "Invalid or expired code",
                         "email": email,
                         "is_email": True,
-                        "message": "Please check your email for the verification code.",
-                        "institute": institute
+                        "message": "Please check your email for the verification code."
                     })
             except ValidationError as e:
                 return render(request, "login/password_reset_otp.html", {
                     "error": str(e),
                     "email": email if 'email' in locals() else "",
-                    "is_email": True,
-                    "institute": institute
+                    "is_email": True
                 })
         
         return redirect("email_reset_password")
@@ -306,9 +281,6 @@ def resend_email_code(request):
 
 def set_new_password(request):
     """View for setting new password after verification"""
-    # Get institute for logo
-    institute = Institute.objects.first()
-    
     if request.method == "POST":
         phone = request.POST.get("phone")
         email = request.POST.get("email")
@@ -326,8 +298,7 @@ def set_new_password(request):
                 "phone": phone,
                 "email": email,
                 "token": token,
-                "is_email": is_email,
-                "institute": institute
+                "is_email": is_email
             })
         
         # Verify token is valid
@@ -337,8 +308,7 @@ def set_new_password(request):
                 "phone": phone,
                 "email": email,
                 "token": token,
-                "is_email": is_email,
-                "institute": institute
+                "is_email": is_email
             })
         
         # Check passwords match
@@ -348,8 +318,7 @@ def set_new_password(request):
                 "phone": phone,
                 "email": email,
                 "token": token,
-                "is_email": is_email,
-                "institute": institute
+                "is_email": is_email
             })
         
         # Find the user
@@ -367,8 +336,7 @@ def set_new_password(request):
                 "phone": phone,
                 "email": email,
                 "token": token,
-                "is_email": is_email,
-                "institute": institute
+                "is_email": is_email
             })
         
         # Update password
@@ -379,7 +347,7 @@ def set_new_password(request):
         messages.success(request, "Password has been reset successfully. Please login with your new password.")
         return redirect("login")
     
-    return render(request, "login/password_reset_set.html", {"is_email": False, "institute": institute})
+    return render(request, "login/password_reset_set.html", {"is_email": False})
 
 def custom_login(request):
     """Custom login view to handle authentication"""
@@ -390,12 +358,9 @@ def custom_login(request):
         # Validate phone number format if it's a phone number
         if username.isdigit():
             if len(username) != 10:
-                # Get institute for logo
-                institute = Institute.objects.first()
                 return render(request, "login/login.html", {
                     "error": "Phone number must be 10 digits",
-                    "username": username,
-                    "institute": institute
+                    "username": username
                 })
         
         user = authenticate(request, username=username, password=password)
@@ -405,14 +370,9 @@ def custom_login(request):
             next_url = request.POST.get("next", "/app/dashboard/")
             return redirect(next_url)
         else:
-            # Get institute for logo
-            institute = Institute.objects.first()
             return render(request, "login/login.html", {
                 "error": "Invalid credentials",
-                "username": username,
-                "institute": institute
+                "username": username
             })
     
-    # Get institute for logo
-    institute = Institute.objects.first()
-    return render(request, "login/login.html", {"institute": institute}) 
+    return render(request, "login/login.html") 
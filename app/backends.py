@@ -1,65 +1,131 @@
+# Standard library imports
+import time
+from contextvars import ContextVar
+
 # Core Django imports
+from django.apps import apps
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
 from django.contrib.auth.models import Group, User
 from django.db.models import Q
 
 # Local app imports
-from app.models import Parent, Staff, Student
+from app.models import LoginIdentifier, Parent, Staff, Student
+from app.permissions import get_user_group_permissions
+
+# Session key holding the model label of the logged in account
+SESSION_USER_MODEL_KEY = "_auth_user_model"
+
+# Account models a session may refer to
+SESSION_USER_MODELS = ("auth.user", "app.staff", "app.student", "app.parent")
+
+# Model label of the current request's session, set by SessionUserModelMiddleware
+session_user_model = ContextVar("session_user_model", default=None)
+
+# Cache keys holding a session user and the version counter of its entries
+SESSION_USER_KEY = "session_user_{}_{}_{}"
+SESSION_USER_VERSION_KEY = "session_user_version_{}_{}"
+
+
+def get_session_user(model_label, user_id):
+    """
+    Load the account a session refers to with a single targeted query
+
+    With SESSION_USER_CACHE_TTL set, results are kept in the shared cache
+    under a per-user version counter. Saving or deleting the account bumps
+    the counter, so every process stops reading the old entry at once.
+    """
+    ttl = getattr(settings, "SESSION_USER_CACHE_TTL", 0)
+    if not ttl:
+        return apps.get_model(model_label)._default_manager.filter(pk=user_id).first()
+
+    # Missing counters start at the current time in milliseconds, so an
+    # evicted counter never points back at a stale entry
+    version_key = SESSION_USER_VERSION_KEY.format(model_label, user_id)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, int(time.time() * 1000), None)
+        version = cache.get(version_key)
+
+    key = SESSION_USER_KEY.format(model_label, user_id, version)
+    user = cache.get(key)
+    if user is None:
+        user = apps.get_model(model_label)._default_manager.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(key, user, ttl)
+    return user
+
+
+def invalidate_session_user(instance):
+    """Expire the cached session user after it was saved or deleted"""
+    version_key = SESSION_USER_VERSION_KEY.format(instance._meta.label_lower, instance.pk)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, int(time.time() * 1000), None)
 
 
 class MultiModelBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         """
         Authenticate the user based on username (email or phone) and password.
+
+        The username is resolved through the login identifier index (one
+        indexed query) and each matching account is tried in priority
+        order. Usernames missing from the index are looked up in the user
+        tables and their rows are backfilled.
         """
         if username is None or password is None:
             return None
 
-        # Try authenticating as superuser/admin first
-        try:
-            user = User.objects.get(email=username)
-            if user.check_password(password):
-                return user
-        except User.DoesNotExist:
-            pass
+        matches = LoginIdentifier.resolve(username)
+        if matches:
+            users = (
+                apps.get_model(model_label)._default_manager.filter(pk=object_id).first()
+                for model_label, object_id in matches
+            )
+        else:
+            users = self._find_unindexed_users(username)
 
-        # Try authenticating as Staff by phone first
-        staff = Staff.objects.filter(phone=username).first()
-        if staff:
-            if staff.check_password(password):
-                return staff
-
-        # Try authenticating as Staff by email
-        staff = Staff.objects.filter(email=username).first()
-        if staff:
-            if staff.check_password(password):
-                return staff
-
-        # Try authenticating as Parent by phone
-        parent = Parent.objects.filter(phone=username).first()
-        if parent:
-            if parent.check_password(password):
-                return parent
-
-        # Try authenticating as Student by phone
-        student = Student.objects.filter(phone=username).first()
-        if student:
-            if student.check_password(password):
-                return student
-
-        # Try authenticating as Student by email
-        student = Student.objects.filter(email=username).first()
-        if student:
-            if student.check_password(password):
-                return student
+        for user in users:
+            if user and user.check_password(password) and self.user_can_authenticate(user):
+                return user
 
         # Return None if no match
         return None
 
+    def _find_unindexed_users(self, username):
+        """
+        Look a username up in each user table and index the accounts found
+
+        Covers accounts created without signals, e.g. before the index was
+        built or by ``bulk_create`` imports.
+
+        Returns:
+            list: Matching accounts, highest priority first
+        """
+        users = []
+        for model_label, field in LoginIdentifier.SOURCES:
+            user = apps.get_model(model_label)._default_manager.filter(**{field: username}).first()
+            if user is not None and user not in users:
+                LoginIdentifier.sync(user)
+                users.append(user)
+        return users
+
     def get_user(self, user_id):
         """
         Retrieve a user instance using their ID.
+
+        Logins through this backend store the account's model label in the
+        session, so the user is loaded with one targeted query (or served
+        from the cache, see get_session_user). Sessions created before that
+        fall back to probing each user table.
         """
+        model_label = session_user_model.get()
+        if model_label in SESSION_USER_MODELS:
+            return get_session_user(model_label, user_id)
+
         # Try to get superuser/admin first
         try:
             return User.objects.get(pk=user_id)
@@ -81,18 +147,8 @@ class MultiModelBackend(ModelBackend):
         if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
             return set()
 
-        if isinstance(user_obj, (Staff, Student)):
-            if not hasattr(user_obj, "_group_perm_cache"):
-                perms = set()
-                for group in user_obj.groups.all():
-                    perms.update(
-                        "%s.%s" % (ct, name)
-                        for ct, name in group.permissions.values_list(
-                            "content_type__app_label", "codename"
-                        )
-                    )
-                user_obj._group_perm_cache = perms
-            return user_obj._group_perm_cache
+        if isinstance(user_obj, (Staff, Student, Parent)):
+            return set(get_user_group_permissions(user_obj))
         else:
             return super().get_group_permissions(user_obj, obj)
 
@@ -100,7 +156,7 @@ class MultiModelBackend(ModelBackend):
         if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
             return set()
 
-        if isinstance(user_obj, (Staff, Student)):
+        if isinstance(user_obj, (Staff, Student, Parent)):
             return self.get_group_permissions(user_obj, obj)
         else:
             return super().get_all_permissions(user_obj, obj)
@@ -109,7 +165,7 @@ class MultiModelBackend(ModelBackend):
         if not user_obj.is_active:
             return False
 
-        if isinstance(user_obj, (Staff, Student)):
-            return perm in self.get_all_permissions(user_obj, obj)
+        if isinstance(user_obj, (Staff, Student, Parent)):
+            return obj is None and perm in get_user_group_permissions(user_obj)
         else:
             return super().has_perm(user_obj, perm, obj)
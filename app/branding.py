@@ -0,0 +1,38 @@
+# Local app imports
+from app.fragment_cache import get_fragment_versions
+from app.models import Institute
+
+# Version group bumped by the fragment cache signals when the institute
+# is saved or deleted
+INSTITUTE_VERSION_GROUP = "institute"
+
+# (version, branding) loaded by this process, reloaded once the version moves
+_loaded = (None, None)
+
+
+def get_branding():
+    """
+    Get the institute and its resolved logo URL
+
+    The institute row is loaded once per process and kept until a save or
+    delete bumps its version counter, so requests only pay a cache lookup.
+
+    Returns:
+        dict: ``institute`` (or None) and ``institute_logo_url`` (or None)
+    """
+    global _loaded
+    version = get_fragment_versions([INSTITUTE_VERSION_GROUP])[0]
+    loaded_version, branding = _loaded
+    if branding is None or loaded_version != version:
+        institute = Institute.objects.first()
+        branding = {
+            "institute": institute,
+            "institute_logo_url": institute.logo.url if institute and institute.logo else None,
+        }
+        _loaded = (version, branding)
+    return branding
+
+
+def get_institute():
+    """Get the institute, see ``get_branding``"""
+    return get_branding()["institute"]
@@ -0,0 +1,54 @@
+# Standard library imports
+import functools
+import hashlib
+
+# Core Django imports
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+# Local app imports
+from app.fragment_cache import get_fragment_modified, get_fragment_versions
+
+
+def versioned_response(*groups):
+    """
+    Answer conditional GETs of a view from fragment group version counters
+
+    The ETag and Last-Modified validators are read from the cache, so a
+    request whose validators match gets a 304 before the view runs any of
+    its queries. The signals that expire dashboard fragments
+    bump the counters whenever a row of the groups' models changes.
+    Responses are marked private so only the user's browser stores them,
+    and must be revalidated before reuse.
+
+    Args:
+        *groups: Fragment groups whose models the view's response reads
+
+    Usage:
+        @login_required
+        @versioned_response("courses")
+        def get_courses(request):
+            ...
+    """
+
+    def last_modified(request, *args, **kwargs):
+        return get_fragment_modified(groups)
+
+    def decorator(view_func):
+        view_name = f"{view_func.__module__}.{view_func.__qualname__}"
+
+        def etag(request, *args, **kwargs):
+            versions = ",".join(map(str, get_fragment_versions(groups)))
+            return hashlib.md5(f"{view_name}:{versions}".encode()).hexdigest()
+
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view_func)
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,24 @@
+# Core Django imports
+from django.utils.functional import SimpleLazyObject
+
+# Local app imports
+from app.branding import get_branding
+from app.template_guard import allow_template_queries
+
+
+def branding(request):
+    """
+    Add the institute and its logo URL to every template context
+
+    Values are lazy so pages that never show the logo skip the lookup.
+    """
+
+    def lookup(key):
+        # Loads the institute at most once per process, from the template
+        with allow_template_queries():
+            return get_branding()[key]
+
+    return {
+        "institute": SimpleLazyObject(lambda: lookup("institute")),
+        "institute_logo_url": SimpleLazyObject(lambda: lookup("institute_logo_url")),
+    }
@@ -1,43 +1,60 @@
 import os
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Tuple, Optional
-from django.http import HttpResponse, JsonResponse
 from django.db import models
 from django.conf import settings
 import firebase_admin
 from firebase_admin import messaging, credentials, exceptions
 from student_management_system.settings import BASE_DIR
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from app.quota import TokenBucket
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # --------------------------------------------------------------------
-# FCM Device Model
+# Device Registry
 # --------------------------------------------------------------------
 
+DEVICE_ROLES = [
+    ("student", "Student"),
+    ("parent", "Parent"),
+    ("teacher", "Teacher"),
+    ("hod", "HOD"),
+    ("admin", "Admin"),
+    ("unknown", "Unknown"),
+]
+
 
 class FCMDevice(models.Model):
-    """Model to store Firebase Cloud Messaging device tokens"""
+    """
+    Firebase Cloud Messaging device token of one user
+
+    Devices are keyed by owner (model label and primary key) like login
+    identifiers, so a user may register any number of devices. The owner's
+    role and course are copied onto the row when it is registered, and the
+    course is kept in sync by signals, so recipients of a course are found
+    with one indexed query instead of walking users.
+    """
 
     id = models.BigAutoField(primary_key=True)
     token = models.TextField(unique=True)
+    owner_model = models.CharField(max_length=50, blank=True, default="")  # e.g. "app.student"
+    owner_id = models.BigIntegerField(null=True, blank=True)
+    role = models.CharField(max_length=20, choices=DEVICE_ROLES, default="unknown")
+    course = models.ForeignKey(
+        "app.Course",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="devices",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     last_active = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     is_fallback = models.BooleanField(default=False)  # Flag to identify fallback tokens
-    user_type = models.CharField(
-        max_length=20,
-        choices=[
-            ("student", "Student"),
-            ("parent", "Parent"),
-            ("teacher", "Teacher"),
-            ("admin", "Admin"),
-            ("unknown", "Unknown"),
-        ],
-        default="unknown",
-    )  # Add user type field
 
     def __str__(self):
         return f"Device {self.id} ({self.token[:20]}...)"
@@ -46,6 +63,10 @@ class FCMDevice(models.Model):
         verbose_name = "FCM Device"
         verbose_name_plural = "FCM Devices"
         ordering = ["-last_active"]
+        indexes = [
+            models.Index(fields=["owner_model", "owner_id"]),
+            models.Index(fields=["course", "role", "is_active"]),  # For course recipients
+        ]
 
     def deactivate(self, reason: str = None):
         """Deactivate this device token with optional reason"""
@@ -54,46 +75,71 @@ class FCMDevice(models.Model):
             logger.info(f"Deactivating device token {self.id}: {reason}")
         self.save()
 
+    @classmethod
+    def owned_by(cls, instance):
+        """Get the devices registered by one user instance"""
+        return cls.objects.filter(owner_model=instance._meta.label_lower, owner_id=instance.pk)
+
 
 # --------------------------------------------------------------------
 # Token Management
 # --------------------------------------------------------------------
 
 
-def save_fcm_token(request, token):
-    """Save FCM token to database"""
-    try:
-        # Check if this is a fallback token
-        is_fallback = token.startswith("fcm-token-") or token.startswith(
-            "fallback-token-"
-        )
+def device_owner(user):
+    """
+    Describe the owner of a device from the logged in user, without queries
 
-        # Determine user type if a user is authenticated
-        user_type = "unknown"
-        if hasattr(request, "user") and request.user.is_authenticated:
-            user_groups = request.user.groups.values_list("name", flat=True)
-            if "Student" in user_groups:
-                user_type = "student"
-            elif "Parent" in user_groups:
-                user_type = "parent"
-            elif "Teacher" in user_groups:
-                user_type = "teacher"
-            elif request.user.is_superuser:
-                user_type = "admin"
-
-        # Use update_or_create to avoid unnecessary deletes
-        device, created = FCMDevice.objects.update_or_create(
-            token=token,
-            defaults={
-                "is_fallback": is_fallback,
-                "is_active": True,
-                "user_type": user_type,
-            },
-        )
+    Args:
+        user: Request user, a Student, Staff, Parent or auth User
 
-        return JsonResponse({"status": "success"})
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+    Returns:
+        dict: ``owner_model``, ``owner_id``, ``role`` and ``course_id`` fields
+    """
+    if user is None or not user.is_authenticated:
+        return {"owner_model": "", "owner_id": None, "role": "unknown", "course_id": None}
+
+    label = user._meta.label_lower
+    if label == "app.student":
+        role = "student"
+    elif label == "app.parent":
+        role = "parent"
+    elif label == "app.staff":
+        role = "hod" if user.designation == "HOD" else "teacher"
+    elif user.is_superuser:
+        role = "admin"
+    else:
+        role = "unknown"
+
+    return {
+        "owner_model": label,
+        "owner_id": user.pk,
+        "role": role,
+        # Parents have a course per child, their devices are found through the children
+        "course_id": getattr(user, "course_id", None) if role != "parent" else None,
+    }
+
+
+def register_device(token, user=None):
+    """
+    Register a device token for a user, moving it over if another user had it
+
+    Args:
+        token: FCM registration token sent by the browser
+        user: Logged in user, or None for an anonymous device
+
+    Returns:
+        FCMDevice: The registered device
+    """
+    device, _ = FCMDevice.objects.update_or_create(
+        token=token,
+        defaults={
+            "is_fallback": token.startswith(FALLBACK_TOKEN_PREFIXES),
+            "is_active": True,
+            **device_owner(user),
+        },
+    )
+    return device
 
 
 # --------------------------------------------------------------------
@@ -166,28 +212,18 @@ initialize_firebase()
 # Push Notification Functions
 # --------------------------------------------------------------------
 
-class FirebaseQuotaManager:
-    """Class to manage Firebase quota limits"""
-    
-    def __init__(self):
-        self.quota_limit = 500  # Default quota limit per minute
-        self.requests_count = 0
-        self.last_reset_time = time.time()
-    
-    def check_quota(self) -> bool:
-        """Check if we're within quota limits"""
-        current_time = time.time()
-        if current_time - self.last_reset_time >= 60:  # Reset every minute
-            self.requests_count = 0
-            self.last_reset_time = current_time
-        
-        return self.requests_count < self.quota_limit
-    
-    def increment_count(self):
-        """Increment request count"""
-        self.requests_count += 1
+# Firebase send requests per minute, shared by all workers and threads
+fcm_quota = TokenBucket(
+    "fcm",
+    rate=getattr(settings, "FCM_QUOTA_PER_MINUTE", 500) / 60,
+    capacity=getattr(settings, "FCM_QUOTA_PER_MINUTE", 500),
+    batch=getattr(settings, "FCM_QUOTA_BATCH", 10),
+)
+
+
+class QuotaExceeded(Exception):
+    """Raised when a send would exceed the Firebase quota"""
 
-quota_manager = FirebaseQuotaManager()
 
 @retry(
     stop=stop_after_attempt(3),
@@ -196,10 +232,10 @@ quota_manager = FirebaseQuotaManager()
 )
 def send_single_notification(token: str, title: str, message: str) -> bool:
     """Send a single notification with retry mechanism"""
-    if not quota_manager.check_quota():
+    if not fcm_quota.acquire():
         logger.warning("Firebase quota limit reached")
         return False
-    
+
     try:
         messaging.send(
             messaging.Message(
@@ -210,7 +246,6 @@ def send_single_notification(token: str, title: str, message: str) -> bool:
                 token=token,
             )
         )
-        quota_manager.increment_count()
         return True
     except messaging.UnregisteredError:
         logger.info(f"Token {token} is no longer valid")
@@ -222,54 +257,176 @@ def send_single_notification(token: str, title: str, message: str) -> bool:
         logger.error(f"Unexpected error for token {token}: {str(e)}")
         return False
 
-def send_push_notification(title: str, message: str, tokens: List[str]) -> Tuple[int, int, List[str]]:
+# --------------------------------------------------------------------
+# Batched Delivery
+# --------------------------------------------------------------------
+
+# FCM accepts at most 500 tokens per multicast request
+FCM_MULTICAST_LIMIT = 500
+
+# Errors that mean a token will never be deliverable again
+DEAD_TOKEN_ERRORS = (
+    messaging.UnregisteredError,
+    messaging.SenderIdMismatchError,
+    exceptions.InvalidArgumentError,
+)
+
+FALLBACK_TOKEN_PREFIXES = ("fcm-token-", "fallback-token-")
+
+
+class FakeMessaging:
     """
-    Send push notification using Firebase Cloud Messaging with improved error handling
-    Returns a tuple of (success_count, failure_count, failed_tokens)
+    Offline stand-in for ``firebase_admin.messaging``
+
+    Answers multicast requests after ``latency`` seconds and reports tokens
+    starting with ``dead_prefix`` as unregistered, so delivery throughput can
+    be benchmarked without a Firebase project.
     """
-    if not firebase_app:
-        logger.error("Firebase Admin not initialized")
-        return 0, len(tokens) if tokens else 0, tokens
 
-    if not isinstance(tokens, (list, tuple)):
-        tokens = list(tokens)
+    def __init__(self, latency: float = 0.05, dead_prefix: str = "dead-"):
+        self.latency = latency
+        self.dead_prefix = dead_prefix
+        self.calls = 0
+
+    def send_each_for_multicast(self, multicast_message, dry_run=False, app=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        responses = []
+        for token in multicast_message.tokens:
+            if token.startswith(self.dead_prefix):
+                error = messaging.UnregisteredError("Requested entity was not found.")
+                responses.append(messaging.SendResponse(None, error))
+            else:
+                responses.append(messaging.SendResponse({"name": f"fake/{token}"}, None))
+        return messaging.BatchResponse(responses)
 
-    success_count = 0
-    failure_count = 0
-    failed_tokens = []
 
-    # Get only active devices that are not fallback tokens
-    active_devices = FCMDevice.objects.filter(
-        token__in=tokens,
-        is_active=True,
-        is_fallback=False,
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=4, max=10),
+    retry=retry_if_exception_type((exceptions.UnavailableError, exceptions.InternalError))
+)
+def send_multicast_batch(tokens: List[str], title: str, message: str, client=messaging):
+    """
+    Send one multicast request for up to FCM_MULTICAST_LIMIT tokens
+
+    Every attempt, retries included, takes a permit from ``fcm_quota``
+    and raises QuotaExceeded without sending if none is left.
+
+    Returns a list of (token, delivered, dead) tuples in token order
+    """
+    if not fcm_quota.acquire():
+        raise QuotaExceeded(f"No Firebase quota left for a batch of {len(tokens)} tokens")
+
+    response = client.send_each_for_multicast(
+        messaging.MulticastMessage(
+            notification=messaging.Notification(
+                title=title,
+                body=message,
+            ),
+            tokens=tokens,
+        )
     )
+    results = []
+    for token, result in zip(tokens, response.responses):
+        if result.success:
+            results.append((token, True, False))
+        else:
+            dead = isinstance(result.exception, DEAD_TOKEN_ERRORS)
+            if not dead:
+                logger.error(f"Firebase error for token {token}: {str(result.exception)}")
+            results.append((token, False, dead))
+    return results
+
+
+def send_push_notification(
+    title: str, message: str, tokens: List[str], client=None
+) -> Tuple[int, int, List[str], List[str]]:
+    """
+    Send push notification using Firebase Cloud Messaging with improved error handling
 
-    # Count fallback tokens as "success" for reporting purposes
-    fallback_count = FCMDevice.objects.filter(
-        token__in=tokens, is_active=True, is_fallback=True
-    ).count()
-    success_count += fallback_count
+    Active tokens are split into multicast batches of FCM_MULTICAST_LIMIT
+    that are sent concurrently by a bounded thread pool. Tokens reported as
+    unregistered are deactivated with a single update at the end. Batches
+    refused by ``fcm_quota`` are never sent to Firebase, their tokens are
+    returned as deferred rather than failed so callers can retry them once
+    the quota refills.
 
-    for device in active_devices:
-        try:
-            # Skip tokens that match our fallback pattern
-            if device.token.startswith(("fcm-token-", "fallback-token-")):
-                device.is_fallback = True
-                device.save()
-                continue
+    Pass ``client=FakeMessaging()`` to deliver without Firebase.
 
-            if send_single_notification(device.token, title, message):
-                success_count += 1
-            else:
-                device.deactivate("Failed to send notification after retries")
-                failure_count += 1
-                failed_tokens.append(device.token)
+    Returns a tuple of (success_count, failure_count, failed_tokens, deferred_tokens)
+    """
+    if client is None:
+        if not firebase_app:
+            logger.error("Firebase Admin not initialized")
+            return 0, len(tokens) if tokens else 0, tokens, []
+        client = messaging
 
-        except Exception as e:
-            logger.error(f"Error processing device {device.id}: {str(e)}")
-            device.deactivate(f"Error: {str(e)}")
-            failure_count += 1
-            failed_tokens.append(device.token)
+    if not tokens:
+        return 0, 0, [], []
 
-    return success_count, failure_count, failed_tokens
+    tokens = list(dict.fromkeys(tokens))
+
+    success_count = 0
+    failure_count = 0
+    failed_tokens = []
+    deferred_tokens = []
+
+    # Get only active devices, fallback tokens count as "success" for reporting purposes
+    send_tokens = []
+    new_fallback_tokens = []
+    for token, is_fallback in FCMDevice.objects.filter(
+        token__in=tokens, is_active=True
+    ).values_list("token", "is_fallback"):
+        if is_fallback:
+            success_count += 1
+        elif token.startswith(FALLBACK_TOKEN_PREFIXES):
+            # Skip tokens that match our fallback pattern
+            new_fallback_tokens.append(token)
+        else:
+            send_tokens.append(token)
+
+    if new_fallback_tokens:
+        FCMDevice.objects.filter(token__in=new_fallback_tokens).update(is_fallback=True)
+
+    batches = [
+        send_tokens[i:i + FCM_MULTICAST_LIMIT]
+        for i in range(0, len(send_tokens), FCM_MULTICAST_LIMIT)
+    ]
+
+    dead_tokens = []
+    if batches:
+        workers = min(len(batches), getattr(settings, "FCM_DELIVERY_WORKERS", 4))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fcm") as executor:
+            futures = {}
+            for batch in batches:
+                futures[executor.submit(send_multicast_batch, batch, title, message, client)] = batch
+
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    results = future.result()
+                except QuotaExceeded:
+                    logger.warning(f"Firebase quota limit reached, deferring {len(batch)} notifications")
+                    deferred_tokens.extend(batch)
+                    continue
+                except Exception as e:
+                    logger.error(f"Error sending batch of {len(batch)} notifications: {str(e)}")
+                    failure_count += len(batch)
+                    failed_tokens.extend(batch)
+                    continue
+
+                for token, delivered, dead in results:
+                    if delivered:
+                        success_count += 1
+                    else:
+                        failure_count += 1
+                        failed_tokens.append(token)
+                        if dead:
+                            dead_tokens.append(token)
+
+    if dead_tokens:
+        logger.info(f"Deactivating {len(dead_tokens)} unregistered device tokens")
+        FCMDevice.objects.filter(token__in=dead_tokens).update(is_active=False)
+
+    return success_count, failure_count, failed_tokens, deferred_tokens
@@ -0,0 +1,125 @@
+# Standard library imports
+import time
+from datetime import datetime, timezone
+
+# Core Django imports
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+# Cache keys holding the version counter of a fragment group and the time
+# it was last bumped
+FRAGMENT_VERSION_KEY = "fragment_version_{}"
+FRAGMENT_MODIFIED_KEY = "fragment_modified_{}"
+
+# Fields whose changes never show up in a cached fragment
+VOLATILE_FIELDS = frozenset({"last_login", "updated_at"})
+
+# Fragment groups and the models rendered in them. Saving or deleting any
+# instance of these models bumps the group's version counter. The counters
+# also version the conditional JSON responses in app/conditional.py.
+FRAGMENT_DEPENDENCIES = {
+    "notices": ("Notice",),
+    "routines": ("Routine", "Subject", "Course", "Staff"),
+    "subjects": ("Subject", "SubjectFile", "Course", "Staff"),
+    "feedback": (
+        "StudentFeedback",
+        "ParentFeedback",
+        "InstituteFeedback",
+        "StaffInstituteFeedback",
+        "ParentInstituteFeedback",
+        "Student",
+        "Staff",
+    ),
+    "institute": ("Institute",),
+    "courses": ("Course",),
+    "batches": ("Batch",),
+    "students": ("Student",),
+}
+
+
+# --------------------------------------------------------------------
+# Fragment Versions
+# --------------------------------------------------------------------
+
+
+def get_fragment_versions(groups):
+    """
+    Get the current version counters of fragment groups
+
+    Missing counters start at the current time in milliseconds, so a counter
+    evicted from the cache never reuses the key of a stale fragment.
+
+    Args:
+        groups: Iterable of fragment group names
+
+    Returns:
+        list: Version numbers in the order of ``groups``
+    """
+    keys = [FRAGMENT_VERSION_KEY.format(group) for group in groups]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, int(time.time() * 1000), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_fragment_modified(groups):
+    """
+    Get when any of the fragment groups last changed
+
+    Groups without a recorded change count as changed now, matching a
+    version counter that starts over.
+
+    Args:
+        groups: Iterable of fragment group names
+
+    Returns:
+        datetime: Latest change of the groups, in UTC
+    """
+    keys = [FRAGMENT_MODIFIED_KEY.format(group) for group in groups]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            cache.add(key, time.time(), None)
+            stamps[key] = cache.get(key) or time.time()
+    return datetime.fromtimestamp(max(stamps.values()), tz=timezone.utc)
+
+
+def bump_fragment_versions(groups):
+    """Expire every cached fragment rendered from the given groups"""
+    now = time.time()
+    for group in groups:
+        key = FRAGMENT_VERSION_KEY.format(group)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(now * 1000), None)
+    cache.set_many({FRAGMENT_MODIFIED_KEY.format(group): now for group in groups}, None)
+
+
+def groups_for_model(model_name):
+    """Get the fragment groups that render instances of ``model_name``"""
+    return [group for group, models in FRAGMENT_DEPENDENCIES.items() if model_name in models]
+
+
+def get_fragment(name, groups, vary_on, render):
+    """
+    Get a rendered fragment from the cache, rendering it on a miss
+
+    Args:
+        name: Fragment name, unique per template block
+        groups: Fragment groups whose versions key the fragment
+        vary_on: Extra values the fragment depends on, e.g. a course id
+        render: Callable producing the fragment's HTML
+
+    Returns:
+        str: Rendered fragment
+    """
+    key = make_template_fragment_key(name, [*get_fragment_versions(groups), *vary_on])
+    content = cache.get(key)
+    if content is None:
+        content = render()
+        cache.set(key, content, settings.FRAGMENT_CACHE_TIMEOUT)
+    return content
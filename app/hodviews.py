@@ -1,7 +1,7 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Avg, Q
-from django.http import JsonResponse
+from django.db.models import Count, Avg, Prefetch, Q, prefetch_related_objects
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from datetime import datetime, timedelta, time
 from django.contrib import messages
@@ -11,9 +11,9 @@ from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Group
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+import json
 import os
 
-from app.firebase import send_push_notification, FCMDevice
 from app.utils import (
     handle_file_upload,
     cleanup_failed_upload,
@@ -37,6 +37,15 @@ from app.models import (
     Parent,
     Notice,
 )
+from app.permissions import user_in_group
+
+# Number of recent meetings and notices listed on the HOD dashboard
+HOD_DASHBOARD_LIST_LIMIT = 50
+
+# Student progress API page sizes
+PROGRESS_PAGE_SIZE = 100
+PROGRESS_MAX_PAGE_SIZE = 500
+PROGRESS_STREAM_CHUNK_SIZE = 500
 
 
 @login_required
@@ -44,7 +53,7 @@ def hod_dashboard(request):
     """HOD dashboard view showing department overview and management options"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             messages.error(request, "Only HODs can access this dashboard.")
             return redirect("hodDashboard")
 
@@ -55,78 +64,69 @@ def hod_dashboard(request):
             return redirect("hodDashboard")
 
         course = hod.course
+        today = timezone.now().date()
 
-        # Get department statistics
-        total_students = Student.objects.filter(course=course).count()
-        total_staff = Staff.objects.filter(course=course).count()
-        total_subjects = Subject.objects.filter(course=course).count()
-
-        # Get all subjects for the course
-        subjects = Subject.objects.filter(course=course).order_by('period_or_year', 'name')
+        # Shared templates read user.groups.all several times per render
+        prefetch_related_objects([hod], "groups")
 
-        # Get routines to find teachers for each subject
-        routines = Routine.objects.filter(course=course, is_active=True).select_related(
-            "subject", "teacher"
+        # Prefetch plan: every relation the template walks is loaded here with
+        # a fixed number of queries, independent of the course size
+        routines = list(
+            Routine.objects.filter(course=course, is_active=True).select_related(
+                "subject", "teacher"
+            )
+        )
+        subjects = list(Subject.objects.filter(course=course).order_by("period_or_year", "name"))
+        students = list(Student.objects.filter(course=course).order_by("name"))
+        student_progress_all = list(
+            CourseTracking.objects.filter(student__course=course)
+            .select_related("student")
+            .prefetch_related(Prefetch("student__batches", queryset=Batch.objects.only("id", "name")))
+            .order_by("-completion_percentage")
         )
 
-        # Create a mapping of subject_id to teacher
-        teacher_map = {}
-        for routine in routines:
-            teacher_map[routine.subject_id] = routine.teacher
-
-        # Get all teachers who teach in this course through active routines
-        staff = Staff.objects.filter(
-            id__in=routines.values_list('teacher_id', flat=True)
-        ).prefetch_related(
-            'routine_set',
-            'routine_set__subject'
-        ).distinct()
-
-        # Filter routines for each staff member to only show subjects from this course
+        # Teachers of the course with their active routines in it
+        staff = list(
+            Staff.objects.filter(id__in={routine.teacher_id for routine in routines})
+            .prefetch_related(
+                Prefetch(
+                    "routine_set",
+                    queryset=Routine.objects.filter(course=course, is_active=True)
+                    .select_related("subject")
+                    .order_by("subject__period_or_year", "subject__name"),
+                    to_attr="course_routines",
+                )
+            )
+        )
         for staff_member in staff:
-            staff_member.filtered_subjects = Subject.objects.filter(
-                course=course,
-                id__in=staff_member.routine_set.filter(is_active=True).values_list('subject_id', flat=True)
+            staff_member.filtered_subjects = list(
+                {routine.subject_id: routine.subject for routine in staff_member.course_routines}.values()
             )
 
-        # Get today's classes and their attendance
-        today = timezone.now().date()
-        today_classes = Routine.objects.filter(
-            course=course,
-            is_active=True
-        ).select_related("subject", "teacher")
-
-        # Get attendance for today's classes
-        today_attendance = Attendance.objects.filter(
-            routine__course=course,
-            date=today
-        ).select_related("routine")
-
-        # Create a dictionary of routine_id to attendance
-        attendance_map = {att.routine_id: att for att in today_attendance}
-
-        # Attach attendance to each class
-        for class_obj in today_classes:
+        # Attach today's attendance to each class
+        attendance_map = {
+            attendance.routine_id: attendance
+            for attendance in Attendance.objects.filter(routine__course=course, date=today)
+        }
+        for class_obj in routines:
             class_obj.attendance = attendance_map.get(class_obj.id)
 
-        # Get all student progress records for display in the progress section
-        student_progress_all = (
-            CourseTracking.objects.filter(student__course=course)
-            .select_related("student")
-            .order_by("-completion_percentage")
+        # Progress metrics in one grouped aggregate
+        progress_stats = CourseTracking.objects.filter(student__course=course).aggregate(
+            avg_completion=Avg("completion_percentage"),
+            students_on_track=Count("id", filter=Q(completion_percentage__gte=75)),
+            students_at_risk=Count("id", filter=Q(completion_percentage__lt=40)),
         )
-        
-        # Calculate progress metrics
-        avg_completion = student_progress_all.aggregate(Avg('completion_percentage'))['completion_percentage__avg'] or 0
-        avg_completion = round(avg_completion, 1)
-        students_on_track = student_progress_all.filter(completion_percentage__gte=75).count()
-        students_at_risk = student_progress_all.filter(completion_percentage__lt=40).count()
-        
+        avg_completion = round(progress_stats["avg_completion"] or 0, 1)
+
         # For the dashboard overview, still show just top 5
         student_progress = student_progress_all[:5]
 
-        # Get all meetings
-        meetings = TeacherParentMeeting.objects.all().order_by("-meeting_date", "-meeting_time")
+        # Most recent meetings and notices, the full lists are paginated elsewhere
+        meetings = TeacherParentMeeting.objects.order_by("-meeting_date", "-meeting_time")
+        total_meetings = meetings.count()
+        meetings = meetings[:HOD_DASHBOARD_LIST_LIMIT]
+        notices = Notice.objects.order_by("-created_at")[:HOD_DASHBOARD_LIST_LIMIT]
 
         # Get recent feedback
         recent_feedback = (
@@ -135,29 +135,24 @@ def hod_dashboard(request):
             .order_by("-created_at")[:5]
         )
 
-        # Get all students in the course
-        students = Student.objects.filter(course=course).order_by('name')
-
         # Get all active batches
         batches = Batch.objects.filter(is_active=True).order_by('-year')
-        
-        # Get notices
-        notices = Notice.objects.all().order_by('-created_at')
 
         context = {
             "title": "HOD Dashboard",
             "hod": hod,
             "course": course,
-            "total_students": total_students,
-            "total_staff": total_staff,
-            "total_subjects": total_subjects,
-            "today_classes": today_classes,
+            "total_students": len(students),
+            "total_staff": Staff.objects.filter(course=course).count(),
+            "total_subjects": len(subjects),
+            "today_classes": routines,
             "student_progress": student_progress,
             "student_progress_all": student_progress_all,  # All student progress records
             "avg_completion": avg_completion,
-            "students_on_track": students_on_track,
-            "students_at_risk": students_at_risk,
-            "meetings": meetings,  # Changed from upcoming_meetings to all meetings
+            "students_on_track": progress_stats["students_on_track"],
+            "students_at_risk": progress_stats["students_at_risk"],
+            "meetings": meetings,
+            "total_meetings": total_meetings,
             "recent_feedback": recent_feedback,
             "subjects": subjects,
             "staff": staff,
@@ -228,7 +223,7 @@ def view_subject(request, subject_id):
     """View details of a specific subject"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can view subject details."})
 
         # Get the HOD's course
@@ -360,7 +355,7 @@ def add_staff(request):
     """Add a new staff member"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can add staff members."})
 
         # Get the HOD's course
@@ -454,7 +449,7 @@ def view_staff(request, staff_id):
     """View details of a staff member"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can view staff details."})
 
         # Get the HOD's course
@@ -509,7 +504,7 @@ def edit_staff(request, staff_id):
     """Edit an existing staff member"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can edit staff members."})
 
         # Get the HOD's course
@@ -559,7 +554,7 @@ def delete_staff(request, staff_id):
     """Delete a staff member"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             messages.error(request, "Only Head of Department can delete staff members")
             return redirect("hodDashboard")
 
@@ -605,7 +600,7 @@ def add_student(request):
     """Add a new student to the HOD's course"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can add students."})
 
         # Get the HOD's course
@@ -728,7 +723,7 @@ def get_student(request, student_id):
     """Get student details"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can view student details."})
 
         # Get the HOD's course
@@ -773,7 +768,7 @@ def edit_student(request, student_id):
     """Edit an existing student"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can edit students."})
 
         # Get the HOD's course
@@ -850,7 +845,7 @@ def delete_student(request, student_id):
     """Delete a student"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             messages.error(request, "Only HODs can delete students.")
             return redirect('hodDashboard')
 
@@ -885,7 +880,7 @@ def add_notice(request):
     """Add a new notice and notify students and parents"""
     try:
         # Check if user is HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             messages.error(request, "Only HODs can add notices.")
             return redirect('hodDashboard')
         
@@ -920,46 +915,12 @@ def add_notice(request):
             if request.FILES.get("file"):
                 notice.file = request.FILES.get("file")
             
+            # Students of the HOD's course and their parents are notified
+            # from the notification outbox once the notice is saved
+            notice._notify_course = course
             notice.save()
             
-            # Get students from the HOD's course with FCM tokens
-            students = Student.objects.filter(course=course, fcm_token__isnull=False)
-            
-            # Get parents of these students with FCM tokens
-            student_ids = students.values_list('id', flat=True)
-            parents = Parent.objects.filter(students__in=student_ids, fcm_token__isnull=False).distinct()
-            
-            # Collect all FCM tokens
-            tokens = []
-            
-            # Add student tokens
-            student_tokens = students.values_list('fcm_token', flat=True)
-            tokens.extend(student_tokens)
-            
-            # Add parent tokens
-            parent_tokens = parents.values_list('fcm_token', flat=True)
-            tokens.extend(parent_tokens)
-            
-            # Remove any empty or null tokens
-            tokens = [token for token in tokens if token]
-            
-            # Send push notifications if we have any tokens
-            if tokens:
-                try:
-                    # Send notification to all tokens at once
-                    success_count, failure_count, failed_tokens = send_push_notification(
-                        "New Notice: {title}",
-                        message[:100] + "..." if len(message) > 100 else message,
-                        tokens
-                    )
-                    
-                    if failure_count > 0:
-                        print(f"Failed to send notifications to {failure_count} devices")
-                        print(f"Failed tokens: {failed_tokens}")
-                except Exception as e:
-                    print(f"Error sending notifications: {str(e)}")
-            
-            messages.success(request, "Notice added successfully and notifications sent.")
+            messages.success(request, "Notice added successfully and notifications queued.")
             return redirect('hodDashboard')
         
         return render(request, 'hod/dashboard.html')
@@ -973,7 +934,7 @@ def view_notice(request, notice_id):
     """View notice details"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             messages.error(request, "Access denied.")
             return redirect('hodDashboard')
         
@@ -999,7 +960,7 @@ def delete_notice(request, notice_id):
     """Delete a notice"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             messages.error(request, "Only HODs can delete notices.")
             return redirect('hodDashboard')
         
@@ -1024,7 +985,7 @@ def add_meeting(request):
     """Add a new teacher-parent meeting and notify relevant users"""
     try:
         # Check if user is HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can schedule meetings."})
         
         # Get the HOD's course
@@ -1057,45 +1018,10 @@ def add_meeting(request):
                 status="scheduled"
             )
             
+            # Notifications are queued by the meeting post_save signal
+            meeting._notify_course = course
             meeting.save()
             
-            # Get students from the HOD's course with FCM tokens
-            students = Student.objects.filter(course=course, fcm_token__isnull=False)
-            
-            # Get parents of these students with FCM tokens
-            student_ids = students.values_list('id', flat=True)
-            parents = Parent.objects.filter(students__in=student_ids, fcm_token__isnull=False).distinct()
-            
-            # Collect all FCM tokens
-            tokens = []
-            
-            # Add student tokens
-            student_tokens = students.values_list('fcm_token', flat=True)
-            tokens.extend(student_tokens)
-            
-            # Add parent tokens
-            parent_tokens = parents.values_list('fcm_token', flat=True)
-            tokens.extend(parent_tokens)
-            
-            # Remove any empty or null tokens
-            tokens = [token for token in tokens if token]
-            
-            # Send push notifications if we have any tokens
-            if tokens:
-                try:
-                    # Send notification to all tokens at once
-                    success_count, failure_count, failed_tokens = send_push_notification(
-                        "New Meeting Scheduled",
-                        f"A new meeting has been scheduled for {meeting_date} at {meeting_time}",
-                        tokens
-                    )
-                    
-                    if failure_count > 0:
-                        print(f"Failed to send notifications to {failure_count} devices")
-                        print(f"Failed tokens: {failed_tokens}")
-                except Exception as e:
-                    print(f"Error sending notifications: {str(e)}")
-            
             return JsonResponse({"success": True, "message": "Meeting scheduled successfully."})
         
         return JsonResponse({"success": False, "message": "Invalid request method."})
@@ -1108,7 +1034,7 @@ def get_meeting(request, meeting_id):
     """Get meeting details"""
     try:
         # Check if user is HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can view meeting details."})
         
         # Get meeting
@@ -1145,7 +1071,7 @@ def edit_meeting(request, meeting_id):
     """Edit an existing meeting"""
     try:
         # Check if user is HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can edit meetings."})
         
         # Get meeting
@@ -1174,31 +1100,10 @@ def edit_meeting(request, meeting_id):
             meeting.meeting_link = meeting_link  # Always set meeting_link, even if empty
             meeting.status = "rescheduled" if meeting.status == "scheduled" else meeting.status
             
+            # Notifications are queued by the meeting post_save signal
+            meeting._notify_course = request.user.course
             meeting.save()
             
-            # Get students and parents to notify
-            students = Student.objects.filter(course=request.user.course, fcm_token__isnull=False)
-            student_ids = students.values_list('id', flat=True)
-            parents = Parent.objects.filter(students__in=student_ids, fcm_token__isnull=False).distinct()
-            
-            # Collect FCM tokens
-            tokens = list(students.values_list('fcm_token', flat=True)) + list(parents.values_list('fcm_token', flat=True))
-            tokens = [token for token in tokens if token]
-            
-            # Send notifications
-            if tokens:
-                try:
-                    success_count, failure_count, failed_tokens = send_push_notification(
-                        "Meeting Updated",
-                        f"Meeting scheduled for {meeting_date} at {meeting_time} has been updated",
-                        tokens
-                    )
-                    
-                    if failure_count > 0:
-                        print(f"Failed to send notifications to {failure_count} devices")
-                except Exception as e:
-                    print(f"Error sending notifications: {str(e)}")
-            
             return JsonResponse({"success": True, "message": "Meeting updated successfully."})
         
         return JsonResponse({"success": False, "message": "Invalid request method."})
@@ -1213,7 +1118,7 @@ def cancel_meeting(request, meeting_id):
     """Cancel a meeting"""
     try:
         # Check if user is HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can cancel meetings."})
         
         # Get meeting
@@ -1228,31 +1133,10 @@ def cancel_meeting(request, meeting_id):
             # Update meeting
             meeting.status = "cancelled"
             meeting.cancellation_reason = cancellation_reason
+            # Notifications are queued by the meeting post_save signal
+            meeting._notify_course = request.user.course
             meeting.save()
             
-            # Get students and parents to notify
-            students = Student.objects.filter(course=request.user.course, fcm_token__isnull=False)
-            student_ids = students.values_list('id', flat=True)
-            parents = Parent.objects.filter(students__in=student_ids, fcm_token__isnull=False).distinct()
-            
-            # Collect FCM tokens
-            tokens = list(students.values_list('fcm_token', flat=True)) + list(parents.values_list('fcm_token', flat=True))
-            tokens = [token for token in tokens if token]
-            
-            # Send notifications
-            if tokens:
-                try:
-                    success_count, failure_count, failed_tokens = send_push_notification(
-                        "Meeting Cancelled",
-                        f"Meeting scheduled for {meeting.meeting_date} at {meeting.meeting_time} has been cancelled",
-                        tokens
-                    )
-                    
-                    if failure_count > 0:
-                        print(f"Failed to send notifications to {failure_count} devices")
-                except Exception as e:
-                    print(f"Error sending notifications: {str(e)}")
-            
             return JsonResponse({"success": True, "message": "Meeting cancelled successfully."})
         
         return JsonResponse({"success": False, "message": "Invalid request method."})
@@ -1267,7 +1151,7 @@ def get_meeting_notes(request, meeting_id):
     """Get meeting notes"""
     try:
         # Check if user is HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can view meeting notes."})
         
         # Get meeting
@@ -1288,7 +1172,7 @@ def get_meeting_agenda(request, meeting_id):
     """Get meeting agenda"""
     try:
         # Check if user is HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can view meeting agenda."})
         
         # Get meeting
@@ -1309,7 +1193,7 @@ def get_cancellation_reason(request, meeting_id):
     """Get meeting cancellation reason"""
     try:
         # Check if user is HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can view cancellation reasons."})
         
         # Get meeting
@@ -1367,7 +1251,7 @@ def api_create_meeting(request):
     """API endpoint to create a new meeting"""
     try:
         # Check if user is HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"error": "Only HODs can schedule meetings"}, status=403)
         
         # Get form data
@@ -1411,7 +1295,7 @@ def api_update_meeting(request, meeting_id):
     """API endpoint to update an existing meeting"""
     try:
         # Check if user is HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"error": "Only HODs can edit meetings"}, status=403)
         
         # Get meeting
@@ -1460,7 +1344,7 @@ def api_cancel_meeting(request, meeting_id):
     """API endpoint to cancel a meeting"""
     try:
         # Check if user is HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"error": "Only HODs can cancel meetings"}, status=403)
         
         # Get meeting
@@ -1495,7 +1379,7 @@ def api_create_routine(request):
     """API endpoint to create a new routine"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can create routines."})
 
         # Get the HOD's course
@@ -1549,7 +1433,7 @@ def api_get_routine(request, routine_id):
     """API endpoint to get routine details"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can view routine details."})
 
         # Get the HOD's course
@@ -1595,7 +1479,7 @@ def api_update_routine(request, routine_id):
     """API endpoint to update a routine"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can update routines."})
 
         # Get the HOD's course
@@ -1681,7 +1565,7 @@ def api_delete_routine(request, routine_id):
     """API endpoint to delete a routine"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can delete routines."})
 
         # Get the HOD's course
@@ -1699,12 +1583,97 @@ def api_delete_routine(request, routine_id):
     except Exception as e:
         return JsonResponse({"success": False, "message": f"An error occurred: {str(e)}"})
 
+def progress_status(completion_percentage):
+    """Get the status label and CSS class for a completion percentage"""
+    if completion_percentage >= 75:
+        return "On Track", "success"
+    if completion_percentage >= 40:
+        return "Needs Attention", "warning"
+    return "At Risk", "danger"
+
+
+def serialize_progress(progress):
+    """Format a course tracking row with its prefetched student batches"""
+    status, status_class = progress_status(progress.completion_percentage)
+    student = progress.student
+    return {
+        "id": progress.id,
+        "student_id": student.id,
+        "student_name": student.name,
+        "student_image": student.image.url if student.image else None,
+        "batch_names": ", ".join(batch.name for batch in student.batches.all()),
+        "current_period": student.current_period,
+        "completion_percentage": progress.completion_percentage,
+        "last_updated": progress.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "status": status,
+        "status_class": status_class,
+    }
+
+
+def progress_page(progress_query, cursor, limit):
+    """
+    Fetch one keyset page of progress rows ordered by completion, highest first
+
+    Args:
+        progress_query: Filtered CourseTracking queryset
+        cursor: ``(completion_percentage, id)`` of the last row already sent, or None
+        limit: Maximum number of rows to return
+
+    Returns:
+        tuple: (rows, cursor of the last row or None when there are no more)
+    """
+    if cursor:
+        completion, last_id = cursor
+        progress_query = progress_query.filter(
+            Q(completion_percentage__lt=completion)
+            | Q(completion_percentage=completion, id__lt=last_id)
+        )
+
+    rows = list(progress_query.order_by("-completion_percentage", "-id")[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = (rows[-1].completion_percentage, rows[-1].id) if has_more else None
+    return rows, next_cursor
+
+
+def progress_metrics(progress_query):
+    """Get progress metrics for a queryset with one conditional aggregate"""
+    metrics = progress_query.aggregate(
+        total_students=Count("id"),
+        avg_completion=Avg("completion_percentage"),
+        students_on_track=Count("id", filter=Q(completion_percentage__gte=75)),
+        students_at_risk=Count("id", filter=Q(completion_percentage__lt=40)),
+    )
+    metrics["avg_completion"] = round(metrics["avg_completion"] or 0, 1)
+    return metrics
+
+
+def stream_progress(progress_query):
+    """Yield metrics and then every progress row as newline-delimited JSON"""
+    yield json.dumps({"success": True, **progress_metrics(progress_query)}) + "\n"
+
+    cursor = None
+    while True:
+        rows, cursor = progress_page(progress_query, cursor, PROGRESS_STREAM_CHUNK_SIZE)
+        for progress in rows:
+            yield json.dumps(serialize_progress(progress)) + "\n"
+        if cursor is None:
+            return
+
+
 @login_required
 def get_student_progress(request):
-    """API endpoint to get all student progress data with filtering options"""
+    """
+    API endpoint to get student progress data with filtering options
+
+    Rows are ordered by completion percentage (highest first) and paginated
+    with an opaque ``cursor`` returned as ``next_cursor``; ``limit`` sets the
+    page size. Metrics are included on the first page only. Pass
+    ``format=ndjson`` to stream every row as newline-delimited JSON instead.
+    """
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can access progress data."})
 
         # Get the HOD's course
@@ -1717,72 +1686,48 @@ def get_student_progress(request):
         # Get batch filter if provided
         batch_id = request.GET.get('batch_id')
         
-        # Base query for student progress
-        progress_query = CourseTracking.objects.filter(
-            student__course=course
-        ).select_related("student")
+        # Base query for student progress, batch names come from one prefetch per page
+        progress_query = (
+            CourseTracking.objects.filter(student__course=course)
+            .select_related("student")
+            .prefetch_related(Prefetch("student__batches", queryset=Batch.objects.only("id", "name")))
+        )
         
         # Apply batch filter if provided
         if batch_id:
-            try:
-                batch = Batch.objects.get(id=batch_id)
-                progress_query = progress_query.filter(student__batches=batch)
-            except Batch.DoesNotExist:
+            if not Batch.objects.filter(id=batch_id).exists():
                 return JsonResponse({"success": False, "message": "Invalid batch selected."})
-        
-        # Get all progress records ordered by completion percentage
-        progress_records = progress_query.order_by("-completion_percentage")
-        
-        # Calculate metrics
-        total_students = progress_records.count()
-        avg_completion = progress_records.aggregate(Avg('completion_percentage'))['completion_percentage__avg'] or 0
-        avg_completion = round(avg_completion, 1)
-        students_on_track = progress_records.filter(completion_percentage__gte=75).count()
-        students_at_risk = progress_records.filter(completion_percentage__lt=40).count()
-        
-        # Prepare progress data
-        progress_data = []
-        
-        for progress in progress_records:
-            # Get batch names
-            batch_names = ", ".join([batch.name for batch in progress.student.batches.all()])
-            
-            # Determine status
-            if progress.completion_percentage >= 75:
-                status = "On Track"
-                status_class = "success"
-            elif progress.completion_percentage >= 40:
-                status = "Needs Attention"
-                status_class = "warning"
-            else:
-                status = "At Risk"
-                status_class = "danger"
-                
-            # Format student data
-            student_image = progress.student.image.url if progress.student.image else None
-            
-            # Add to progress data list
-            progress_data.append({
-                "student_id": progress.student.id,
-                "student_name": progress.student.name,
-                "student_image": student_image,
-                "batch_names": batch_names,
-                "current_period": progress.student.current_period,
-                "completion_percentage": progress.completion_percentage,
-                "last_updated": progress.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                "status": status,
-                "status_class": status_class
-            })
-        
+            progress_query = progress_query.filter(student__batches=batch_id)
+
+        # Full export streamed row by row
+        if request.GET.get("format") == "ndjson":
+            response = StreamingHttpResponse(
+                stream_progress(progress_query), content_type="application/x-ndjson"
+            )
+            response["Content-Disposition"] = 'attachment; filename="student_progress.ndjson"'
+            return response
+
+        # Page size and position
+        try:
+            limit = int(request.GET.get("limit", PROGRESS_PAGE_SIZE))
+            cursor = request.GET.get("cursor")
+            if cursor:
+                completion, last_id = cursor.split(":")
+                cursor = (int(completion), int(last_id))
+        except ValueError:
+            return JsonResponse({"success": False, "message": "Invalid limit or cursor."})
+        limit = min(max(1, limit), PROGRESS_MAX_PAGE_SIZE)
+
+        rows, next_cursor = progress_page(progress_query, cursor, limit)
+
         # Prepare response
         response_data = {
             "success": True,
-            "total_students": total_students,
-            "avg_completion": avg_completion,
-            "students_on_track": students_on_track,
-            "students_at_risk": students_at_risk,
-            "progress_data": progress_data
+            "progress_data": [serialize_progress(progress) for progress in rows],
+            "next_cursor": "%d:%d" % next_cursor if next_cursor else None,
         }
+        if not cursor:
+            response_data.update(progress_metrics(progress_query))
         
         return JsonResponse(response_data)
         
@@ -1794,7 +1739,7 @@ def get_progress(request, progress_id):
     """API endpoint to get details of a specific student progress record"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can access progress data."})
 
         # Get the HOD's course
@@ -1848,7 +1793,7 @@ def edit_progress(request, progress_id):
     """API endpoint to update a student progress record"""
     try:
         # Check if user is a HOD
-        if not request.user.groups.filter(name="HOD").exists():
+        if not user_in_group(request.user, "HOD"):
             return JsonResponse({"success": False, "message": "Only HODs can update progress data."})
 
         # Get the HOD's course
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app.attendance import rebuild_attendance_streaks
+
+
+class Command(BaseCommand):
+    help = 'Compute attendance streaks for every student from attendance records'
+
+    def handle(self, *args, **options):
+        total = rebuild_attendance_streaks()
+        self.stdout.write(self.style.SUCCESS(f'Backfilled attendance streaks for {total} students'))
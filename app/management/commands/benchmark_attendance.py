@@ -0,0 +1,97 @@
+from datetime import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from app.attendance import record_attendance
+from app.models import Course, Routine, Staff, Student, Subject
+
+
+def logical_statements(queries):
+    """
+    Count queries, treating consecutive chunks of one bulk write as one statement
+
+    Backends split large bulk inserts into several queries when they hit
+    their parameter limit (SQLite allows 999), which is not per-row work.
+    """
+    count = 0
+    previous = None
+    for query in queries.captured_queries:
+        head = query['sql'].split(' VALUES ')[0] if ' VALUES ' in query['sql'] else query['sql']
+        if head != previous or not head.startswith('INSERT'):
+            count += 1
+        previous = head
+    return count
+
+
+class Command(BaseCommand):
+    help = 'Measure the query cost of saving attendance for growing class sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 120, 300],
+            help='Class sizes to benchmark'
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(set(options['sizes']))
+        results = []
+
+        # Everything is rolled back so the benchmark never touches real data
+        with transaction.atomic():
+            routine, teacher = self._create_routine()
+            for offset, size in enumerate(sizes):
+                student_ids = self._create_students(routine.course, size, offset)
+                marks = {student_id: index % 3 != 0 for index, student_id in enumerate(student_ids)}
+                attendance_date = timezone.now().date() - timezone.timedelta(days=offset)
+
+                # First submission inserts, the second one updates every record
+                for label in ('insert', 'update'):
+                    with CaptureQueriesContext(connection) as queries:
+                        _, written = record_attendance(
+                            routine, teacher, attendance_date, True, True, marks
+                        )
+                    results.append((size, label, written, len(queries), logical_statements(queries)))
+                    marks = {student_id: not attended for student_id, attended in marks.items()}
+
+            transaction.set_rollback(True)
+
+        for size, label, written, query_count, statements in results:
+            self.stdout.write(
+                f'{size:>6} students  {label:<6}  {written:>6} records  '
+                f'{query_count:>3} queries  {statements:>3} statements'
+            )
+
+        for label in ('insert', 'update'):
+            counts = {statements for _, run, _, _, statements in results if run == label}
+            if len(counts) > 1:
+                raise CommandError(f'Statement count for {label} grows with class size: {sorted(counts)}')
+
+        self.stdout.write(self.style.SUCCESS('Attendance query cost is constant across class sizes'))
+
+    def _create_routine(self):
+        course = Course.objects.create(name='Benchmark Course', duration=4, duration_type='Year')
+        subject = Subject.objects.create(name='Benchmark Subject', course=course, period_or_year=1)
+        teacher = Staff.objects.create(
+            name='Benchmark Teacher', phone='9700000000', gender='Male', designation='Teacher'
+        )
+        routine = Routine.objects.create(
+            course=course, subject=subject, teacher=teacher,
+            start_time=time(7, 0), end_time=time(8, 0), period_or_year=1
+        )
+        return routine, teacher
+
+    def _create_students(self, course, size, offset):
+        students = Student.objects.bulk_create([
+            Student(
+                name=f'Benchmark Student {offset}-{index}',
+                phone=f'98{offset:02d}{index:06d}',
+                course=course,
+                current_period=1,
+                status='Active',
+            )
+            for index in range(size)
+        ])
+        return [student.id for student in students]
@@ -0,0 +1,253 @@
+import json
+import time
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from app.metrics import percentile
+from app.models import Parent, Routine, Staff, Student
+
+# Baseline written by --save-baseline and compared against on later runs
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'endpoints.json'
+
+# Options that shape the measurements, a baseline only compares to runs with the same ones
+DATASET_OPTIONS = ('students', 'attendance_records', 'requests', 'seed', 'fast_hasher')
+
+# Median latency growth below this is treated as noise whatever the threshold
+LATENCY_NOISE_MS = 5
+
+# Student password set by generate_fake_data, used to drive the login view
+STUDENT_PASSWORD = 'student123'
+
+AUTH_BACKEND = 'app.backends.MultiModelBackend'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot endpoints against a generated dataset and compare with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help='Students in the generated dataset')
+        parser.add_argument(
+            '--attendance-records', type=int, default=100000,
+            help='Attendance records in the generated dataset'
+        )
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--seed', type=int, default=1, help='Seed of the generated dataset')
+        parser.add_argument(
+            '--fast-hasher', action='store_true',
+            help='Use a cheap password hasher so login measures lookup cost instead of hashing cost'
+        )
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline JSON file')
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Write the results as the new baseline instead of comparing against it'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.5,
+            help='Allowed relative growth of median latency and peak memory before failing'
+        )
+
+    def handle(self, *args, **options):
+        if options['fast_hasher']:
+            with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+                results = self._run(options)
+        else:
+            results = self._run(options)
+
+        self._report(results)
+
+        baseline_path = Path(options['baseline'])
+        dataset = {option: options[option] for option in DATASET_OPTIONS}
+        if options['save_baseline'] or not baseline_path.exists():
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({'dataset': dataset, 'endpoints': results}, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        if baseline['dataset'] != dataset:
+            raise CommandError(
+                f'{baseline_path} was recorded with {baseline["dataset"]}, '
+                f'rerun with the same options or pass --save-baseline'
+            )
+
+        regressions = self._compare(baseline['endpoints'], results, options['threshold'])
+        if regressions:
+            raise CommandError('Performance regressed:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
+
+    def _run(self, options):
+        """Generate the dataset in a throwaway test database and measure every endpoint"""
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            self.stdout.write('Generating dataset...')
+            call_command(
+                'generate_fake_data', '--scale',
+                '--students', str(options['students']),
+                '--attendance-records', str(options['attendance_records']),
+                '--seed', str(options['seed']),
+                stdout=StringIO(),
+            )
+            return {
+                name: self._measure(client, request, max(1, options['requests']))
+                for name, client, request in self._endpoints()
+            }
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    def _endpoints(self):
+        """
+        Pick representative users and describe the requests to benchmark
+
+        Returns:
+            list: (name, client, request) tuples, where ``request(client, i)``
+            sends the i-th request and returns the response
+        """
+        # HOD and teacher with the most students, student with a course, parent with the most children
+        hod = Staff.objects.filter(designation='HOD', course__isnull=False).annotate(
+            size=Count('course__students')
+        ).order_by('-size').first()
+        routine = Routine.objects.annotate(size=Count('course__students')).order_by('-size').first()
+        teacher = routine.teacher
+        student = Student.objects.filter(status='Active').first()
+        parent = Parent.objects.annotate(children=Count('students')).order_by('-children').first()
+        attendance_students = list(Student.objects.filter(
+            course_id=routine.course_id, current_period=routine.period_or_year
+        ).values_list('id', flat=True))
+        today = timezone.now().date()
+
+        clients = {}
+        for role, user in (('hod', hod), ('teacher', teacher), ('student', student), ('parent', parent)):
+            clients[role] = Client()
+            clients[role].force_login(user, backend=AUTH_BACKEND)
+
+        def get(url):
+            return lambda client, i: client.get(url, secure=True)
+
+        def save_attendance(client, i):
+            # A new session per request, on the days after the generated history
+            data = {
+                'routine_id': routine.id,
+                'date': (today + timedelta(days=1 + i)).isoformat(),
+                'class_status': 'True',
+                'teacher_attend': 'on',
+            }
+            data.update({f'student_{student_id}': 'on' for student_id in attendance_students[i % 2::2]})
+            return client.post(reverse('save_attendance'), data, secure=True)
+
+        def add_notice(client, i):
+            data = {'title': f'Benchmark notice {i}', 'message': 'Benchmark notice body'}
+            return client.post(reverse('hod_add_notice'), data, secure=True)
+
+        def login(client, i):
+            data = {'username': student.phone, 'password': STUDENT_PASSWORD}
+            return client.post(reverse('login'), data, secure=True)
+
+        return [
+            ('hod_dashboard', clients['hod'], get(reverse('hodDashboard'))),
+            ('teacher_dashboard', clients['teacher'], get(reverse('teacherDashboard'))),
+            ('student_dashboard', clients['student'], get(reverse('studentDashboard'))),
+            ('parent_dashboard', clients['parent'], get(reverse('parentDashboard'))),
+            ('save_attendance', clients['teacher'], save_attendance),
+            ('student_progress', clients['hod'], get(reverse('get_student_progress'))),
+            ('login', Client(), login),
+            ('add_notice', clients['hod'], add_notice),
+        ]
+
+    def _measure(self, client, request, count):
+        """
+        Time ``count`` requests after one cold request, then measure peak memory of one more
+
+        Memory is traced on a separate request because tracemalloc slows
+        down the timed ones.
+        """
+        # The client resets the query log when a request starts, so every
+        # capture starts from an empty log and is counted before the next one
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            self._check(request(client, 0))
+        cold_queries = len(captured)
+
+        latencies, queries = [], []
+        for i in range(1, count + 1):
+            reset_queries()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                self._check(request(client, i))
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        tracemalloc.start()
+        try:
+            request(client, count + 1)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        latencies.sort()
+        return {
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries': max(queries),
+            'cold_queries': cold_queries,
+            'peak_kib': round(peak / 1024),
+        }
+
+    def _check(self, response):
+        if response.status_code >= 400:
+            raise CommandError(f'{response.request["PATH_INFO"]} answered {response.status_code}')
+
+    def _report(self, results):
+        self.stdout.write(
+            f'{"endpoint":<20} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+            f'{"queries":>8} {"cold":>6} {"peak KiB":>9}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<20} {result["p50_ms"]:>8} {result["p95_ms"]:>8} {result["p99_ms"]:>8} '
+                f'{result["queries"]:>8} {result["cold_queries"]:>6} {result["peak_kib"]:>9}'
+            )
+
+    def _compare(self, baseline, results, threshold):
+        """
+        List the measurements that got worse than the baseline
+
+        Query counts are deterministic for a seeded dataset and must not
+        grow at all. Median latency and peak memory may grow by
+        ``threshold`` (relative) before they count as a regression, latency
+        also by at least ``LATENCY_NOISE_MS``.
+        """
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            for key in ('queries', 'cold_queries'):
+                if result[key] > before[key]:
+                    regressions.append(f'{name}: {key} {before[key]} -> {result[key]}')
+            if result['p50_ms'] > max(before['p50_ms'] * (1 + threshold), before['p50_ms'] + LATENCY_NOISE_MS):
+                regressions.append(f'{name}: p50_ms {before["p50_ms"]} -> {result["p50_ms"]}')
+            if result['peak_kib'] > before['peak_kib'] * (1 + threshold):
+                regressions.append(f'{name}: peak_kib {before["peak_kib"]} -> {result["peak_kib"]}')
+        return regressions
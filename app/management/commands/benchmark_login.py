@@ -0,0 +1,68 @@
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from app.models import LoginIdentifier, Staff, Student
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput under a burst of failed logins'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, default=5000, help='Number of student and staff accounts')
+        parser.add_argument('--attempts', type=int, default=50, help='Number of failed logins to attempt')
+        parser.add_argument(
+            '--fast-hasher', action='store_true',
+            help='Use a cheap password hasher to measure lookup cost instead of hashing cost'
+        )
+
+    def handle(self, *args, **options):
+        if options['fast_hasher']:
+            with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+                return self._run(options)
+        return self._run(options)
+
+    def _run(self, options):
+        accounts = max(2, options['accounts'])
+        attempts = max(2, options['attempts'])
+
+        # Everything is rolled back so the benchmark never touches real accounts
+        with transaction.atomic():
+            password = make_password('benchmark-password')
+            students = Student.objects.bulk_create([
+                Student(name=f'Benchmark Student {i}', phone=f'98{i:08d}',
+                        email=f'student{i}@benchmark.test', password=password)
+                for i in range(accounts // 2)
+            ])
+            staff = Staff.objects.bulk_create([
+                Staff(name=f'Benchmark Staff {i}', phone=f'97{i:08d}',
+                      email=f'staff{i}@benchmark.test', password=password)
+                for i in range(accounts - accounts // 2)
+            ])
+            LoginIdentifier.objects.bulk_create(
+                [row for user in students + staff for row in LoginIdentifier.build_rows(user)],
+                batch_size=1000,
+            )
+
+            # Half unknown usernames, half known accounts with a wrong password
+            usernames = [
+                f'96{i:08d}' if i % 2 else f'student{i % len(students)}@benchmark.test'
+                for i in range(attempts)
+            ]
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for username in usernames:
+                    authenticate(None, username=username, password='wrong-password')
+                elapsed = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'Accounts:          {accounts}')
+        self.stdout.write(f'Failed logins:     {attempts}')
+        self.stdout.write(f'Queries per login: {len(queries) / attempts:.1f}')
+        self.stdout.write(f'Elapsed:           {elapsed:.2f}s ({attempts / elapsed:.0f} logins/s)')
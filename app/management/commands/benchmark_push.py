@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.firebase import FakeMessaging, FCMDevice, send_push_notification
+
+
+class Command(BaseCommand):
+    help = 'Measure push notification throughput against an offline FCM stub'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--devices', type=int, default=2000, help='Number of device tokens to notify')
+        parser.add_argument('--dead', type=int, default=50, help='How many of the tokens are unregistered')
+        parser.add_argument('--latency', type=float, default=0.2, help='Simulated seconds per multicast request')
+
+    def handle(self, *args, **options):
+        devices = max(1, options['devices'])
+        dead = min(devices, max(0, options['dead']))
+        client = FakeMessaging(latency=options['latency'])
+
+        # Everything is rolled back so the benchmark never touches real devices
+        with transaction.atomic():
+            tokens = [f'dead-benchmark-{i}' for i in range(dead)]
+            tokens += [f'benchmark-{i}' for i in range(devices - dead)]
+            FCMDevice.objects.bulk_create([FCMDevice(token=token) for token in tokens])
+
+            started = time.perf_counter()
+            success, failure, failed_tokens, deferred_tokens = send_push_notification(
+                'Benchmark', 'Benchmark notification', tokens, client=client
+            )
+            elapsed = time.perf_counter() - started
+            deactivated = FCMDevice.objects.filter(token__in=tokens, is_active=False).count()
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'Devices:      {devices}')
+        self.stdout.write(f'Requests:     {client.calls}')
+        self.stdout.write(f'Delivered:    {success}')
+        self.stdout.write(f'Failed:       {failure}')
+        self.stdout.write(f'Deferred:     {len(deferred_tokens)} (over the FCM quota)')
+        self.stdout.write(f'Deactivated:  {deactivated}')
+        self.stdout.write(f'Elapsed:      {elapsed:.2f}s ({devices / elapsed:.0f} notifications/s)')
@@ -1,11 +1,18 @@
 import random
-from datetime import datetime, timedelta
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 import pytz
-from django.core.management.base import BaseCommand
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Group
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from faker import Faker
+from app.attendance import rebuild_attendance_streaks, rebuild_attendance_summaries
+from app.fragment_cache import FRAGMENT_DEPENDENCIES, bump_fragment_versions
 from app.models import (
     Institute, Batch, Course, Subject, Staff, Student, Parent,
     Routine, Attendance, AttendanceRecord, Notice,
@@ -47,26 +54,124 @@ NEPALI_CITIES = [
     'Butwal', 'Hetauda', 'Dhangadhi', 'Nepalgunj', 'Itahari', 'Damak', 'Siddharthanagar'
 ]
 
+COURSE_NAMES = [
+    'Computer Science Engineering', 
+    'Electrical Engineering', 
+    'Mechanical Engineering',
+    'Civil Engineering',
+    'Chemical Engineering',
+    'Electronics Engineering',
+    'Information Technology',
+    'Aerospace Engineering',
+    'Biotechnology Engineering',
+    'Data Science'
+]
+
+SUBJECT_NAMES = {
+    'Computer Science Engineering': [
+        'Data Structures', 'Algorithms', 'Database Systems', 'Operating Systems',
+        'Computer Networks', 'Software Engineering', 'Web Development', 'AI and Machine Learning',
+        'Computer Architecture', 'Compiler Design', 'Computer Graphics', 'Cloud Computing'
+    ],
+    'Electrical Engineering': [
+        'Circuit Theory', 'Electrical Machines', 'Power Systems', 'Control Systems',
+        'Digital Electronics', 'Microprocessors', 'Power Electronics', 'Electrical Measurements',
+        'Renewable Energy', 'Smart Grid', 'High Voltage Engineering', 'Power System Protection'
+    ],
+    'Mechanical Engineering': [
+        'Thermodynamics', 'Fluid Mechanics', 'Manufacturing Processes', 'Machine Design',
+        'Heat Transfer', 'Engineering Mechanics', 'Automobile Engineering', 'Materials Science',
+        'Robotics', 'CAD/CAM', 'Industrial Engineering', 'Refrigeration and Air Conditioning'
+    ],
+    'Information Technology': [
+        'Programming Fundamentals', 'Data Structures', 'Database Management', 'Web Technologies',
+        'Computer Networks', 'Software Engineering', 'Cybersecurity', 'Cloud Computing',
+        'Mobile Application Development', 'Big Data Analytics', 'IoT', 'Blockchain Technology'
+    ],
+    'Data Science': [
+        'Statistical Methods', 'Machine Learning', 'Data Mining', 'Big Data Analytics',
+        'Data Visualization', 'Deep Learning', 'Natural Language Processing', 'Time Series Analysis',
+        'Business Intelligence', 'Predictive Analytics', 'Data Warehousing', 'Data Engineering'
+    ]
+}
+
+# Generic subjects for courses not explicitly defined
+GENERIC_SUBJECTS = [
+    'Mathematics I', 'Mathematics II', 'Physics', 'Chemistry',
+    'Technical Writing', 'Engineering Ethics', 'Project Management', 'Research Methods',
+    'Environmental Science', 'Economics', 'Management', 'Communication Skills'
+]
+
+# Class time slots of a day, one subject per slot
+TIME_SLOTS = [
+    ('09:00', '10:00'),
+    ('10:15', '11:15'),
+    ('11:30', '12:30'),
+    ('13:30', '14:30'),
+    ('14:45', '15:45'),
+    ('16:00', '17:00')
+]
+
+# Days a student spends in one period of a course, by duration type
+PERIOD_DAYS = {'Semester': 182, 'Year': 365}
+
+# Model signals muted while --scale inserts in bulk
+MODEL_SIGNALS = (pre_save, post_save, pre_delete, post_delete, m2m_changed)
+
+
+@contextmanager
+def suppressed_signals(*signals):
+    """
+    Disconnect every receiver of the given signals for the duration of the block
+
+    With no delete receivers left, ``QuerySet.delete()`` also switches to
+    plain bulk deletes instead of loading and deleting objects one by one.
+    """
+    saved = [(signal, signal.receivers) for signal in signals]
+    for signal in signals:
+        signal.receivers = []
+        signal.sender_receivers_cache.clear()
+    try:
+        yield
+    finally:
+        for signal, receivers in saved:
+            signal.receivers = receivers
+            signal.sender_receivers_cache.clear()
+
+
 class Command(BaseCommand):
     help = 'Generate fake data for testing the SMS application'
 
     def add_arguments(self, parser):
-        parser.add_argument('--students', type=int, default=50, help='Number of students to create')
-        parser.add_argument('--staff', type=int, default=20, help='Number of staff members to create')
-        parser.add_argument('--parents', type=int, default=40, help='Number of parents to create')
-        parser.add_argument('--courses', type=int, default=5, help='Number of courses to create')
+        parser.add_argument('--students', type=int, help='Number of students to create (default: 50, 50000 with --scale)')
+        parser.add_argument('--staff', type=int, help='Number of staff members to create (default: 20, one per 40 students with --scale)')
+        parser.add_argument('--parents', type=int, default=40, help='Number of parents to create (ignored with --scale, which creates one family per one or two students)')
+        parser.add_argument('--courses', type=int, help='Number of courses to create (default: 5, 10 with --scale)')
         parser.add_argument('--subjects', type=int, default=4, help='Subjects per course')
         parser.add_argument('--clear', action='store_true', help='Clear existing data before generating new data')
+        parser.add_argument('--scale', action='store_true', help='Generate a large institute with bulk inserts and signals suppressed')
+        parser.add_argument('--years', type=int, default=5, help='Years of batches and attendance history to generate with --scale')
+        parser.add_argument('--attendance-records', type=int, default=2000000, help='Approximate number of attendance records to generate with --scale')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert with --scale')
+        parser.add_argument('--seed', type=int, help='Seed the random generators for a reproducible dataset')
 
     @transaction.atomic
     def handle(self, *args, **options):
         fake = Faker()
+
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+            Faker.seed(options['seed'])
+
+        if options['scale']:
+            self._generate_scale(fake, options)
+            return
         
         # Get parameters
-        num_students = max(10, options['students'])  # Ensure minimum of 10 students
-        num_staff = max(5, options['staff'])  # Ensure minimum of 5 staff
+        num_students = max(10, options['students'] or 50)  # Ensure minimum of 10 students
+        num_staff = max(5, options['staff'] or 20)  # Ensure minimum of 5 staff
         num_parents = max(8, options['parents'])  # Ensure minimum of 8 parents
-        num_courses = max(3, options['courses'])  # Ensure minimum of 3 courses
+        num_courses = max(3, options['courses'] or 5)  # Ensure minimum of 3 courses
         subjects_per_course = max(3, options['subjects'])  # Ensure minimum of 3 subjects per course
         clear_data = options['clear']
         
@@ -79,38 +184,7 @@ class Command(BaseCommand):
         
         # Clear existing data if requested
         if clear_data:
-            self.stdout.write(self.style.WARNING('Clearing existing data...'))
-            TeacherParentMeeting.objects.all().delete()
-            ParentInstituteFeedback.objects.all().delete()
-            StaffInstituteFeedback.objects.all().delete()
-            InstituteFeedback.objects.all().delete()
-            ParentFeedback.objects.all().delete()
-            StudentFeedback.objects.all().delete()
-            StudentLeave.objects.all().delete()
-            StaffLeave.objects.all().delete()
-            Notice.objects.all().delete()
-            AttendanceRecord.objects.all().delete()
-            Attendance.objects.all().delete()
-            Routine.objects.all().delete()
-            SubjectFile.objects.all().delete()
-            CourseTracking.objects.all().delete()
-            
-            # Clear many-to-many relationships before deleting models
-            for parent in Parent.objects.all():
-                parent.students.clear()
-            
-            for student in Student.objects.all():
-                student.batches.clear()
-            
-            Subject.objects.all().delete()
-            Parent.objects.all().delete()
-            Student.objects.all().delete()
-            Staff.objects.all().delete()
-            Course.objects.all().delete()
-            Batch.objects.all().delete()
-            Institute.objects.all().delete()
-            
-            self.stdout.write(self.style.SUCCESS('Data cleared successfully'))
+            self._clear_data()
         
         # Create Institute
         institute = self._create_institute(fake)
@@ -159,6 +233,48 @@ class Command(BaseCommand):
         
         self.stdout.write(self.style.SUCCESS('Successfully generated fake data!'))
     
+    def _clear_data(self, clear_relations=True):
+        """
+        Delete previously generated data
+
+        Args:
+            clear_relations: Clear parent and batch links one object at a time
+                first, so their m2m signals fire (skipped with --scale)
+        """
+        self.stdout.write(self.style.WARNING('Clearing existing data...'))
+        TeacherParentMeeting.objects.all().delete()
+        ParentInstituteFeedback.objects.all().delete()
+        StaffInstituteFeedback.objects.all().delete()
+        InstituteFeedback.objects.all().delete()
+        ParentFeedback.objects.all().delete()
+        StudentFeedback.objects.all().delete()
+        StudentLeave.objects.all().delete()
+        StaffLeave.objects.all().delete()
+        Notice.objects.all().delete()
+        AttendanceRecord.objects.all().delete()
+        Attendance.objects.all().delete()
+        Routine.objects.all().delete()
+        SubjectFile.objects.all().delete()
+        CourseTracking.objects.all().delete()
+        
+        # Clear many-to-many relationships before deleting models
+        if clear_relations:
+            for parent in Parent.objects.all():
+                parent.students.clear()
+            
+            for student in Student.objects.all():
+                student.batches.clear()
+        
+        Subject.objects.all().delete()
+        Parent.objects.all().delete()
+        Student.objects.all().delete()
+        Staff.objects.all().delete()
+        Course.objects.all().delete()
+        Batch.objects.all().delete()
+        Institute.objects.all().delete()
+        
+        self.stdout.write(self.style.SUCCESS('Data cleared successfully'))
+
     def _get_nepali_name(self):
         return f"{random.choice(NEPALI_FIRST_NAMES)} {random.choice(NEPALI_LAST_NAMES)}"
 
@@ -220,28 +336,16 @@ class Command(BaseCommand):
     
     def _create_courses(self, fake, num_courses):
         courses = []
-        course_names = [
-            'Computer Science Engineering', 
-            'Electrical Engineering', 
-            'Mechanical Engineering',
-            'Civil Engineering',
-            'Chemical Engineering',
-            'Electronics Engineering',
-            'Information Technology',
-            'Aerospace Engineering',
-            'Biotechnology Engineering',
-            'Data Science'
-        ]
         
         # Ensure we don't try to create more courses than we have names for
-        num_to_create = min(num_courses, len(course_names))
+        num_to_create = min(num_courses, len(COURSE_NAMES))
         
         for i in range(num_to_create):
             duration = random.choice([3, 4])
             duration_type = random.choice(['Year', 'Semester'])
             
             course, created = Course.objects.get_or_create(
-                name=course_names[i],
+                name=COURSE_NAMES[i],
                 defaults={
                     'duration': duration,
                     'duration_type': duration_type
@@ -256,47 +360,12 @@ class Command(BaseCommand):
     def _create_subjects(self, fake, courses, subjects_per_course):
         subjects = []  # Initialize subjects list
         
-        subject_names = {
-            'Computer Science Engineering': [
-                'Data Structures', 'Algorithms', 'Database Systems', 'Operating Systems',
-                'Computer Networks', 'Software Engineering', 'Web Development', 'AI and Machine Learning',
-                'Computer Architecture', 'Compiler Design', 'Computer Graphics', 'Cloud Computing'
-            ],
-            'Electrical Engineering': [
-                'Circuit Theory', 'Electrical Machines', 'Power Systems', 'Control Systems',
-                'Digital Electronics', 'Microprocessors', 'Power Electronics', 'Electrical Measurements',
-                'Renewable Energy', 'Smart Grid', 'High Voltage Engineering', 'Power System Protection'
-            ],
-            'Mechanical Engineering': [
-                'Thermodynamics', 'Fluid Mechanics', 'Manufacturing Processes', 'Machine Design',
-                'Heat Transfer', 'Engineering Mechanics', 'Automobile Engineering', 'Materials Science',
-                'Robotics', 'CAD/CAM', 'Industrial Engineering', 'Refrigeration and Air Conditioning'
-            ],
-            'Information Technology': [
-                'Programming Fundamentals', 'Data Structures', 'Database Management', 'Web Technologies',
-                'Computer Networks', 'Software Engineering', 'Cybersecurity', 'Cloud Computing',
-                'Mobile Application Development', 'Big Data Analytics', 'IoT', 'Blockchain Technology'
-            ],
-            'Data Science': [
-                'Statistical Methods', 'Machine Learning', 'Data Mining', 'Big Data Analytics',
-                'Data Visualization', 'Deep Learning', 'Natural Language Processing', 'Time Series Analysis',
-                'Business Intelligence', 'Predictive Analytics', 'Data Warehousing', 'Data Engineering'
-            ]
-        }
-        
-        # Add generic subjects for courses not explicitly defined
-        generic_subjects = [
-            'Mathematics I', 'Mathematics II', 'Physics', 'Chemistry',
-            'Technical Writing', 'Engineering Ethics', 'Project Management', 'Research Methods',
-            'Environmental Science', 'Economics', 'Management', 'Communication Skills'
-        ]
-        
         for course in courses:
             # Get subject list for this course or use generic subjects
-            if course.name in subject_names:
-                course_subject_names = subject_names[course.name]
+            if course.name in SUBJECT_NAMES:
+                course_subject_names = SUBJECT_NAMES[course.name]
             else:
-                course_subject_names = generic_subjects
+                course_subject_names = GENERIC_SUBJECTS
             
             max_year_or_sem = course.duration
             if course.duration_type == 'Semester':
@@ -318,7 +387,7 @@ class Command(BaseCommand):
                 if len(available_subjects) < num_subjects:
                     # If not enough unique subjects, add some from generic subjects
                     available_subjects.extend([
-                        s for s in generic_subjects 
+                        s for s in GENERIC_SUBJECTS 
                         if s not in available_subjects and not Subject.objects.filter(
                             course=course,
                             name=s,
@@ -519,14 +588,6 @@ class Command(BaseCommand):
     def _create_routines(self, courses, subjects, staff_members):
         routines = []
         days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        time_slots = [
-            ('09:00', '10:00'),
-            ('10:15', '11:15'),
-            ('11:30', '12:30'),
-            ('13:30', '14:30'),
-            ('14:45', '15:45'),
-            ('16:00', '17:00')
-        ]
         
         # Create a schedule for each course and semester
         for course in courses:
@@ -556,7 +617,7 @@ class Command(BaseCommand):
                 # Create routine for each day
                 for day in days_of_week:
                     # Shuffle time slots for variety
-                    shuffled_slots = time_slots.copy()
+                    shuffled_slots = TIME_SLOTS.copy()
                     random.shuffle(shuffled_slots)
                     
                     # Assign subjects to time slots
@@ -979,3 +1040,483 @@ class Command(BaseCommand):
                 except Exception as e:
                     self.stdout.write(self.style.ERROR(f'Error creating course tracking for student {student.name}: {str(e)}'))
                     continue
+
+    # ------------------------------------------------------------------
+    # Scale Mode
+    # ------------------------------------------------------------------
+
+    def _generate_scale(self, fake, options):
+        """
+        Generate a large institute with bulk inserts
+
+        Every model signal is suppressed while rows are inserted, so nothing
+        the signals normally maintain per row (course trackings, parents,
+        login identifiers, attendance summaries and streaks, cached
+        fragments) is touched. Trackings and parents are built alongside the
+        students, and a single consistency pass derives the rest at the end.
+        """
+        num_students = max(10, options['students'] or 50000)
+        num_staff = max(5, options['staff'] or num_students // 40)
+        num_courses = max(1, min(options['courses'] or len(COURSE_NAMES), len(COURSE_NAMES)))
+        subjects_per_period = max(1, min(options['subjects'], len(TIME_SLOTS)))
+        years = max(1, options['years'])
+        batch_size = max(1, options['batch_size'])
+
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError(
+                '--scale needs a database that returns primary keys from bulk inserts '
+                '(PostgreSQL, SQLite 3.35+ or MariaDB 10.5+)'
+            )
+        if not options['clear'] and Course.objects.exists():
+            raise CommandError('--scale generates a whole institute, run it on an empty database or pass --clear')
+
+        started = time.monotonic()
+        with suppressed_signals(*MODEL_SIGNALS):
+            if options['clear']:
+                self._clear_data(clear_relations=False)
+
+            groups = {
+                name: Group.objects.get_or_create(name=name)[0]
+                for name in ('Teacher', 'HOD', 'Admission Officer', 'Parent', 'Student')
+            }
+            texts = [fake.paragraph() for _ in range(200)]
+            phones = self._phone_numbers()
+
+            self._create_institute(fake)
+            batches = self._scale_batches(years)
+            courses = self._scale_courses(num_courses, batches)
+            subjects = self._scale_subjects(courses, subjects_per_period, batch_size)
+            staff_members = self._scale_staff(num_staff, courses, phones, groups, batch_size)
+            students, families = self._scale_students(num_students, courses, batches, phones, groups, batch_size)
+            parents = self._scale_parents(families, groups, batch_size)
+            self._scale_course_tracking(students, batch_size)
+            routines = self._scale_routines(courses, subjects, staff_members, batch_size)
+            self._scale_attendance(students, batches, courses, routines, options['attendance_records'], batch_size)
+            self._scale_activity(fake, texts, years, students, staff_members, parents, routines, batch_size)
+
+        self._consistency_pass()
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(students)} students, {len(parents)} parents and {len(staff_members)} staff '
+            f'in {time.monotonic() - started:.0f}s'
+        ))
+
+    def _phone_numbers(self):
+        """Yield unique Nepali phone numbers without querying the database for each one"""
+        taken = set()
+        for model in (Student, Staff, Parent):
+            taken.update(model.objects.exclude(phone__isnull=True).values_list('phone', flat=True))
+
+        number = 9800000000 + random.randint(0, 1000000)
+        while True:
+            number += random.randint(1, 50)
+            phone = str(number)
+            if phone not in taken:
+                yield phone
+
+    def _period_count(self, course):
+        """Number of semesters or years in a course"""
+        return course.duration * 2 if course.duration_type == 'Semester' else course.duration
+
+    def _period_on(self, course, joining_date, day):
+        """Period a student who joined on ``joining_date`` is in on ``day``, None outside the course"""
+        if day < joining_date:
+            return None
+        period = (day - joining_date).days // PERIOD_DAYS[course.duration_type] + 1
+        return period if period <= self._period_count(course) else None
+
+    def _scale_batches(self, years):
+        current_year = date.today().year
+        names = {f'Batch {year}': year for year in range(current_year - years + 1, current_year + 1)}
+        existing = set(Batch.objects.filter(name__in=names).values_list('name', flat=True))
+        Batch.objects.bulk_create([
+            Batch(name=name, year=date(year, 1, 1))
+            for name, year in names.items() if name not in existing
+        ])
+        batches = list(Batch.objects.filter(name__in=names, year__isnull=False).order_by('year'))
+        self.stdout.write(f'Batches: {len(batches)}')
+        return batches
+
+    def _scale_courses(self, num_courses, batches):
+        courses = [
+            Course(
+                name=name,
+                code=''.join(word[0] for word in name.split()),
+                duration=random.choice([3, 4]),
+                duration_type=random.choice(['Year', 'Semester'])
+            )
+            for name in COURSE_NAMES[:num_courses]
+        ]
+        Course.objects.bulk_create(courses)
+
+        CourseBatch = Course.batches.through
+        CourseBatch.objects.bulk_create([
+            CourseBatch(course_id=course.id, batch_id=batch.id) for course in courses for batch in batches
+        ])
+        self.stdout.write(f'Courses: {len(courses)}')
+        return courses
+
+    def _scale_subjects(self, courses, subjects_per_period, batch_size):
+        subjects = []
+        for course in courses:
+            names = SUBJECT_NAMES.get(course.name, GENERIC_SUBJECTS)
+            for period in range(1, self._period_count(course) + 1):
+                for index, name in enumerate(random.sample(names, min(subjects_per_period, len(names)))):
+                    subjects.append(Subject(
+                        name=name,
+                        code=f'{course.code}{period}{index + 1:02d}',
+                        course=course,
+                        period_or_year=period
+                    ))
+        Subject.objects.bulk_create(subjects, batch_size=batch_size)
+        self.stdout.write(f'Subjects: {len(subjects)}')
+        return subjects
+
+    def _scale_staff(self, num_staff, courses, phones, groups, batch_size):
+        passwords = {
+            'HOD': make_password('hod1234'),
+            'Admission Officer': make_password('admissionofficer123'),
+            'Teacher': make_password('staff123'),
+        }
+        num_hods = min(len(courses), max(1, num_staff // 10))
+        num_officers = max(1, num_staff // 50)
+
+        staff_members = []
+        for index in range(num_staff):
+            if index < num_hods:
+                designation = 'HOD'
+            elif index < num_hods + num_officers:
+                designation = 'Admission Officer'
+            else:
+                designation = 'Teacher'
+            city = random.choice(NEPALI_CITIES)
+            joining_date = date.today() - timedelta(days=random.randint(30, 3650))
+            staff_members.append(Staff(
+                name=self._get_nepali_name(),
+                phone=next(phones),
+                password=passwords[designation],
+                designation=designation,
+                course=courses[index] if designation == 'HOD' else None,
+                gender=random.choice(['Male', 'Female']),
+                birth_date=joining_date - timedelta(days=random.randint(25 * 365, 50 * 365)),
+                email=f'staff{index + 1}@example.com',
+                temporary_address=self._get_nepali_address(city),
+                permanent_address=self._get_nepali_address(city),
+                marital_status=random.choice(['Married', 'Unmarried']),
+                citizenship_no=f"{random.randint(10000, 99999)}-{random.randint(10000, 99999)}",
+                joining_date=joining_date
+            ))
+        Staff.objects.bulk_create(staff_members, batch_size=batch_size)
+
+        StaffGroup = Staff.groups.through
+        StaffGroup.objects.bulk_create([
+            StaffGroup(staff_id=staff.id, group_id=groups[staff.designation].id) for staff in staff_members
+        ], batch_size=batch_size)
+        self.stdout.write(f'Staff: {len(staff_members)} ({num_hods} HODs, {num_officers} admission officers)')
+        return staff_members
+
+    def _scale_students(self, num_students, courses, batches, phones, groups, batch_size):
+        """
+        Create students, enrolled in a batch and course, grouped into families
+
+        Students join on their batch's start date and are in the period that
+        date implies today; students past their last period have completed
+        the course. Each family of one or two siblings shares a parent, whose
+        name and phone are stored on the students as the admission form
+        would.
+
+        Returns:
+            tuple: Students, and a list of (parent, children) pairs with
+            unsaved parents
+        """
+        today = date.today()
+        password = make_password('student123')
+        students = []
+        for index in range(num_students):
+            course = random.choice(courses)
+            batch = random.choice(batches)
+            period = self._period_on(course, batch.year, today)
+            city = random.choice(NEPALI_CITIES)
+            student = Student(
+                name=self._get_nepali_name(),
+                email=f'student{index + 1}@example.com',
+                phone=next(phones),
+                password=password,
+                temporary_address=self._get_nepali_address(city),
+                permanent_address=self._get_nepali_address(city),
+                birth_date=batch.year - timedelta(days=random.randint(18 * 365, 25 * 365)),
+                gender=random.choice(['Male', 'Female', 'Other']),
+                marital_status='Unmarried',
+                course=course,
+                current_period=period or self._period_count(course),
+                joining_date=batch.year,
+                status='Completed' if period is None else random.choices(['Active', 'Leave'], weights=[0.97, 0.03])[0],
+                is_active=True
+            )
+            student.batch = batch
+            students.append(student)
+
+        parent_password = make_password('parent123')
+        families = []
+        siblings = students.copy()
+        random.shuffle(siblings)
+        while siblings:
+            children = [siblings.pop() for _ in range(min(len(siblings), random.choice([1, 1, 1, 2])))]
+            last_name = children[0].name.split()[-1]
+            parent = Parent(
+                name=f'{random.choice(NEPALI_FIRST_NAMES)} {last_name}',
+                phone=next(phones),
+                password=parent_password,
+                email=f'parent{len(families) + 1}@example.com',
+                address=children[0].permanent_address
+            )
+            for child in children:
+                child.name = f'{child.name.split()[0]} {last_name}'
+                child.parent_name = parent.name
+                child.parent_phone = parent.phone
+            families.append((parent, children))
+
+        Student.objects.bulk_create(students, batch_size=batch_size)
+
+        StudentBatch = Student.batches.through
+        StudentBatch.objects.bulk_create([
+            StudentBatch(student_id=student.id, batch_id=student.batch.id) for student in students
+        ], batch_size=batch_size)
+        StudentGroup = Student.groups.through
+        StudentGroup.objects.bulk_create([
+            StudentGroup(student_id=student.id, group_id=groups['Student'].id) for student in students
+        ], batch_size=batch_size)
+        self.stdout.write(f'Students: {len(students)}')
+        return students, families
+
+    def _scale_parents(self, families, groups, batch_size):
+        parents = [parent for parent, _ in families]
+        Parent.objects.bulk_create(parents, batch_size=batch_size)
+
+        ParentStudent = Parent.students.through
+        ParentStudent.objects.bulk_create([
+            ParentStudent(parent_id=parent.id, student_id=child.id)
+            for parent, children in families for child in children
+        ], batch_size=batch_size)
+        ParentGroup = Parent.groups.through
+        ParentGroup.objects.bulk_create([
+            ParentGroup(parent_id=parent.id, group_id=groups['Parent'].id) for parent in parents
+        ], batch_size=batch_size)
+        self.stdout.write(f'Parents: {len(parents)}')
+        return parents
+
+    def _scale_course_tracking(self, students, batch_size):
+        """Create the course tracking the student post_save signal would create"""
+        today = date.today()
+        trackings = []
+        for student in students:
+            course = student.course
+            period_days = PERIOD_DAYS[course.duration_type]
+            period_start_date = student.joining_date + timedelta(days=(student.current_period - 1) * period_days)
+            expected_end_date = student.joining_date + timedelta(days=course.duration * 365)
+            completed = student.status == 'Completed'
+            trackings.append(CourseTracking(
+                student_id=student.id,
+                course_id=course.id,
+                start_date=student.joining_date,
+                expected_end_date=expected_end_date,
+                actual_end_date=min(expected_end_date, today) if completed else None,
+                current_period=student.current_period,
+                period_start_date=period_start_date,
+                period_end_date=period_start_date + timedelta(days=period_days),
+                progress_status='Completed' if completed else 'In Progress',
+                completion_percentage=100 if completed else 0
+            ))
+        CourseTracking.objects.bulk_create(trackings, batch_size=batch_size)
+        self.stdout.write(f'Course trackings: {len(trackings)}')
+
+    def _scale_routines(self, courses, subjects, staff_members, batch_size):
+        """
+        Create one routine per subject, each subject of a period in its own time slot
+
+        Returns:
+            dict: Routines keyed by (course id, period)
+        """
+        teachers = [staff for staff in staff_members if staff.designation == 'Teacher']
+        random.shuffle(teachers)
+
+        routines = []
+        slots = {}
+        for index, subject in enumerate(subjects):
+            key = (subject.course_id, subject.period_or_year)
+            slots[key] = slots.get(key, -1) + 1
+            start_time, end_time = TIME_SLOTS[slots[key]]
+            routines.append(Routine(
+                course_id=subject.course_id,
+                subject=subject,
+                teacher=teachers[index % len(teachers)],
+                start_time=datetime.strptime(start_time, "%H:%M").time(),
+                end_time=datetime.strptime(end_time, "%H:%M").time(),
+                period_or_year=subject.period_or_year,
+                is_active=True
+            ))
+        Routine.objects.bulk_create(routines, batch_size=batch_size)
+
+        StaffCourse = Staff.courses_taught.through
+        StaffCourse.objects.bulk_create([
+            StaffCourse(staff_id=staff_id, course_id=course_id)
+            for staff_id, course_id in {(routine.teacher_id, routine.course_id) for routine in routines}
+        ], batch_size=batch_size)
+
+        routines_by_period = {}
+        for routine in routines:
+            routines_by_period.setdefault((routine.course_id, routine.period_or_year), []).append(routine)
+        self.stdout.write(f'Routines: {len(routines)}')
+        return routines_by_period
+
+    def _scale_attendance(self, students, batches, courses, routines, target, batch_size):
+        """
+        Create attendance sessions and records over the batches' history
+
+        On a class day every routine of a period is held for the students of
+        each batch that is in that period on that day. Class days are spread
+        evenly over the weekdays since the first batch started, as many as
+        it takes to land near ``target`` records.
+        """
+        cohorts = {}
+        for student in students:
+            cohorts.setdefault((student.course_id, student.batch.id), []).append(
+                (student.id, random.uniform(0.6, 0.97))
+            )
+
+        def sessions_on(day):
+            sessions = {}
+            for course in courses:
+                for batch in batches:
+                    cohort = cohorts.get((course.id, batch.id))
+                    period = self._period_on(course, batch.year, day)
+                    if cohort and period:
+                        for routine in routines.get((course.id, period), []):
+                            sessions.setdefault(routine, []).extend(cohort)
+            return sessions
+
+        first_day = batches[0].year
+        days = [first_day + timedelta(days=offset) for offset in range((date.today() - first_day).days)]
+        weekdays = [day for day in days if day.weekday() < 5]
+        sizes = [sum(len(cohort) for cohort in sessions_on(day).values()) for day in weekdays]
+        ratio = min(1.0, target / sum(sizes)) if sum(sizes) else 0
+        class_days, share = [], 0.0
+        for day in weekdays:
+            share += ratio
+            if share >= 1:
+                share -= 1
+                class_days.append(day)
+
+        created = 0
+        pending = []
+        for number, day in enumerate(class_days, 1):
+            sessions = sessions_on(day)
+            attendances = Attendance.objects.bulk_create([
+                Attendance(
+                    date=day,
+                    routine=routine,
+                    teacher_id=routine.teacher_id,
+                    teacher_attend=random.random() < 0.95,
+                    class_status=True
+                )
+                for routine in sessions
+            ], batch_size=batch_size)
+
+            for attendance, cohort in zip(attendances, sessions.values()):
+                for student_id, probability in cohort:
+                    pending.append(AttendanceRecord(
+                        attendance_id=attendance.id,
+                        student_id=student_id,
+                        student_attend=random.random() < probability
+                    ))
+                if len(pending) >= batch_size:
+                    AttendanceRecord.objects.bulk_create(pending, batch_size=batch_size)
+                    created += len(pending)
+                    pending = []
+
+            if number % max(1, len(class_days) // 10) == 0:
+                self.stdout.write(f'Attendance: {number}/{len(class_days)} class days, {created} records')
+
+        AttendanceRecord.objects.bulk_create(pending, batch_size=batch_size)
+        created += len(pending)
+        self.stdout.write(f'Attendance records: {created} over {len(class_days)} class days')
+
+    def _scale_activity(self, fake, texts, years, students, staff_members, parents, routines, batch_size):
+        """Create notices, recent leave requests and feedback in proportion to the institute"""
+        today = date.today()
+        Notice.objects.bulk_create([
+            Notice(title=fake.sentence(), message=random.choice(texts)) for _ in range(years * 24)
+        ], batch_size=batch_size)
+
+        def leave_dates():
+            start_date = today + timedelta(days=random.randint(-60, 30))
+            return start_date, start_date + timedelta(days=random.randint(1, 5))
+
+        current = [student for student in students if student.status != 'Completed']
+        student_leaves = []
+        for student in random.sample(current, len(current) // 3):
+            start_date, end_date = leave_dates()
+            student_leaves.append(StudentLeave(
+                student_id=student.id, start_date=start_date, end_date=end_date,
+                message=random.choice(texts), status=random.choice([0, 1, 2])
+            ))
+        StudentLeave.objects.bulk_create(student_leaves, batch_size=batch_size)
+
+        staff_leaves = []
+        for staff in random.sample(staff_members, len(staff_members) // 3):
+            start_date, end_date = leave_dates()
+            staff_leaves.append(StaffLeave(
+                staff_id=staff.id, start_date=start_date, end_date=end_date,
+                message=random.choice(texts), status=random.choice([0, 1, 2])
+            ))
+        StaffLeave.objects.bulk_create(staff_leaves, batch_size=batch_size)
+
+        # Students and parents rate teachers of the student's current period
+        teacher_ids = {
+            key: sorted({routine.teacher_id for routine in period_routines})
+            for key, period_routines in routines.items()
+        }
+        student_feedback = []
+        for student in random.sample(current, len(current) // 4):
+            teachers = teacher_ids.get((student.course_id, student.current_period), [])
+            for teacher_id in random.sample(teachers, min(len(teachers), random.randint(1, 2))):
+                student_feedback.append(StudentFeedback(
+                    student_id=student.id, teacher_id=teacher_id,
+                    rating=random.choices([3.5, 4.0, 4.5, 5.0], weights=[0.1, 0.2, 0.3, 0.4])[0],
+                    feedback_text=random.choice(texts)
+                ))
+        StudentFeedback.objects.bulk_create(student_feedback, batch_size=batch_size)
+
+        parent_feedback = []
+        children = {}
+        for student in current:
+            children.setdefault(student.parent_phone, student)
+        for parent in random.sample(parents, len(parents) // 10):
+            student = children.get(parent.phone)
+            teachers = teacher_ids.get((student.course_id, student.current_period), []) if student else []
+            if teachers:
+                parent_feedback.append(ParentFeedback(
+                    parent_id=parent.id, teacher_id=random.choice(teachers), student_id=student.id,
+                    rating=random.choices([4.0, 4.5, 5.0], weights=[0.2, 0.3, 0.5])[0],
+                    feedback_text=random.choice(texts)
+                ))
+        ParentFeedback.objects.bulk_create(parent_feedback, batch_size=batch_size)
+
+        self.stdout.write(
+            f'Leaves: {len(student_leaves)} student, {len(staff_leaves)} staff; '
+            f'feedback: {len(student_feedback)} student, {len(parent_feedback)} parent'
+        )
+
+    def _consistency_pass(self):
+        """
+        Derive in one pass everything signals would have maintained row by row
+
+        Rebuilds the login identifier index, attendance summaries and
+        streaks, recomputes course completion and expires cached dashboard
+        fragments.
+        """
+        self.stdout.write('Running consistency pass...')
+        call_command('rebuild_login_identifiers', stdout=self.stdout)
+        self.stdout.write(f'Rebuilt {rebuild_attendance_summaries()} attendance summaries')
+        self.stdout.write(f'Rebuilt {rebuild_attendance_streaks()} attendance streaks')
+        call_command('update_course_completion', stdout=self.stdout)
+        bump_fragment_versions(FRAGMENT_DEPENDENCIES)
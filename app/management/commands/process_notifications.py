@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from app.notifications import queue_status, run_worker
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued push notifications from the notification outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process one batch and exit')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Deliveries to send per pass')
+        parser.add_argument('--sleep', type=float, default=5, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--status', action='store_true', help='Show queue status and exit')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            status = queue_status()
+            for name in ('events', 'deliveries'):
+                counts = ', '.join(f'{key}: {value}' for key, value in sorted(status[name].items()))
+                self.stdout.write(f'{name.capitalize():<11} {counts or "none"}')
+            self.stdout.write(f'Oldest due  {status["oldest_pending"] or "-"}')
+            quota = status['quota']
+            self.stdout.write(
+                f'FCM quota   {quota["available"]}/{quota["capacity"]} available '
+                f'({quota["utilisation"]:.0%} in use)'
+            )
+            return
+
+        self.stdout.write('Processing notification outbox...')
+        run_worker(
+            batch_size=max(1, options['batch_size']),
+            sleep=max(0.1, options['sleep']),
+            once=options['once'],
+        )
+        self.stdout.write(self.style.SUCCESS('Notification worker finished'))
@@ -0,0 +1,52 @@
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from app.metrics import PROFILE_CACHE_KEY, PROFILE_WORKERS_KEY, profile_summary
+
+
+class Command(BaseCommand):
+    help = 'Show per-view query percentiles recorded by the query profiler'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Number of views to show, busiest first'
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Print the summary as JSON'
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Discard the samples published by all workers'
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            workers = cache.get(PROFILE_WORKERS_KEY, ())
+            cache.delete_many([PROFILE_CACHE_KEY.format(worker) for worker in workers])
+            cache.delete(PROFILE_WORKERS_KEY)
+            self.stdout.write(self.style.SUCCESS(f'Discarded samples of {len(workers)} workers'))
+            return
+
+        summary = profile_summary()[:options['limit']]
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        if not summary:
+            self.stdout.write('No requests recorded, is QUERY_PROFILER_ENABLED set and the cache shared?')
+            return
+
+        self.stdout.write(
+            f'{"view":40} {"reqs":>6} {"q p50":>6} {"q p95":>6} {"q p99":>6} '
+            f'{"ms p50":>8} {"ms p95":>8} {"dup p95":>7} {"hits":>5}'
+        )
+        for row in summary:
+            hit_rate = '-' if row['cache_hit_rate'] is None else f'{row["cache_hit_rate"]:.0f}%'
+            self.stdout.write(
+                f'{row["view"][:40]:40} {row["requests"]:>6} {row["queries_p50"]:>6} '
+                f'{row["queries_p95"]:>6} {row["queries_p99"]:>6} {row["sql_ms_p50"]:>8.1f} '
+                f'{row["sql_ms_p95"]:>8.1f} {row["duplicates_p95"]:>7} {hit_rate:>5}'
+            )
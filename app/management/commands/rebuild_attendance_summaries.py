@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from app.attendance import rebuild_attendance_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild attendance summaries from attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--students', type=int, nargs='+',
+            help='Only rebuild summaries of these student ids'
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_attendance_summaries(options['students'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} attendance summaries'))
@@ -0,0 +1,37 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.models import LoginIdentifier
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the login identifier index used by authentication'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        LoginIdentifier.objects.all().delete()
+
+        total = 0
+        for priority, (label, field) in enumerate(LoginIdentifier.SOURCES):
+            model = apps.get_model(label)
+            values = (
+                model._default_manager.exclude(**{f'{field}__isnull': True})
+                .exclude(**{field: ''})
+                .values_list('pk', field)
+            )
+            rows = [
+                LoginIdentifier(
+                    identifier=value,
+                    model=label,
+                    object_id=pk,
+                    field=field,
+                    priority=priority,
+                )
+                for pk, value in values.iterator()
+            ]
+            LoginIdentifier.objects.bulk_create(rows, batch_size=1000)
+            total += len(rows)
+            self.stdout.write(f'{label}.{field}: {len(rows)} identifiers')
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} login identifiers'))
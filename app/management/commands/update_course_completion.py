@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.models import CourseTracking
+
+
+class Command(BaseCommand):
+    help = 'Recompute completion percentages for all active course trackings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Number of trackings to recompute per batch'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+
+        # Only active course trackings (not completed or dropped)
+        trackings = CourseTracking.objects.filter(
+            progress_status__in=["In Progress", "Not Started"]
+        ).only(
+            'id', 'student_id', 'course_id', 'completion_percentage',
+            'progress_status', 'actual_end_date'
+        ).order_by('id')
+
+        updated_count = 0
+        last_id = 0
+        while True:
+            batch = list(trackings.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                updated_count += CourseTracking.objects.recompute_completion(batch)
+            last_id = batch[-1].id
+
+        # Cache the last update timestamp
+        cache.set(
+            "last_course_percentage_update", date.today().isoformat(), 86400
+        )  # 24 hours
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Updated completion for {updated_count} course trackings')
+        )
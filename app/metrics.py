@@ -0,0 +1,275 @@
+# Standard library imports
+import functools
+import itertools
+import logging
+import math
+import os
+import re
+import socket
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack, contextmanager
+
+# Core Django imports
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Number of recent samples kept per view
+QUERY_COUNT_SAMPLES = 1000
+
+# Recent query counts per view name, newest last
+view_query_counts = defaultdict(lambda: deque(maxlen=QUERY_COUNT_SAMPLES))
+
+# Recent request profiles per view name, newest last. Each sample holds
+# the values of PROFILE_FIELDS.
+PROFILE_FIELDS = ("queries", "sql_ms", "duplicates", "cache_hits", "cache_misses")
+view_profiles = defaultdict(lambda: deque(maxlen=QUERY_COUNT_SAMPLES))
+
+# Cache keys sharing each worker's profiles with the admin page and command
+PROFILE_CACHE_KEY = "query_profile_{}"
+PROFILE_WORKERS_KEY = "query_profile_workers"
+PROFILE_CACHE_TIMEOUT = 86400  # 24 hours
+
+# Number of requests profiled by this worker
+profiled_requests = itertools.count(1)
+
+# Placeholder lists of IN clauses, collapsed so fingerprints ignore their length
+IN_CLAUSE_RE = re.compile(r"\((?:%s, )+%s\)")
+
+
+# --------------------------------------------------------------------
+# Query Count Metrics
+# --------------------------------------------------------------------
+
+
+def count_queries(view_name):
+    """
+    Decorator recording how many SQL queries each render of a view issues
+
+    Queries are counted with an execute wrapper on every database
+    connection, replicas included, so no SQL is kept in memory. Every
+    render is logged and appended to ``view_query_counts``.
+
+    Args:
+        view_name: Metric name the counts are recorded under
+    """
+
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            queries = 0
+
+            def counter(execute, sql, params, many, context):
+                nonlocal queries
+                queries += 1
+                return execute(sql, params, many, context)
+
+            with ExitStack() as stack:
+                for db in connections.all():
+                    stack.enter_context(db.execute_wrapper(counter))
+                response = view_func(request, *args, **kwargs)
+                # Lazy template responses run their queries when rendered
+                if hasattr(response, "render") and not getattr(response, "is_rendered", True):
+                    response.render()
+
+            view_query_counts[view_name].append(queries)
+            logger.info(f"{view_name} rendered with {queries} queries")
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# --------------------------------------------------------------------
+# Request Query Profiler
+# --------------------------------------------------------------------
+
+
+def fingerprint(sql):
+    """Normalize parameterized SQL so repeats of one query compare equal"""
+    return IN_CLAUSE_RE.sub("(...)", sql)
+
+
+class RequestProfile:
+    """
+    SQL and cache activity of one request
+
+    Used as a database execute wrapper while ``track()`` is active.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.fingerprints = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Number of queries repeating an earlier query of the request"""
+        return sum(count - 1 for count in self.fingerprints.values())
+
+    def top_duplicates(self, limit=3):
+        """Most repeated query fingerprints with their counts"""
+        return [
+            (sql, count) for sql, count in self.fingerprints.most_common(limit) if count > 1
+        ]
+
+    def sample(self):
+        return (
+            self.queries,
+            round(self.sql_time * 1000, 3),
+            self.duplicates,
+            self.cache_hits,
+            self.cache_misses,
+        )
+
+    def _track_cache(self, backend):
+        """Count hits and misses of a cache backend instance"""
+        missing = object()
+        get, get_many = backend.get, backend.get_many
+        in_get_many = False
+
+        def tracked_get(key, default=None, version=None):
+            value = get(key, missing, version=version)
+            if not in_get_many:
+                if value is missing:
+                    self.cache_misses += 1
+                else:
+                    self.cache_hits += 1
+            return default if value is missing else value
+
+        def tracked_get_many(keys, version=None):
+            # Some backends implement get_many with get, count those once
+            nonlocal in_get_many
+            keys = list(keys)
+            in_get_many = True
+            try:
+                values = get_many(keys, version=version)
+            finally:
+                in_get_many = False
+            self.cache_hits += len(values)
+            self.cache_misses += len(keys) - len(values)
+            return values
+
+        backend.get, backend.get_many = tracked_get, tracked_get_many
+        return backend
+
+    @staticmethod
+    def _untrack_cache(backend):
+        del backend.get, backend.get_many
+
+    @contextmanager
+    def track(self):
+        """Record the SQL and cache calls made inside the block"""
+        with ExitStack() as stack:
+            for db in connections.all():
+                stack.enter_context(db.execute_wrapper(self))
+            for alias in settings.CACHES:
+                stack.callback(self._untrack_cache, self._track_cache(caches[alias]))
+            yield self
+
+
+def record_profile(view_name, profile):
+    """
+    Store a request profile and log it when it exceeds the query budget
+
+    Samples are shared through the cache every QUERY_PROFILER_FLUSH_EVERY
+    requests so the admin page and ``manage.py query_profile`` can
+    aggregate all workers.
+    """
+    samples = view_profiles[view_name]
+    samples.append(profile.sample())
+
+    if profile.queries > settings.QUERY_BUDGET:
+        duplicates = "; ".join(
+            f"{count}x {sql[:120]}" for sql, count in profile.top_duplicates()
+        )
+        logger.warning(
+            f"{view_name} ran {profile.queries} queries (budget {settings.QUERY_BUDGET}) "
+            f"in {profile.sql_time * 1000:.1f} ms, {profile.duplicates} duplicates"
+            + (f": {duplicates}" if duplicates else "")
+        )
+
+    if next(profiled_requests) % settings.QUERY_PROFILER_FLUSH_EVERY == 0:
+        flush_profiles()
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def flush_profiles():
+    """Publish this worker's samples to the cache"""
+    worker = worker_id()
+    cache.set(
+        PROFILE_CACHE_KEY.format(worker),
+        {view_name: list(samples) for view_name, samples in view_profiles.items()},
+        PROFILE_CACHE_TIMEOUT,
+    )
+    workers = set(cache.get(PROFILE_WORKERS_KEY, ()))
+    if worker not in workers:
+        cache.set(PROFILE_WORKERS_KEY, sorted(workers | {worker}), PROFILE_CACHE_TIMEOUT)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def profile_summary():
+    """
+    Aggregate the samples of every worker into per-view percentiles
+
+    Returns:
+        list: One dict per view, busiest view first
+    """
+    # Live samples of this process, published snapshots of the others
+    merged = defaultdict(list)
+    for view_name, samples in view_profiles.items():
+        merged[view_name].extend(samples)
+    other_workers = [
+        PROFILE_CACHE_KEY.format(worker)
+        for worker in cache.get(PROFILE_WORKERS_KEY, ())
+        if worker != worker_id()
+    ]
+    for snapshot in cache.get_many(other_workers).values():
+        for view_name, samples in snapshot.items():
+            merged[view_name].extend(samples)
+
+    summary = []
+    for view_name, samples in merged.items():
+        queries, sql_ms, duplicates, hits, misses = (sorted(column) for column in zip(*samples))
+        summary.append(
+            {
+                "view": view_name,
+                "requests": len(samples),
+                "queries_p50": percentile(queries, 50),
+                "queries_p95": percentile(queries, 95),
+                "queries_p99": percentile(queries, 99),
+                "queries_max": queries[-1],
+                "sql_ms_p50": percentile(sql_ms, 50),
+                "sql_ms_p95": percentile(sql_ms, 95),
+                "sql_ms_p99": percentile(sql_ms, 99),
+                "duplicates_p95": percentile(duplicates, 95),
+                "cache_hit_rate": (
+                    sum(hits) / (sum(hits) + sum(misses)) * 100 if sum(hits) + sum(misses) else None
+                ),
+            }
+        )
+    return sorted(summary, key=lambda row: row["queries_p95"] * row["requests"], reverse=True)
@@ -1,8 +1,19 @@
-from django.http import HttpResponse, HttpResponseServerError
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware as BaseSessionMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseNotModified, HttpResponseServerError
 from django.template.loader import render_to_string
+from django.utils.cache import patch_vary_headers
 import re
 from django.middleware.csrf import CsrfViewMiddleware
 
+from app.backends import SESSION_USER_MODEL_KEY, session_user_model
+from app.metrics import RequestProfile, record_profile
+from app.routers import primary_pinned
+
+# Cookie keeping a client on the primary database for a while after it wrote
+PRIMARY_PIN_COOKIE = "pin_primary"
+
 
 class HTTP505Middleware:
     """
@@ -55,3 +66,93 @@ class CSRFExemptMiddleware(CsrfViewMiddleware):
         
         # Otherwise, continue with regular CSRF validation
         return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class SessionMiddleware(BaseSessionMiddleware):
+    """
+    Session middleware that leaves sessions untouched on 304 responses
+
+    SESSION_SAVE_EVERY_REQUEST re-saves every session to slide its expiry.
+    A 304 only revalidates a response the browser already holds, so the
+    save is skipped unless the session changed, keeping conditional GETs
+    free of database writes.
+    """
+
+    def process_response(self, request, response):
+        if response.status_code == HttpResponseNotModified.status_code and not request.session.modified:
+            if request.session.accessed:
+                patch_vary_headers(response, ("Cookie",))
+            return response
+        return super().process_response(request, response)
+
+
+class SessionUserModelMiddleware:
+    """
+    Middleware exposing the session's account model label to the auth backend
+    so it can load request.user with one query. Must run after
+    SessionMiddleware and before AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = session_user_model.set(request.session.get(SESSION_USER_MODEL_KEY))
+        try:
+            return self.get_response(request)
+        finally:
+            session_user_model.reset(token)
+
+
+class PrimaryPinningMiddleware:
+    """
+    Middleware giving each request read-your-writes consistency with
+    replicas. A request reads from the primary once it writes, and a cookie
+    keeps the client on the primary for REPLICA_PIN_SECONDS afterwards so the
+    redirect after a POST does not read a lagging replica. Must run after
+    SessionMiddleware so saving the session does not pin every request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = request.COOKIES.get(PRIMARY_PIN_COOKIE) == "1"
+        token = primary_pinned.set(pinned)
+        try:
+            response = self.get_response(request)
+            if primary_pinned.get() and not pinned:
+                response.set_cookie(
+                    PRIMARY_PIN_COOKIE,
+                    "1",
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    secure=settings.SESSION_COOKIE_SECURE,
+                    httponly=True,
+                    samesite=settings.SESSION_COOKIE_SAMESITE,
+                )
+            return response
+        finally:
+            primary_pinned.reset(token)
+
+
+class QueryProfilerMiddleware:
+    """
+    Middleware recording query count, SQL time, duplicate queries and cache
+    hits and misses per view. Requests over QUERY_BUDGET queries are logged.
+    Removed from the middleware chain unless QUERY_PROFILER_ENABLED is set,
+    so it costs nothing when disabled. Should run first to see every query.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with RequestProfile().track() as profile:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view_name = (match.view_name or match._func_path) if match else "unresolved"
+        record_profile(view_name, profile)
+        return response
@@ -6,6 +6,7 @@ from django.contrib.auth.hashers import make_password, check_password
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
+from django.db.models import Count, Q, Sum
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
@@ -16,6 +17,7 @@ from model_utils import FieldTracker
 
 # Local app imports
 from app.firebase import send_push_notification, FCMDevice
+from app.permissions import get_user_groups, user_has_module_perms, user_has_perm, user_in_group
 
 # Constants
 DURATION_TYPES = (
@@ -202,7 +204,11 @@ class Subject(models.Model):
                 }
             )
 
-        subject_files = self.subjectfile_set.all().order_by("-uploaded_at")
+        # Use prefetched files when available, they are already ordered
+        if "subjectfile_set" in getattr(self, "_prefetched_objects_cache", {}):
+            subject_files = self.subjectfile_set.all()
+        else:
+            subject_files = self.subjectfile_set.select_related("uploaded_by").order_by("-uploaded_at")
         for file in subject_files:
             files.append(
                 {
@@ -322,7 +328,6 @@ class Student(AbstractUser):
     )
     joining_date = models.DateField(null=True, blank=True)
     password = models.CharField(max_length=128, editable=False, null=True)
-    fcm_token = models.CharField(max_length=500, null=True, blank=True)
 
     USERNAME_FIELD = "phone"
     REQUIRED_FIELDS = ["name"]
@@ -347,29 +352,13 @@ class Student(AbstractUser):
 
     @property
     def is_staff(self):
-        return self.groups.exists()
+        return bool(get_user_groups(self))
 
     def has_perm(self, perm, obj=None):
-        if not self.is_active:
-            return False
-
-        perms = set()
-        for group in self.groups.all():
-            perms.update(
-                group.permissions.values_list("content_type__app_label", "codename")
-            )
-
-        app_label, codename = perm.split(".")
-        return (app_label, codename) in perms
+        return user_has_perm(self, perm)
 
     def has_module_perms(self, app_label):
-        if not self.is_active:
-            return False
-
-        for group in self.groups.all():
-            if group.permissions.filter(content_type__app_label=app_label).exists():
-                return True
-        return False
+        return user_has_module_perms(self, app_label)
 
     def get_current_subjects(self):
         """Get subjects for current period"""
@@ -407,9 +396,7 @@ class Student(AbstractUser):
                 super().save(*args, **kwargs)
                 
                 # Update related records in the same transaction
-                if hasattr(self, 'course_trackings'):
-                    for tracking in self.course_trackings.all():
-                        tracking.update_completion_percentage()
+                CourseTracking.objects.recompute_completion(self.course_trackings.all())
         except ValidationError as e:
             raise ValidationError(f"Validation error: {str(e)}")
         except Exception as e:
@@ -460,19 +447,13 @@ class Student(AbstractUser):
 
     def get_notification_tokens(self):
         """
-        Get FCM tokens for notifications
+        Get FCM tokens of the student's and their parents' active devices
         """
-        tokens = set()
-        
-        # Get student's token
-        if self.fcm_token:
-            tokens.add(self.fcm_token)
-            
-        # Get parent's token
-        if self.parent and self.parent.fcm_token:
-            tokens.add(self.parent.fcm_token)
-            
-        return tokens
+        devices = FCMDevice.objects.filter(is_active=True).filter(
+            Q(owner_model=self._meta.label_lower, owner_id=self.pk)
+            | Q(owner_model=Parent._meta.label_lower, owner_id__in=self.parents.values("id"))
+        )
+        return set(devices.values_list("token", flat=True))
 
     class Meta:
         verbose_name = "Student"
@@ -535,7 +516,6 @@ class Staff(AbstractUser):
     image = models.ImageField(upload_to="staff_image", null=True, blank=True)
     joining_date = models.DateField(null=True, blank=True)
     password = models.CharField(max_length=128, editable=False, null=True)
-    fcm_token = models.CharField(max_length=500, null=True, blank=True)
     course = models.ForeignKey(
         Course,
         on_delete=models.SET_NULL,
@@ -570,36 +550,17 @@ class Staff(AbstractUser):
 
     @property
     def is_staff(self):
-        return (
-            self.groups.filter(name__in=["Teacher", "Admission Officer"]).exists()
-            or self.is_superuser
-        )
+        return self.is_superuser or user_in_group(self, "Teacher", "Admission Officer")
 
     @property
     def is_authenticated(self):
         return True
 
     def has_perm(self, perm, obj=None):
-        if not self.is_active:
-            return False
-
-        perms = set()
-        for group in self.groups.all():
-            perms.update(
-                group.permissions.values_list("content_type__app_label", "codename")
-            )
-
-        app_label, codename = perm.split(".")
-        return (app_label, codename) in perms
+        return user_has_perm(self, perm)
 
     def has_module_perms(self, app_label):
-        if not self.is_active:
-            return False
-
-        for group in self.groups.all():
-            if group.permissions.filter(content_type__app_label=app_label).exists():
-                return True
-        return False
+        return user_has_module_perms(self, app_label)
 
     def clean(self):
         """Validate staff data before saving"""
@@ -643,15 +604,9 @@ class Staff(AbstractUser):
 
     def get_notification_tokens(self):
         """
-        Get FCM tokens for notifications
+        Get FCM tokens of the staff member's active devices
         """
-        tokens = set()
-        
-        # Get staff's token
-        if self.fcm_token:
-            tokens.add(self.fcm_token)
-            
-        return tokens
+        return set(FCMDevice.owned_by(self).filter(is_active=True).values_list("token", flat=True))
 
     class Meta:
         verbose_name = "Staff"
@@ -774,9 +729,139 @@ class AttendanceRecord(models.Model):
             models.Index(fields=['student_attend']),
             # Add these composite indexes
             models.Index(fields=['student', 'student_attend']),  # For attendance filtering
-            models.Index(fields=['attendance', 'student']),      # For attendance lookups
             models.Index(fields=['attendance', 'student_attend']), # For attendance status
         ]
+        constraints = [
+            # One record per student per session, lets attendance be upserted in bulk
+            models.UniqueConstraint(
+                fields=['attendance', 'student'], name='unique_attendance_student'
+            ),
+        ]
+
+
+class AttendanceSummary(models.Model):
+    """
+    Rollup of a student's attendance in one subject and period
+
+    Maintained incrementally when attendance is saved and rebuilt from
+    ``AttendanceRecord`` rows by ``rebuild_attendance_summaries``. Streaks
+    count consecutive attended sessions of the subject.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="attendance_summaries"
+    )
+    subject = models.ForeignKey(
+        Subject, on_delete=models.CASCADE, related_name="attendance_summaries"
+    )
+    period_or_year = models.PositiveIntegerField()
+    present_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    last_date = models.DateField(null=True, blank=True)
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.student} - {self.subject} ({self.present_count}/{self.total_count})"
+
+    @property
+    def attendance_percentage(self):
+        if not self.total_count:
+            return 0
+        return self.present_count / self.total_count * 100
+
+    def apply_session(self, session_date, attended):
+        """Add one attendance session at or after ``last_date``"""
+        self.total_count += 1
+        if attended:
+            self.present_count += 1
+            self.current_streak += 1
+            self.longest_streak = max(self.longest_streak, self.current_streak)
+        else:
+            self.current_streak = 0
+        if self.last_date is None or session_date > self.last_date:
+            self.last_date = session_date
+
+    class Meta:
+        verbose_name = "Attendance Summary"
+        verbose_name_plural = "Attendance Summaries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'subject', 'period_or_year'],
+                name='unique_attendance_summary',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['student', 'period_or_year']),
+        ]
+
+
+class AttendanceStreak(models.Model):
+    """
+    A student's run of consecutive attended days, updated in O(1) per new day
+
+    A day counts as attended when the student was present in at least one
+    session that day. Days must arrive in order; anything else is handled
+    by rebuilding the student's streak from records.
+    """
+
+    student = models.OneToOneField(
+        Student, on_delete=models.CASCADE, primary_key=True, related_name="attendance_streak"
+    )
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_date = models.DateField(null=True, blank=True)
+    last_present_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.student} - {self.current_streak} day streak"
+
+    def streak_on(self, day):
+        """
+        Length of the run still going on ``day``
+
+        The stored ``current_streak`` is as of the last recorded day. A run
+        also ends once a day passes without any attendance taken, so it only
+        counts while the student was last present on ``day`` or the day
+        before.
+        """
+        if self.last_present_date and self.last_present_date >= day - timedelta(days=1):
+            return self.current_streak
+        return 0
+
+    def apply_day(self, day, present):
+        """
+        Record a day of attendance
+
+        Returns:
+            bool: False when the day cannot be applied in place (it is older
+            than the last recorded day, or turns that day into a present one)
+        """
+        if self.last_date is not None:
+            if day < self.last_date:
+                return False
+            if day == self.last_date:
+                # Another session on the same day only matters if it makes the day present
+                return not present or self.last_present_date == day
+
+        if present:
+            if self.last_present_date == day - timedelta(days=1) and self.current_streak:
+                self.current_streak += 1
+            else:
+                self.current_streak = 1
+            self.longest_streak = max(self.longest_streak, self.current_streak)
+            self.last_present_date = day
+        else:
+            self.current_streak = 0
+        self.last_date = day
+        return True
+
+    class Meta:
+        verbose_name = "Attendance Streak"
+        verbose_name_plural = "Attendance Streaks"
 
 
 # Notice Model
@@ -798,6 +883,84 @@ class Notice(models.Model):
         verbose_name_plural = "Notices"
 
 
+# Notification Outbox Models
+NOTIFICATION_EVENT_STATUS_CHOICES = (
+    ("pending", "Pending"),
+    ("dispatched", "Dispatched"),
+)
+
+NOTIFICATION_DELIVERY_STATUS_CHOICES = (
+    ("pending", "Pending"),
+    ("sent", "Sent"),
+    ("failed", "Failed"),
+)
+
+
+class NotificationEvent(models.Model):
+    """Model representing a push notification waiting to be fanned out to devices"""
+
+    id = models.BigAutoField(primary_key=True)
+    key = models.CharField(
+        max_length=255, unique=True, help_text="Identifies the event, used to drop duplicates"
+    )
+    title = models.CharField(max_length=255)
+    message = models.TextField(blank=True)
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="notification_events",
+        help_text="Notify students of this course and their parents, or every device if empty",
+    )
+    status = models.CharField(
+        max_length=20, choices=NOTIFICATION_EVENT_STATUS_CHOICES, default="pending"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.title} ({self.key})"
+
+    class Meta:
+        verbose_name = "Notification Event"
+        verbose_name_plural = "Notification Events"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class NotificationDelivery(models.Model):
+    """Model representing delivery of a notification event to one device token"""
+
+    id = models.BigAutoField(primary_key=True)
+    event = models.ForeignKey(
+        NotificationEvent, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    token = models.CharField(max_length=500)
+    status = models.CharField(
+        max_length=20, choices=NOTIFICATION_DELIVERY_STATUS_CHOICES, default="pending"
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.event.key} -> {self.token[:20]}..."
+
+    class Meta:
+        verbose_name = "Notification Delivery"
+        verbose_name_plural = "Notification Deliveries"
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'token'], name='unique_event_token'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),  # For due deliveries
+        ]
+
+
 # Leave Models
 class StaffLeave(models.Model):
     """Model representing staff leave requests"""
@@ -1018,6 +1181,84 @@ class ParentInstituteFeedback(models.Model):
 
 
 # Course Tracking Model
+class CourseTrackingManager(models.Manager):
+    """Manager with set-based completion updates for course trackings"""
+
+    SUBJECT_WEIGHT = 0.7  # 70% weight to subject completion
+    ATTENDANCE_WEIGHT = 0.3  # 30% weight to attendance
+
+    def recompute_completion(self, trackings=None, commit=True):
+        """
+        Recompute completion percentage and progress status for many trackings
+
+        Subject totals, completed subjects and attended/total classes (read
+        from the attendance summaries) are loaded for the whole set with
+        three grouped aggregate queries, however many trackings are passed in.
+
+        Args:
+            trackings: Queryset or iterable of trackings (default: all)
+            commit: Persist changed rows with a single bulk_update
+
+        Returns:
+            int: Number of trackings whose completion changed
+        """
+        if trackings is None:
+            trackings = self.get_queryset()
+        trackings = list(trackings)
+        if not trackings:
+            return 0
+
+        student_ids = {tracking.student_id for tracking in trackings}
+        course_ids = {tracking.course_id for tracking in trackings}
+
+        subject_totals = dict(
+            Subject.objects.filter(course_id__in=course_ids)
+            .values_list("course_id")
+            .annotate(total=Count("id"))
+        )
+
+        completed_subjects = {
+            (student_id, course_id): completed
+            for student_id, course_id, completed in SubjectProgress.objects.filter(
+                student_id__in=student_ids,
+                subject__course_id__in=course_ids,
+                status="Completed",
+            )
+            .values_list("student_id", "subject__course_id")
+            .annotate(completed=Count("id"))
+        }
+
+        attendance = {
+            (student_id, course_id): (attended, total)
+            for student_id, course_id, attended, total in AttendanceSummary.objects.filter(
+                student_id__in=student_ids,
+                subject__course_id__in=course_ids,
+            )
+            .values_list("student_id", "subject__course_id")
+            .annotate(attended=Sum("present_count"), total=Sum("total_count"))
+        }
+
+        changed = []
+        for tracking in trackings:
+            key = (tracking.student_id, tracking.course_id)
+            attended, total_classes = attendance.get(key, (0, 0))
+            if tracking.apply_completion(
+                subject_totals.get(tracking.course_id, 0),
+                completed_subjects.get(key, 0),
+                attended,
+                total_classes,
+            ):
+                changed.append(tracking)
+
+        if commit and changed:
+            self.bulk_update(
+                [tracking for tracking in changed if tracking.pk],
+                ["completion_percentage", "progress_status", "actual_end_date"],
+                batch_size=500,
+            )
+        return len(changed)
+
+
 class CourseTracking(models.Model):
     """Model for tracking student progress in courses"""
 
@@ -1050,6 +1291,8 @@ class CourseTracking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CourseTrackingManager()
+
     def __str__(self):
         return f"{self.student.name} - {self.course.name}"
 
@@ -1070,64 +1313,52 @@ class CourseTracking(models.Model):
         if self.completion_percentage < 0 or self.completion_percentage > 100:
             raise ValidationError("Completion percentage must be between 0 and 100")
 
-    def update_completion_percentage(self):
+    def apply_completion(self, total_subjects, completed_subjects, attended_classes, total_classes):
         """
-        Update the completion percentage based on subject progress and attendance
-        """
-        try:
-            # Get total subjects for this course
-            total_subjects = Subject.objects.filter(course=self.course).count()
-            if total_subjects == 0:
-                self.completion_percentage = 0
-                return 0
-
-            # Get completed subjects from SubjectProgress
-            completed_subjects = SubjectProgress.objects.filter(
-                student=self.student,
-                subject__course=self.course,
-                status="Completed"
-            ).count()
-
-            # Get attendance percentage for active subjects
-            attended_classes = AttendanceRecord.objects.filter(
-                student=self.student,
-                attendance__routine__subject__course=self.course,
-                student_attend=True
-            ).count()
-
-            total_classes = AttendanceRecord.objects.filter(
-                student=self.student,
-                attendance__routine__subject__course=self.course
-            ).count()
+        Set completion percentage and progress status from precomputed counts
 
-            # Calculate weighted completion percentage
-            subject_weight = 0.7  # 70% weight to subject completion
-            attendance_weight = 0.3  # 30% weight to attendance
-
-            subject_percentage = (completed_subjects / total_subjects) * 100 if total_subjects > 0 else 0
+        Returns:
+            bool: True if completion percentage or progress status changed
+        """
+        if total_subjects == 0:
+            completion_percentage = 0
+        else:
+            subject_percentage = (completed_subjects / total_subjects) * 100
             attendance_percentage = (attended_classes / total_classes) * 100 if total_classes > 0 else 0
 
-            # Calculate final percentage
+            # Calculate weighted completion percentage
             completion_percentage = int(
-                (subject_percentage * subject_weight) + 
-                (attendance_percentage * attendance_weight)
+                (subject_percentage * CourseTrackingManager.SUBJECT_WEIGHT) +
+                (attendance_percentage * CourseTrackingManager.ATTENDANCE_WEIGHT)
             )
 
             # Ensure percentage is between 0 and 100
             completion_percentage = max(0, min(100, completion_percentage))
-            
-            # Update progress status based on completion
-            if completion_percentage >= 100:
-                self.progress_status = "Completed"
-                if not self.actual_end_date:
-                    self.actual_end_date = date.today()
-            elif completion_percentage > 0:
-                self.progress_status = "In Progress"
-            else:
-                self.progress_status = "Not Started"
 
-            return completion_percentage
+        old_state = (self.completion_percentage, self.progress_status)
+        self.completion_percentage = completion_percentage
+
+        # Update progress status based on completion
+        if total_subjects == 0:
+            pass
+        elif completion_percentage >= 100:
+            self.progress_status = "Completed"
+            if not self.actual_end_date:
+                self.actual_end_date = date.today()
+        elif completion_percentage > 0:
+            self.progress_status = "In Progress"
+        else:
+            self.progress_status = "Not Started"
+
+        return old_state != (self.completion_percentage, self.progress_status)
 
+    def update_completion_percentage(self):
+        """
+        Update the completion percentage based on subject progress and attendance
+        """
+        try:
+            CourseTracking.objects.recompute_completion([self], commit=False)
+            return self.completion_percentage
         except Exception as e:
             print(f"Error updating completion percentage: {str(e)}")
             return self.completion_percentage
@@ -1282,6 +1513,7 @@ class CourseTracking(models.Model):
             models.Index(fields=['course', 'progress_status']),
             models.Index(fields=['student', 'course', 'progress_status']),
             models.Index(fields=['completion_percentage']),
+            models.Index(fields=['completion_percentage', 'id']),
             models.Index(fields=['start_date', 'expected_end_date']),
             models.Index(fields=['current_period', 'progress_status']),
         ]
@@ -1324,6 +1556,101 @@ class ResetToken(models.Model):
         return timezone.now() > self.expires_at
 
 
+class LoginIdentifier(models.Model):
+    """
+    Denormalised index of every login identifier (phone or email)
+
+    Lets authentication resolve a username to exactly one account with a
+    single indexed query instead of probing every user table. Rows are
+    kept in sync by signals and can be rebuilt with
+    ``manage.py rebuild_login_identifiers``.
+    """
+
+    # (model label, field) pairs that can be used to log in, highest priority first
+    SOURCES = (
+        ("auth.user", "email"),
+        ("app.staff", "phone"),
+        ("app.staff", "email"),
+        ("app.parent", "phone"),
+        ("app.student", "phone"),
+        ("app.student", "email"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    identifier = models.CharField(max_length=255)
+    model = models.CharField(max_length=50)  # model label, e.g. "app.staff"
+    object_id = models.BigIntegerField()
+    field = models.CharField(max_length=20)
+    priority = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model", "object_id", "field"], name="unique_login_identifier_source"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["identifier", "priority"]),
+            models.Index(fields=["model", "object_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.identifier} -> {self.model}:{self.object_id}"
+
+    @classmethod
+    def fields_for(cls, model_label):
+        return [field for label, field in cls.SOURCES if label == model_label]
+
+    @classmethod
+    def build_rows(cls, instance):
+        """Build identifier rows for one user instance"""
+        label = instance._meta.label_lower
+        rows = []
+        for priority, (source_label, field) in enumerate(cls.SOURCES):
+            if source_label != label:
+                continue
+            value = getattr(instance, field, None)
+            if value:
+                rows.append(
+                    cls(
+                        identifier=value,
+                        model=label,
+                        object_id=instance.pk,
+                        field=field,
+                        priority=priority,
+                    )
+                )
+        return rows
+
+    @classmethod
+    def sync(cls, instance):
+        """Replace the identifier rows of one user instance"""
+        with transaction.atomic():
+            cls.remove(instance)
+            cls.objects.bulk_create(cls.build_rows(instance))
+
+    @classmethod
+    def remove(cls, instance):
+        """Delete the identifier rows of one user instance"""
+        cls.objects.filter(model=instance._meta.label_lower, object_id=instance.pk).delete()
+
+    @classmethod
+    def resolve(cls, username):
+        """
+        Resolve a username to the accounts that use it
+
+        Returns:
+            list: (model label, primary key) pairs, highest priority first,
+            empty if the index has no row for the username
+        """
+        matches = (
+            cls.objects.filter(identifier=username)
+            .order_by("priority")
+            .values_list("model", "object_id")
+        )
+        return list(dict.fromkeys(matches))
+
+
 class OTPAttempt(models.Model):
     """Model to track OTP attempts for rate limiting"""
     user = models.ForeignKey(
@@ -1411,7 +1738,6 @@ class Parent(AbstractUser):
     address = models.CharField(max_length=500, null=True, blank=True)
     students = models.ManyToManyField(Student, related_name="parents")
     password = models.CharField(max_length=128, editable=False, null=True)
-    fcm_token = models.CharField(max_length=500, null=True, blank=True)
     image = models.ImageField(upload_to="parent_images/", null=True, blank=True)
 
     USERNAME_FIELD = "phone"
@@ -1429,28 +1755,10 @@ class Parent(AbstractUser):
         return False
 
     def has_perm(self, perm, obj=None):
-        if not self.is_active:
-            return False
-
-        # Check if parent has the permission through their groups
-        perms = set()
-        for group in self.groups.all():
-            perms.update(
-                group.permissions.values_list("content_type__app_label", "codename")
-            )
-
-        app_label, codename = perm.split(".")
-        return (app_label, codename) in perms
+        return user_has_perm(self, perm)
 
     def has_module_perms(self, app_label):
-        if not self.is_active:
-            return False
-
-        # Check if parent has any permissions for the app through their groups
-        for group in self.groups.all():
-            if group.permissions.filter(content_type__app_label=app_label).exists():
-                return True
-        return False
+        return user_has_module_perms(self, app_label)
 
     def cleanup_orphaned_data(self):
         """
@@ -1462,10 +1770,6 @@ class Parent(AbstractUser):
         # Clean up feedback records
         self.feedbacks.all().delete()
         self.institute_feedbacks.all().delete()
-        
-        # Clean up notification tokens
-        self.fcm_token = None
-        self.save(update_fields=['fcm_token'])
 
     class Meta:
         verbose_name = "Parent"
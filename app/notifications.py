@@ -0,0 +1,275 @@
+# Standard library imports
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+# Core Django imports
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+# Local app imports
+from app.firebase import FCMDevice, fcm_quota, send_push_notification
+from app.models import NotificationDelivery, NotificationEvent, Parent
+
+logger = logging.getLogger(__name__)
+
+# Delay before the first retry, doubled on every further attempt
+RETRY_BASE_DELAY = 60  # seconds
+RETRY_MAX_DELAY = 3600  # seconds
+
+# How long a worker may hold claimed deliveries before others retry them
+CLAIM_LEASE = 300  # seconds
+
+# Delay before deliveries refused by the Firebase quota are tried again,
+# they keep their attempt count as Firebase was never called
+QUOTA_RETRY_DELAY = 60  # seconds, the quota refills per minute
+
+
+# --------------------------------------------------------------------
+# Enqueueing
+# --------------------------------------------------------------------
+
+
+def enqueue_notification(key, title, message, course=None):
+    """
+    Add a notification to the outbox
+
+    The event row is written in the caller's transaction, so it exists
+    exactly when the change that caused it is committed. Fan-out to device
+    tokens and delivery happen in the ``process_notifications`` worker, or
+    right after commit when BACKGROUND_TASK_RUN_ASYNC is disabled.
+
+    Args:
+        key: Unique event key, enqueueing the same key twice is a no-op
+        title: Notification title
+        message: Notification body
+        course: Limit recipients to students of this course and their parents
+
+    Returns:
+        NotificationEvent: The queued event
+    """
+    event, created = NotificationEvent.objects.get_or_create(
+        key=key,
+        defaults={"title": title, "message": message or "", "course": course},
+    )
+
+    if created and not getattr(settings, "BACKGROUND_TASK_RUN_ASYNC", True):
+        transaction.on_commit(lambda: process_event(event.id))
+
+    return event
+
+
+# --------------------------------------------------------------------
+# Fan-out and Delivery
+# --------------------------------------------------------------------
+
+
+def resolve_event_tokens(event):
+    """
+    Get the device tokens an event should be delivered to
+
+    Course events go to the students of the course and their parents.
+    Student devices carry the course, parent devices are matched through
+    the parent-student link table, so both are read in one query.
+    """
+    devices = FCMDevice.objects.filter(is_active=True)
+    if event.course_id:
+        parent_ids = Parent.students.through.objects.filter(
+            student__course_id=event.course_id
+        ).values("parent_id")
+        devices = devices.filter(
+            Q(role="student", course_id=event.course_id)
+            | Q(owner_model=Parent._meta.label_lower, owner_id__in=parent_ids)
+        )
+
+    tokens = set(devices.values_list("token", flat=True))
+    tokens.discard("")
+    return tokens
+
+
+def dispatch_event(event):
+    """Create one pending delivery per recipient token of an event"""
+    tokens = resolve_event_tokens(event)
+    with transaction.atomic():
+        NotificationDelivery.objects.bulk_create(
+            [NotificationDelivery(event=event, token=token) for token in tokens],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+        NotificationEvent.objects.filter(id=event.id).update(
+            status="dispatched", dispatched_at=timezone.now()
+        )
+    return len(tokens)
+
+
+def retry_delay(attempts):
+    """Exponential backoff delay in seconds after ``attempts`` failed tries"""
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** max(0, attempts - 1))
+
+
+def deliver_due(limit=1000, event_id=None):
+    """
+    Send due deliveries, grouped into one push request per event
+
+    Deliveries are claimed by pushing ``next_attempt_at`` forward before
+    sending, so concurrent workers do not send the same token twice.
+    Deliveries refused by the Firebase quota are moved back by
+    QUOTA_RETRY_DELAY without using up an attempt.
+
+    Returns:
+        tuple: (sent_count, failed_count), failed including retried and deferred
+    """
+    now = timezone.now()
+    due = NotificationDelivery.objects.filter(status="pending", next_attempt_at__lte=now)
+    if event_id is not None:
+        due = due.filter(event_id=event_id)
+
+    with transaction.atomic():
+        claimed = list(
+            due.select_for_update(skip_locked=True)
+            .order_by("next_attempt_at")
+            .values_list("id", "event_id", "token", "attempts")[:limit]
+        )
+        if not claimed:
+            return 0, 0
+        NotificationDelivery.objects.filter(id__in=[row[0] for row in claimed]).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_LEASE)
+        )
+
+    by_event = defaultdict(list)
+    for row in claimed:
+        by_event[row[1]].append(row)
+
+    events = NotificationEvent.objects.in_bulk(by_event.keys())
+    max_attempts = getattr(settings, "MAX_ATTEMPTS", 3)
+    sent_ids = []
+    retry_ids = defaultdict(list)
+    failed_ids = []
+    inactive_ids = []
+    deferred_ids = []
+
+    for event_id, rows in by_event.items():
+        event = events[event_id]
+        tokens = [row[2] for row in rows]
+
+        # Tokens without an active device can never be delivered
+        active_tokens = set(
+            FCMDevice.objects.filter(token__in=tokens, is_active=True).values_list("token", flat=True)
+        )
+        try:
+            _, _, failed_tokens, deferred_tokens = send_push_notification(
+                event.title, event.message, [token for token in tokens if token in active_tokens]
+            )
+            failed_tokens, deferred_tokens = set(failed_tokens), set(deferred_tokens)
+        except Exception as e:
+            logger.error(f"Error delivering notification {event.key}: {str(e)}")
+            failed_tokens, deferred_tokens = set(tokens), set()
+
+        for delivery_id, _, token, attempts in rows:
+            if token not in active_tokens:
+                inactive_ids.append(delivery_id)
+            elif token in deferred_tokens:
+                deferred_ids.append(delivery_id)
+            elif token not in failed_tokens:
+                sent_ids.append(delivery_id)
+            elif attempts + 1 >= max_attempts:
+                failed_ids.append(delivery_id)
+            else:
+                retry_ids[attempts + 1].append(delivery_id)
+
+    NotificationDelivery.objects.filter(id__in=sent_ids).update(
+        status="sent", sent_at=timezone.now(), attempts=F("attempts") + 1
+    )
+    NotificationDelivery.objects.filter(id__in=failed_ids).update(
+        status="failed", attempts=F("attempts") + 1, last_error="Delivery failed after retries"
+    )
+    NotificationDelivery.objects.filter(id__in=inactive_ids).update(
+        status="failed", last_error="No active device for this token"
+    )
+    for attempts, ids in retry_ids.items():
+        NotificationDelivery.objects.filter(id__in=ids).update(
+            attempts=attempts,
+            next_attempt_at=timezone.now() + timedelta(seconds=retry_delay(attempts)),
+            last_error="Delivery failed, retry scheduled",
+        )
+    NotificationDelivery.objects.filter(id__in=deferred_ids).update(
+        next_attempt_at=timezone.now() + timedelta(seconds=QUOTA_RETRY_DELAY),
+        last_error="Firebase quota reached, delivery deferred",
+    )
+
+    retried = sum(len(ids) for ids in retry_ids.values()) + len(deferred_ids)
+    return len(sent_ids), len(failed_ids) + len(inactive_ids) + retried
+
+
+def process_event(event_id):
+    """Fan out and deliver a single event immediately"""
+    try:
+        event = NotificationEvent.objects.get(id=event_id)
+        if event.status == "pending":
+            dispatch_event(event)
+        while deliver_due(event_id=event_id) != (0, 0):
+            pass
+    except Exception as e:
+        logger.error(f"Error processing notification event {event_id}: {str(e)}")
+
+
+def process_queue(batch_size=1000):
+    """
+    Run one pass of the worker: fan out pending events and send due deliveries
+
+    Returns:
+        int: Number of events dispatched plus deliveries attempted
+    """
+    work = 0
+    for event in NotificationEvent.objects.filter(status="pending").order_by("created_at")[:100]:
+        dispatch_event(event)
+        work += 1
+
+    sent, failed = deliver_due(limit=batch_size)
+    return work + sent + failed
+
+
+def run_worker(batch_size=1000, sleep=5, once=False):
+    """
+    Process the outbox until MAX_RUN_TIME seconds have passed
+
+    Exits after the time budget so a process supervisor can restart it
+    with fresh connections and code.
+    """
+    deadline = time.monotonic() + getattr(settings, "MAX_RUN_TIME", 3600)
+    while True:
+        work = process_queue(batch_size)
+        if once or time.monotonic() >= deadline:
+            return
+        if not work:
+            time.sleep(sleep)
+
+
+# --------------------------------------------------------------------
+# Queue Status
+# --------------------------------------------------------------------
+
+
+def queue_status():
+    """Get event and delivery counts grouped by status"""
+    events = dict(
+        NotificationEvent.objects.values_list("status").annotate(count=Count("id"))
+    )
+    deliveries = dict(
+        NotificationDelivery.objects.values_list("status").annotate(count=Count("id"))
+    )
+    oldest_pending = (
+        NotificationDelivery.objects.filter(status="pending")
+        .order_by("next_attempt_at")
+        .values_list("next_attempt_at", flat=True)
+        .first()
+    )
+    return {
+        "events": events,
+        "deliveries": deliveries,
+        "oldest_pending": oldest_pending,
+        "quota": fcm_quota.utilisation(),
+    }
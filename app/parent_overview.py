@@ -0,0 +1,182 @@
+# Standard library imports
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+# Core Django imports
+from django.db.models import F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+
+# Local app imports
+from app.models import (
+    AttendanceRecord,
+    AttendanceSummary,
+    CourseTracking,
+    Routine,
+    StudentLeave,
+    Subject,
+)
+
+# Number of recent attendance records shown per child
+RECENT_ATTENDANCE_LIMIT = 10
+
+# Number of leave requests shown across all children
+RECENT_LEAVES_LIMIT = 5
+
+
+# --------------------------------------------------------------------
+# Multi-child Aggregation
+# --------------------------------------------------------------------
+
+
+def get_children_overview(parent, today):
+    """
+    Collect attendance, progress, leaves and current-period routines for all
+    of a parent's children
+
+    Every section is loaded with one grouped query keyed by student id, so a
+    parent with several children costs the same number of queries as a
+    parent with one.
+
+    Args:
+        parent: Parent whose children are summarised
+        today: Date used for today's attendance
+
+    Returns:
+        dict: ``students`` (one info dict per child), ``attendance_summary``,
+        ``course_progress`` and ``recent_leaves``
+    """
+    students = list(parent.students.select_related("course"))
+    student_ids = [student.id for student in students]
+
+    # Newest tracking and newest in-progress tracking per child
+    latest_trackings, active_trackings = {}, {}
+    for tracking in (
+        CourseTracking.objects.filter(student_id__in=student_ids)
+        .select_related("course")
+        .order_by("-created_at")
+    ):
+        latest_trackings.setdefault(tracking.student_id, tracking)
+        if tracking.progress_status == "In Progress":
+            active_trackings.setdefault(tracking.student_id, tracking)
+
+    # Today's presence and overall totals from the attendance summaries
+    present_today = set(
+        AttendanceRecord.objects.filter(
+            student_id__in=student_ids, attendance__date=today, student_attend=True
+        ).values_list("student_id", flat=True)
+    )
+    attendance = {
+        student_id: (present or 0, total or 0)
+        for student_id, present, total in AttendanceSummary.objects.filter(
+            student_id__in=student_ids
+        )
+        .values_list("student_id")
+        .annotate(present=Sum("present_count"), total=Sum("total_count"))
+    }
+
+    # Latest attendance records of every child in one windowed query
+    recent_attendance = defaultdict(list)
+    for record in (
+        AttendanceRecord.objects.filter(student_id__in=student_ids)
+        .select_related("attendance__routine__subject", "attendance__teacher")
+        .annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F("student_id"),
+                order_by=[F("attendance__date").desc(), F("id").desc()],
+            )
+        )
+        .filter(row_number__lte=RECENT_ATTENDANCE_LIMIT)
+        .order_by("student_id", "-attendance__date", "-id")
+    ):
+        recent_attendance[record.student_id].append(record)
+
+    # Leave history of every child, newest first
+    students_by_id = {student.id: student for student in students}
+    all_leaves = list(StudentLeave.objects.filter(student_id__in=student_ids).order_by("-created_at"))
+    leaves = defaultdict(list)
+    for leave in all_leaves:
+        leave.student = students_by_id[leave.student_id]
+        leaves[leave.student_id].append(leave)
+
+    # Subjects and routines of every (course, period) the children are in
+    periods = {
+        (tracking.course_id, tracking.current_period) for tracking in active_trackings.values()
+    }
+    routines = defaultdict(list)
+    routines_by_subject = defaultdict(dict)
+    subjects = defaultdict(list)
+    if periods:
+        period_filter = reduce(
+            or_, (Q(course_id=course_id, period_or_year=period) for course_id, period in periods)
+        )
+        for routine in (
+            Routine.objects.filter(period_filter, is_active=True)
+            .select_related("subject", "teacher")
+            .order_by("start_time")
+        ):
+            routines[(routine.course_id, routine.period_or_year)].append(routine)
+            # Earliest routine of each subject, looked up per subject card
+            routines_by_subject[(routine.course_id, routine.period_or_year)].setdefault(
+                routine.subject_id, routine
+            )
+
+        for subject in Subject.objects.filter(period_filter).order_by("name"):
+            subjects[(subject.course_id, subject.period_or_year)].append(subject)
+
+    children = []
+    course_progress = []
+    for student in students:
+        tracking = active_trackings.get(student.id)
+        period_key = (tracking.course_id, tracking.current_period) if tracking else None
+        statuses = [leave.status for leave in leaves.get(student.id, [])]
+        student.is_present_today = student.id in present_today
+
+        children.append(
+            {
+                "student": student,
+                "course_name": student.course.name if student.course else None,
+                "course_duration_type": student.course.duration_type if student.course else None,
+                "tracking": tracking,
+                "latest_tracking": latest_trackings.get(student.id),
+                "current_period": tracking.current_period if tracking else None,
+                "current_subjects": subjects.get(period_key, []),
+                "current_period_routines": routines.get(period_key, []),
+                "routines_by_subject": routines_by_subject.get(period_key, {}),
+                "attended_classes": attendance.get(student.id, (0, 0))[0],
+                "total_classes": attendance.get(student.id, (0, 0))[1],
+                "recent_attendance": recent_attendance.get(student.id, []),
+                "leaves": leaves.get(student.id, []),
+                "pending_leaves": statuses.count(0),
+                "approved_leaves": statuses.count(1),
+                "rejected_leaves": statuses.count(2),
+            }
+        )
+
+        if tracking:
+            course_progress.append(
+                {
+                    "student": student.name,
+                    "course": tracking.course.name,
+                    "progress": tracking.completion_percentage,
+                    "status": tracking.progress_status,
+                }
+            )
+
+    total_attendance = sum(present for present, _ in attendance.values())
+    total_classes = sum(total for _, total in attendance.values())
+
+    return {
+        "students": children,
+        "attendance_summary": {
+            "total_students": len(students),
+            "students_present_today": len(present_today),
+            "students_absent_today": len(students) - len(present_today),
+            "overall_attendance": (
+                total_attendance / total_classes * 100 if total_classes else 0
+            ),
+        },
+        "course_progress": course_progress,
+        "recent_leaves": all_leaves[:RECENT_LEAVES_LIMIT],
+    }
@@ -16,18 +16,19 @@ from app.models import (
     Batch,
     Course,
     CourseTracking,
+    Institute,
     InstituteFeedback,
     ParentFeedback,
     ParentInstituteFeedback,
     Student,
     StudentFeedback,
-    StudentLeave,
     Subject,
     TeacherParentMeeting,
-    AttendanceRecord,
     Notice,
-    Routine,
 )
+from app.branding import get_institute
+from app.parent_overview import get_children_overview
+from app.permissions import user_in_group
 
 
 @login_required
@@ -37,7 +38,7 @@ def parent_dashboard(request):
     Requires user to be authenticated and belong to the Parent group.
     """
     # Check if user is a parent
-    if not request.user.groups.filter(name="Parent").exists():
+    if not user_in_group(request.user, "Parent"):
         messages.error(request, "Only parents can access this dashboard.")
         return redirect("login")
 
@@ -45,71 +46,14 @@ def parent_dashboard(request):
         parent = request.user
         today = timezone.now().date()
 
-        # Get all students of the parent with their course trackings
-        students = (
-            parent.students.all()
-            .select_related("course")
-            .prefetch_related("course_trackings", "attendance_records")
-        )
+        # Attendance, progress, leaves and routines of all children at once
+        overview = get_children_overview(parent, today)
 
         # Get all meetings without student filtering
-        meetings = TeacherParentMeeting.objects.all().order_by(
-            "-meeting_date", "-meeting_time"
+        meetings = list(
+            TeacherParentMeeting.objects.all().order_by("-meeting_date", "-meeting_time")
         )
 
-        # Get attendance summary for all students
-        attendance_summary = {
-            "total_students": students.count(),
-            "students_present_today": 0,
-            "students_absent_today": 0,
-            "overall_attendance": 0,
-        }
-
-        total_attendance = 0
-        total_classes = 0
-
-        for student in students:
-            # Get today's attendance
-            today_attendance = AttendanceRecord.objects.filter(
-                student=student, attendance__date=today, student_attend=True
-            ).count()
-
-            if today_attendance > 0:
-                attendance_summary["students_present_today"] += 1
-            else:
-                attendance_summary["students_absent_today"] += 1
-
-            # Get overall attendance
-            student_attendance = student.attendance_records.all()
-            total_attendance += student_attendance.filter(student_attend=True).count()
-            total_classes += student_attendance.count()
-
-        if total_classes > 0:
-            attendance_summary["overall_attendance"] = (
-                total_attendance / total_classes
-            ) * 100
-
-        # Get course progress for all students
-        course_progress = []
-        for student in students:
-            active_tracking = student.course_trackings.filter(
-                progress_status="In Progress"
-            ).first()
-            if active_tracking:
-                course_progress.append(
-                    {
-                        "student": student.name,
-                        "course": active_tracking.course.name,
-                        "progress": active_tracking.completion_percentage,
-                        "status": active_tracking.progress_status,
-                    }
-                )
-
-        # Get recent leaves for all students
-        recent_leaves = StudentLeave.objects.filter(student__in=students).order_by(
-            "-created_at"
-        )[:5]
-
         # Get recent teacher feedback
         teacher_feedback = (
             ParentFeedback.objects.filter(parent=parent)
@@ -127,79 +71,13 @@ def parent_dashboard(request):
         # Get notices
         notices = Notice.objects.all().order_by("-created_at")[:5]
 
-        # Get routines for each student
-        student_data = []
-        for student in students:
-            student_info = {
-                "student": student,
-                "course_name": student.course.name if student.course else None,
-                "course_duration_type": student.course.duration_type
-                if student.course
-                else None,
-                "current_period": None,
-                "current_subjects": [],
-                "current_period_routines": [],
-            }
-
-            # Get active course tracking
-            active_tracking = student.course_trackings.filter(
-                progress_status="In Progress"
-            ).first()
-
-            # Get leave counts
-            student_info["pending_leaves"] = student.leave_requests.filter(
-                status=0
-            ).count()
-            student_info["approved_leaves"] = student.leave_requests.filter(
-                status=1
-            ).count()
-            student_info["rejected_leaves"] = student.leave_requests.filter(
-                status=2
-            ).count()
-
-            if active_tracking:
-                student_info["current_period"] = active_tracking.current_period
-
-                # Get routines for the current period
-                current_period_routines = list(
-                    Routine.objects.filter(
-                        course=active_tracking.course,
-                        period_or_year=active_tracking.current_period,
-                        is_active=True,
-                    )
-                    .select_related("subject", "teacher")
-                    .order_by("start_time")
-                )
-
-                # Get current subjects for the student
-                current_subjects = list(
-                    Subject.objects.filter(
-                        course=active_tracking.course,
-                        period_or_year=active_tracking.current_period,
-                    ).order_by("name")
-                )
-
-                print(f"Found {len(current_subjects)} subjects:")
-                for subject in current_subjects:
-                    print(f"- {subject.name}")
-
-                print(f"\nFound {len(current_period_routines)} routines:")
-                for routine in current_period_routines:
-                    print(
-                        f"- {routine.subject.name} ({routine.start_time} - {routine.end_time})"
-                    )
-
-                student_info["current_period_routines"] = current_period_routines
-                student_info["current_subjects"] = current_subjects
-
-            student_data.append(student_info)
-
         context = {
             "parent": parent,
-            "student_data": student_data,
-            "attendance_summary": attendance_summary,
-            "course_progress": course_progress,
-            "recent_leaves": recent_leaves,
+            "student_data": overview["students"],
+            "children": [student_info["student"] for student_info in overview["students"]],
+            "attendance_summary": overview["attendance_summary"],
+            "course_progress": overview["course_progress"],
+            "recent_leaves": overview["recent_leaves"],
             "teacher_feedback": teacher_feedback,
             "institute_feedback": institute_feedback,
             "notices": notices,
@@ -218,7 +96,7 @@ def parent_dashboard(request):
 def submit_parent_feedback(request):
     """View for parents to submit feedback about teachers"""
     # Check if user is a parent
-    if not request.user.groups.filter(name="Parent").exists():
+    if not user_in_group(request.user, "Parent"):
         messages.error(request, "Only parents can submit feedback.")
         return redirect("parent_dashboard")
 
@@ -281,7 +159,7 @@ def submit_parent_feedback(request):
 def submit_parent_institute_feedback(request):
     """View for parents to submit feedback about the institute"""
     # Check if user is a parent
-    if not request.user.groups.filter(name="Parent").exists():
+    if not user_in_group(request.user, "Parent"):
         messages.error(request, "Only parents can submit feedback.")
         return redirect("parent_dashboard")
 
@@ -316,7 +194,7 @@ def submit_parent_institute_feedback(request):
                 return redirect("parent_dashboard")
 
             # Get the institute (assuming one institute for now)
-            institute = Institute.objects.first()
+            institute = get_institute()
 
             if not institute:
                 # Create a default institute if none exists
@@ -365,7 +243,7 @@ def submit_parent_institute_feedback(request):
 def parent_meetings(request):
     """View for redirecting to the parent dashboard meetings section"""
     # Check if user is a parent
-    if not request.user.groups.filter(name="Parent").exists():
+    if not user_in_group(request.user, "Parent"):
         messages.error(request, "Only parents can access meetings.")
         return redirect("parent_dashboard")
 
@@ -465,7 +343,7 @@ def get_meeting_agenda(request, meeting_id):
 def get_student_details(request, student_id):
     """API view to get student details for the modal"""
     # Check if user belongs to Parent group
-    if not request.user.groups.filter(name="Parent").exists():
+    if not user_in_group(request.user, "Parent"):
         return JsonResponse({"error": "Unauthorized access"}, status=403)
 
     try:
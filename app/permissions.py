@@ -0,0 +1,115 @@
+# Standard library imports
+import hashlib
+import time
+
+# Core Django imports
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+
+# Cache settings for permission sets shared by every user with the same groups
+PERMISSION_CACHE_VERSION_KEY = "group_permissions_version"
+PERMISSION_CACHE_TIMEOUT = 86400  # 24 hours
+
+
+# --------------------------------------------------------------------
+# Group Permission Sets
+# --------------------------------------------------------------------
+
+
+def get_user_groups(user):
+    """
+    Get ``(id, name)`` pairs of a user's groups, loaded once per instance
+
+    Returns:
+        tuple: Group id and name pairs ordered by id
+    """
+    if not hasattr(user, "_group_cache"):
+        user._group_cache = tuple(user.groups.order_by("id").values_list("id", "name"))
+    return user._group_cache
+
+
+def user_in_group(user, *names):
+    """
+    Check whether a user belongs to any of the named groups
+
+    Reads the groups loaded by ``get_user_groups``, so repeated checks on
+    the same user instance run at most one query.
+
+    Args:
+        user: User instance
+        *names: Group names, e.g. "HOD"
+
+    Returns:
+        bool: True if the user is in at least one of the groups
+    """
+    return any(name in names for _, name in get_user_groups(user))
+
+
+def get_group_set_permissions(group_ids):
+    """
+    Get the permissions granted by a set of groups
+
+    Every user with the same groups shares one cache entry, loaded with a
+    single join query. Entries are invalidated by bumping the version
+    counter whenever group permissions change. A missing counter starts at
+    the current time in milliseconds, so a counter evicted from the cache
+    never reuses the key of a stale entry.
+
+    Args:
+        group_ids: Iterable of group ids
+
+    Returns:
+        frozenset: Permission strings in ``app_label.codename`` form
+    """
+    group_ids = sorted(set(group_ids))
+    if not group_ids:
+        return frozenset()
+
+    version = cache.get(PERMISSION_CACHE_VERSION_KEY)
+    if version is None:
+        cache.add(PERMISSION_CACHE_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(PERMISSION_CACHE_VERSION_KEY)
+    digest = hashlib.md5(",".join(map(str, group_ids)).encode()).hexdigest()
+    cache_key = f"group_permissions_{version}_{digest}"
+
+    perms = cache.get(cache_key)
+    if perms is None:
+        perms = frozenset(
+            f"{app_label}.{codename}"
+            for app_label, codename in Permission.objects.filter(group__id__in=group_ids)
+            .values_list("content_type__app_label", "codename")
+            .distinct()
+        )
+        cache.set(cache_key, perms, PERMISSION_CACHE_TIMEOUT)
+    return perms
+
+
+def get_user_group_permissions(user):
+    """Get a user's group permissions, memoized on the instance"""
+    if not hasattr(user, "_group_perm_cache"):
+        group_ids = [group_id for group_id, _ in get_user_groups(user)]
+        user._group_perm_cache = get_group_set_permissions(group_ids)
+    return user._group_perm_cache
+
+
+def user_has_perm(user, perm):
+    """Check whether any of the user's groups grant ``perm``"""
+    if not user.is_active:
+        return False
+    return perm in get_user_group_permissions(user)
+
+
+def user_has_module_perms(user, app_label):
+    """Check whether any of the user's groups grant a permission in ``app_label``"""
+    if not user.is_active:
+        return False
+    prefix = f"{app_label}."
+    return any(perm.startswith(prefix) for perm in get_user_group_permissions(user))
+
+
+def invalidate_group_permissions():
+    """Expire every cached group permission set"""
+    try:
+        cache.incr(PERMISSION_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(PERMISSION_CACHE_VERSION_KEY, int(time.time() * 1000), None)
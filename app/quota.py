@@ -0,0 +1,169 @@
+# Standard library imports
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Core Django imports
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+
+try:
+    import fcntl
+except ImportError:  # Windows, file caches are only locked per process
+    fcntl = None
+
+# Cache backends whose incr is a single atomic operation, all others read
+# and write the counter under a lock
+ATOMIC_INCR_BACKENDS = (RedisCache, BaseMemcachedCache, LocMemCache)
+
+# How long one process may hold the right to drop unused tokens
+LIFT_LOCK_TIMEOUT = 1  # seconds
+
+# Serialises counter updates of non-atomic backends within a process
+_fallback_lock = threading.Lock()
+
+
+# --------------------------------------------------------------------
+# Token Bucket
+# --------------------------------------------------------------------
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter shared by every process through the cache
+
+    The cache holds one counter of all permits ever spent. The bucket
+    refills continuously, so by time ``t`` a total of ``t * rate`` permits
+    have been earned and the tokens left are the difference, capped at
+    ``capacity``. Taking permits is a single atomic ``incr``. Overdrawing
+    takes the excess back with a negative ``incr``. Tokens beyond capacity
+    left by an idle bucket are dropped by bumping the counter. No Lua
+    scripts or compare-and-set are needed. Backends without an atomic incr,
+    such as the file or database cache, update the counter under a lock.
+
+    Each process takes ``batch`` permits per cache round trip and hands
+    them out locally. Unused local permits expire after the time the
+    bucket needs to refill a batch, so hoarded permits cannot add up to a
+    burst.
+
+    Args:
+        name: Bucket name, the cache key of its counter
+        rate: Permits earned per second
+        capacity: Most permits the bucket holds, the largest burst
+        batch: Permits taken from the cache per round trip
+        cache_alias: Alias of the cache holding the counter
+    """
+
+    def __init__(self, name, rate, capacity, batch=1, cache_alias="default"):
+        self.key = f"token_bucket_{name}"
+        self.lift_key = f"token_bucket_{name}_lift"
+        self.rate = rate
+        self.capacity = capacity
+        self.batch = max(1, min(batch, capacity))
+        self.cache_alias = cache_alias
+        self.lease = self.batch / rate
+        self._lock = threading.Lock()
+        self._permits = 0
+        self._permits_expire = 0.0
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def acquire(self, count=1):
+        """
+        Take ``count`` permits, all or none
+
+        Returns:
+            bool: Whether the permits were granted
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._permits_expire:
+                self._permits = 0
+            if self._permits < count:
+                granted = self._take(max(self.batch, count - self._permits))
+                if granted:
+                    if not self._permits:
+                        self._permits_expire = now + self.lease
+                    self._permits += granted
+            if self._permits < count:
+                return False
+            self._permits -= count
+            return True
+
+    def utilisation(self):
+        """
+        Describe how much of the bucket is in use across all processes
+
+        Returns:
+            dict: ``capacity``, ``available`` tokens, ``utilisation`` as a
+            fraction of capacity and ``local_permits`` held by this process
+        """
+        spent = self.cache.get(self.key)
+        earned = self._earned()
+        available = self.capacity if spent is None else max(0, min(self.capacity, earned - spent))
+        with self._lock:
+            local = self._permits if time.monotonic() < self._permits_expire else 0
+        return {
+            "capacity": self.capacity,
+            "available": available,
+            "utilisation": round(1 - available / self.capacity, 3),
+            "local_permits": local,
+        }
+
+    def _earned(self):
+        """Permits earned since the epoch"""
+        return int(time.time() * self.rate)
+
+    def _take(self, count):
+        """
+        Take up to ``count`` permits from the shared counter
+
+        Returns:
+            int: Permits granted
+        """
+        with self._shared_lock():
+            earned = self._earned()
+            spent = self._incr(count, earned)
+            available = earned - (spent - count)
+            if available > self.capacity and self.cache.add(self.lift_key, 1, LIFT_LOCK_TIMEOUT):
+                # Tokens beyond capacity were never spent, drop them
+                spent = self.cache.incr(self.key, available - self.capacity)
+                available = earned - (spent - count)
+
+            granted = max(0, min(count, available))
+            if granted < count:
+                self.cache.incr(self.key, granted - count)
+            return granted
+
+    def _incr(self, count, earned):
+        """Add ``count`` to the counter, creating a full bucket if it is missing"""
+        try:
+            return self.cache.incr(self.key, count)
+        except ValueError:
+            self.cache.add(self.key, earned - self.capacity, None)
+            return self.cache.incr(self.key, count)
+
+    @contextmanager
+    def _shared_lock(self):
+        """Serialise counter updates if the backend's incr is not atomic"""
+        if isinstance(self.cache, ATOMIC_INCR_BACKENDS):
+            yield
+            return
+
+        with _fallback_lock:
+            if fcntl is None or not isinstance(self.cache, FileBasedCache):
+                yield
+                return
+            os.makedirs(self.cache._dir, exist_ok=True)
+            with open(os.path.join(self.cache._dir, f"{self.key}.lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -1,69 +1,60 @@
+# Standard library imports
+import itertools
+from contextvars import ContextVar
+
+# Core Django imports
 from django.conf import settings
-from django.db import models
-from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+# Set once the current request or task writes, later reads then use the
+# primary so they see their own writes
+primary_pinned = ContextVar("primary_pinned", default=False)
+
+# Apps whose rows are read right after being written by a previous request,
+# e.g. the session created by a login and read by the redirect that follows
+PRIMARY_ONLY_APPS = frozenset({"sessions"})
+
 
 class DatabaseRouter:
     """
-    A router to control database operations and optimize query routing
+    Primary/replica router
+
+    Writes go to the primary. Reads are spread round-robin across the
+    replicas in ``settings.DATABASE_REPLICAS`` until the current context
+    writes, after which it reads from the primary too. The decision is made
+    in memory, without a cache round-trip.
     """
-    
+
+    def __init__(self):
+        self.replicas = list(getattr(settings, "DATABASE_REPLICAS", []))
+        self._replica_cycle = itertools.cycle(self.replicas)
+
     def db_for_read(self, model, **hints):
         """
-        Route read operations to the appropriate database
+        Route read operations to the next replica, or the primary when pinned
         """
-        # Check if model has a cached query
-        cache_key = f"db_read_{model._meta.model_name}"
-        cached_db = cache.get(cache_key)
-        if cached_db:
-            return cached_db
-            
-        # Default to primary database
-        return 'default'
+        if not self.replicas or primary_pinned.get():
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return next(self._replica_cycle)
 
     def db_for_write(self, model, **hints):
         """
-        Route write operations to the appropriate database
+        Route write operations to the primary and pin later reads to it
         """
-        return 'default'
+        if not primary_pinned.get():
+            primary_pinned.set(True)
+        return DEFAULT_DB_ALIAS
 
     def allow_relation(self, obj1, obj2, **hints):
         """
-        Allow relations between objects
+        Allow relations between objects, every alias holds the same data
         """
         return True
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
         """
-        Allow migrations on the default database
+        Allow migrations on the primary only, replicas copy its schema
         """
-        return db == 'default'
-
-    def optimize_query(self, queryset, **hints):
-        """
-        Optimize the query based on model and hints
-        """
-        # Add select_related for foreign key relationships
-        if hasattr(queryset.model, '_meta'):
-            related_fields = [
-                f.name for f in queryset.model._meta.get_fields()
-                if f.is_relation and not f.many_to_many
-            ]
-            if related_fields:
-                queryset = queryset.select_related(*related_fields)
-
-        # Add prefetch_related for many-to-many relationships
-        m2m_fields = [
-            f.name for f in queryset.model._meta.get_fields()
-            if f.many_to_many
-        ]
-        if m2m_fields:
-            queryset = queryset.prefetch_related(*m2m_fields)
-
-        # Add caching for frequently accessed queries
-        if hints.get('cache', True):
-            cache_key = f"query_{queryset.model._meta.model_name}_{hash(str(queryset.query))}"
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                return cached_result
-
-        return queryset 
\ No newline at end of file
+        return db == DEFAULT_DB_ALIAS
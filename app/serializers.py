@@ -3,6 +3,7 @@ import django.db
 
 # Third-party app imports
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
 
 # Local app imports
 from app.firebase import FCMDevice
@@ -33,13 +34,78 @@ from app.models import (
 )
 
 
-class FCMDeviceSerializer(serializers.ModelSerializer):
+# --------------------------------------------------------------------
+# Sparse Fieldsets
+# --------------------------------------------------------------------
+
+
+def parse_field_selection(fields):
+    """
+    Parse a ``?fields=`` value into a nested selection
+
+    Args:
+        fields: Comma separated field names, dotted names select fields of
+            a nested serializer, e.g. ``"id,name,course.name"``
+
+    Returns:
+        dict: Field name to its nested selection, None selects the whole field
+    """
+    selection = {}
+    for path in fields.split(","):
+        names = [name.strip() for name in path.split(".")]
+        if not all(names):
+            continue
+        level = selection
+        for name in names[:-1]:
+            if level.get(name, {}) is None:
+                break  # The whole field is already selected
+            level = level.setdefault(name, {})
+        else:
+            level[names[-1]] = None
+    return selection
+
+
+class SparseFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    Model serializer that can be limited to a subset of its fields
+
+    Pass ``fields="id,name,course.name"`` (or a parsed selection) to keep only
+    those fields. Unselected fields are dropped before representation, so
+    their nested serializers and method fields never run. Write-only fields
+    are always kept.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.selection = parse_field_selection(fields) if isinstance(fields, str) else fields
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.selection is None:
+            return fields
+
+        unknown = sorted(set(self.selection) - set(fields))
+        if unknown:
+            raise ValidationError({"fields": [f"Unknown field: {name}" for name in unknown]})
+        for name in list(fields):
+            if name not in self.selection and not fields[name].write_only:
+                del fields[name]
+        for name, selection in self.selection.items():
+            if selection:
+                nested = getattr(fields[name], "child", fields[name])
+                if not isinstance(nested, SparseFieldsModelSerializer):
+                    raise ValidationError({"fields": [f"Field has no nested fields: {name}"]})
+                nested.selection = selection
+        return fields
+
+
+class FCMDeviceSerializer(SparseFieldsModelSerializer):
     class Meta:
         model = FCMDevice
         fields = ["id", "token"]
 
 
-class InstituteSerializer(serializers.ModelSerializer):
+class InstituteSerializer(SparseFieldsModelSerializer):
     logo_url = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
     updated_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -68,7 +134,7 @@ class InstituteSerializer(serializers.ModelSerializer):
         return None
 
 
-class BatchSerializer(serializers.ModelSerializer):
+class BatchSerializer(SparseFieldsModelSerializer):
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
     updated_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
 
@@ -85,7 +151,7 @@ class BatchSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsModelSerializer):
     subjects = serializers.SerializerMethodField()
     batches = BatchSerializer(many=True, read_only=True)
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -107,14 +173,18 @@ class CourseSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
+        # Relations read by method fields, prefetched when the field is selected
+        method_field_lookups = {"subjects": ["subject_set"]}
 
     def get_subjects(self, obj):
         from app.serializers import SubjectSerializer
-        subjects = obj.subjects.all()
-        return SubjectSerializer(subjects, many=True).data
+        subjects = obj.subject_set.all()
+        # Subjects are listed under their course, so leave the course out
+        fields = {name: None for name in SubjectSerializer.Meta.fields if name != "course"}
+        return SubjectSerializer(subjects, many=True, fields=fields).data
 
 
-class SubjectSerializer(serializers.ModelSerializer):
+class SubjectSerializer(SparseFieldsModelSerializer):
     course = CourseSerializer(read_only=True)
     syllabus_pdf_url = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -130,7 +200,6 @@ class SubjectSerializer(serializers.ModelSerializer):
             "period_or_year",
             "syllabus_pdf",
             "syllabus_pdf_url",
-            "is_active",
             "created_at",
             "updated_at",
         ]
@@ -142,9 +211,15 @@ class SubjectSerializer(serializers.ModelSerializer):
         return None
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsModelSerializer):
     batches = BatchSerializer(many=True, read_only=True)
     course = CourseSerializer(read_only=True)
+    batch_ids = serializers.PrimaryKeyRelatedField(
+        source="batches", queryset=Batch.objects.all(), many=True, write_only=True, required=False
+    )
+    course_id = serializers.PrimaryKeyRelatedField(
+        source="course", queryset=Course.objects.all(), write_only=True, required=False
+    )
     image_url = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
     updated_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -169,9 +244,10 @@ class StudentSerializer(serializers.ModelSerializer):
             "image_url",
             "batches",
             "course",
+            "batch_ids",
+            "course_id",
             "current_period",
             "joining_date",
-            "fcm_token",
             "created_at",
             "updated_at",
         ]
@@ -183,7 +259,7 @@ class StudentSerializer(serializers.ModelSerializer):
         return None
 
 
-class StaffSerializer(serializers.ModelSerializer):
+class StaffSerializer(SparseFieldsModelSerializer):
     image_url = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
     updated_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -209,7 +285,6 @@ class StaffSerializer(serializers.ModelSerializer):
             "image_url",
             "joining_date",
             "is_active",
-            "fcm_token",
             "created_at",
             "updated_at",
         ]
@@ -221,10 +296,19 @@ class StaffSerializer(serializers.ModelSerializer):
         return None
 
 
-class RoutineSerializer(serializers.ModelSerializer):
+class RoutineSerializer(SparseFieldsModelSerializer):
     course = CourseSerializer(read_only=True)
     subject = SubjectSerializer(read_only=True)
     teacher = StaffSerializer(read_only=True)
+    course_id = serializers.PrimaryKeyRelatedField(
+        source="course", queryset=Course.objects.all(), write_only=True, required=False
+    )
+    subject_id = serializers.PrimaryKeyRelatedField(
+        source="subject", queryset=Subject.objects.all(), write_only=True, required=False
+    )
+    teacher_id = serializers.PrimaryKeyRelatedField(
+        source="teacher", queryset=Staff.objects.all(), write_only=True, required=False
+    )
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
     updated_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
 
@@ -235,6 +319,9 @@ class RoutineSerializer(serializers.ModelSerializer):
             "course",
             "subject",
             "teacher",
+            "course_id",
+            "subject_id",
+            "teacher_id",
             "start_time",
             "end_time",
             "period_or_year",
@@ -245,53 +332,60 @@ class RoutineSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
-class AttendanceSerializer(serializers.ModelSerializer):
-    routine = RoutineSerializer(read_only=True)
-    teacher = StaffSerializer(read_only=True)
-    records = serializers.SerializerMethodField()
+class AttendanceRecordSerializer(SparseFieldsModelSerializer):
+    student = StudentSerializer(read_only=True)
+    student_id = serializers.PrimaryKeyRelatedField(
+        source="student", queryset=Student.objects.all(), write_only=True, required=False
+    )
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
     updated_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
 
     class Meta:
-        model = Attendance
+        model = AttendanceRecord
         fields = [
             "id",
-            "date",
-            "routine",
-            "teacher",
-            "teacher_attend",
-            "class_status",
-            "records",
+            "attendance",
+            "student",
+            "student_id",
+            "student_attend",
             "created_at",
             "updated_at",
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
 
-    def get_records(self, obj):
-        from app.serializers import AttendanceRecordSerializer
-        records = obj.records.all()
-        return AttendanceRecordSerializer(records, many=True).data
 
-
-class AttendanceRecordSerializer(serializers.ModelSerializer):
-    student = StudentSerializer(read_only=True)
+class AttendanceSerializer(SparseFieldsModelSerializer):
+    routine = RoutineSerializer(read_only=True)
+    teacher = StaffSerializer(read_only=True)
+    routine_id = serializers.PrimaryKeyRelatedField(
+        source="routine", queryset=Routine.objects.all(), write_only=True, required=False
+    )
+    teacher_id = serializers.PrimaryKeyRelatedField(
+        source="teacher", queryset=Staff.objects.all(), write_only=True, required=False
+    )
+    records = AttendanceRecordSerializer(many=True, read_only=True)
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
     updated_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
 
     class Meta:
-        model = AttendanceRecord
+        model = Attendance
         fields = [
             "id",
-            "attendance",
-            "student",
-            "student_attend",
+            "date",
+            "routine",
+            "teacher",
+            "routine_id",
+            "teacher_id",
+            "teacher_attend",
+            "class_status",
+            "records",
             "created_at",
             "updated_at",
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
-class NoticeSerializer(serializers.ModelSerializer):
+class NoticeSerializer(SparseFieldsModelSerializer):
     image_url = serializers.SerializerMethodField()
     file_url = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -323,7 +417,7 @@ class NoticeSerializer(serializers.ModelSerializer):
         return None
 
 
-class StaffLeaveSerializer(serializers.ModelSerializer):
+class StaffLeaveSerializer(SparseFieldsModelSerializer):
     staff = StaffSerializer(read_only=True)
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
     updated_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -343,7 +437,7 @@ class StaffLeaveSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
-class StudentLeaveSerializer(serializers.ModelSerializer):
+class StudentLeaveSerializer(SparseFieldsModelSerializer):
     student = StudentSerializer(read_only=True)
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
     updated_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -363,7 +457,7 @@ class StudentLeaveSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
-class StudentFeedbackSerializer(serializers.ModelSerializer):
+class StudentFeedbackSerializer(SparseFieldsModelSerializer):
     student = StudentSerializer(read_only=True)
     teacher = StaffSerializer(read_only=True)
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -383,7 +477,7 @@ class StudentFeedbackSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
-class ParentFeedbackSerializer(serializers.ModelSerializer):
+class ParentFeedbackSerializer(SparseFieldsModelSerializer):
     parent = serializers.SerializerMethodField()
     teacher = StaffSerializer(read_only=True)
     student = StudentSerializer(read_only=True)
@@ -409,7 +503,7 @@ class ParentFeedbackSerializer(serializers.ModelSerializer):
         return ParentSerializer(obj.parent).data
 
 
-class InstituteFeedbackSerializer(serializers.ModelSerializer):
+class InstituteFeedbackSerializer(SparseFieldsModelSerializer):
     institute = InstituteSerializer(read_only=True)
     user = StudentSerializer(read_only=True)
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -432,7 +526,7 @@ class InstituteFeedbackSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
-class StaffInstituteFeedbackSerializer(serializers.ModelSerializer):
+class StaffInstituteFeedbackSerializer(SparseFieldsModelSerializer):
     institute = InstituteSerializer(read_only=True)
     staff = StaffSerializer(read_only=True)
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -455,7 +549,7 @@ class StaffInstituteFeedbackSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
-class ParentInstituteFeedbackSerializer(serializers.ModelSerializer):
+class ParentInstituteFeedbackSerializer(SparseFieldsModelSerializer):
     institute = InstituteSerializer(read_only=True)
     parent = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -482,9 +576,15 @@ class ParentInstituteFeedbackSerializer(serializers.ModelSerializer):
         return ParentSerializer(obj.parent).data
 
 
-class CourseTrackingSerializer(serializers.ModelSerializer):
+class CourseTrackingSerializer(SparseFieldsModelSerializer):
     student = StudentSerializer(read_only=True)
     course = CourseSerializer(read_only=True)
+    student_id = serializers.PrimaryKeyRelatedField(
+        source="student", queryset=Student.objects.all(), write_only=True, required=False
+    )
+    course_id = serializers.PrimaryKeyRelatedField(
+        source="course", queryset=Course.objects.all(), write_only=True, required=False
+    )
     current_period_display = serializers.CharField(read_only=True)
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
     updated_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -495,6 +595,8 @@ class CourseTrackingSerializer(serializers.ModelSerializer):
             "id",
             "student",
             "course",
+            "student_id",
+            "course_id",
             "enrollment_date",
             "start_date",
             "expected_end_date",
@@ -512,7 +614,7 @@ class CourseTrackingSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at", "current_period_display"]
 
 
-class SubjectFileSerializer(serializers.ModelSerializer):
+class SubjectFileSerializer(SparseFieldsModelSerializer):
     file_url = serializers.SerializerMethodField()
     uploaded_by = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -546,21 +648,21 @@ class SubjectFileSerializer(serializers.ModelSerializer):
         return None
 
 
-class TOTPSecretSerializer(serializers.ModelSerializer):
+class TOTPSecretSerializer(SparseFieldsModelSerializer):
     class Meta:
         model = TOTPSecret
         fields = ["id", "identifier", "secret_key", "created_at", "expires_at"]
         read_only_fields = ["id", "created_at"]
 
 
-class ResetTokenSerializer(serializers.ModelSerializer):
+class ResetTokenSerializer(SparseFieldsModelSerializer):
     class Meta:
         model = ResetToken
         fields = ["id", "token", "identifier", "created_at", "expires_at"]
         read_only_fields = ["id", "created_at"]
 
 
-class ParentSerializer(serializers.ModelSerializer):
+class ParentSerializer(SparseFieldsModelSerializer):
     students = StudentSerializer(many=True, read_only=True)
     image_url = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", read_only=True)
@@ -577,7 +679,6 @@ class ParentSerializer(serializers.ModelSerializer):
             "students",
             "image",
             "image_url",
-            "fcm_token",
             "is_active",
             "created_at",
             "updated_at",
@@ -1,21 +1,23 @@
 # Standard library imports
-import random
 from datetime import date, timedelta
 
 # Core Django imports
 from django.contrib.auth.hashers import make_password
-from django.contrib.auth.models import Group, Permission
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.auth.signals import user_logged_in
 from django.core.cache import cache
-from django.core.signals import request_started
 from django.db import transaction
-from django.db.models import Q
-from django.db.models.signals import m2m_changed, post_migrate, post_save, post_delete, pre_save
+from django.db.models.signals import m2m_changed, post_migrate, post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 import logging
 from django.utils import timezone
 
 # Local app imports
-from app.firebase import FCMDevice, send_push_notification
+from app.attendance import schedule_summary_rebuild
+from app.backends import SESSION_USER_MODEL_KEY, invalidate_session_user
+from app.firebase import FCMDevice, device_owner
+from app.fragment_cache import VOLATILE_FIELDS, bump_fragment_versions, groups_for_model
+from app.permissions import invalidate_group_permissions
 from app.models import (
     Batch,
     CourseTracking,
@@ -34,9 +36,15 @@ from app.models import (
     Attendance,
     ParentFeedback,
     ParentInstituteFeedback,
+    StudentFeedback,
+    Institute,
+    InstituteFeedback,
+    StaffInstituteFeedback,
     Routine,
     SubjectFile,
+    LoginIdentifier,
 )
+from app.notifications import enqueue_notification
 from app.utils import cleanup_expired_tokens
 
 logger = logging.getLogger(__name__)
@@ -56,42 +64,6 @@ def update_completion_percentage(sender, instance, **kwargs):
     cache.set(cache_key, instance.completion_percentage, 3600)  # Cache for 1 hour
 
 
-@receiver(request_started)
-def periodic_update_course_completion(sender, **kwargs):
-    """
-    Signal that updates course completion percentages randomly on request start.
-    This ensures periodic updates without overwhelming the system.
-    Only runs with 1% probability per request to avoid performance impact.
-    """
-    # Run this signal with 1% probability to avoid running on every request
-    if random.random() <= 0.01:  # 1% chance to run on any request
-        # Get all active course trackings (not completed or dropped)
-        active_trackings = CourseTracking.objects.filter(
-            Q(progress_status="In Progress") | Q(progress_status="Not Started")
-        )
-
-        updated_count = 0
-        for tracking in active_trackings:
-            old_percentage = tracking.completion_percentage
-            new_percentage = tracking.update_completion_percentage()
-
-            # If percentage changed, it was updated
-            if old_percentage != new_percentage:
-                updated_count += 1
-
-            # Check if course is now complete (100%)
-            if new_percentage >= 100 and tracking.progress_status != "Completed":
-                tracking.progress_status = "Completed"
-                tracking.actual_end_date = date.today()
-                tracking.save()
-
-        # Cache the last update timestamp
-        if updated_count > 0:
-            cache.set(
-                "last_course_percentage_update", date.today().isoformat(), 86400
-            )  # 24 hours
-
-
 # --------------------------------------------------------------------
 # Student and Course Signals
 # --------------------------------------------------------------------
@@ -180,6 +152,95 @@ def sync_course_tracking_period(sender, instance, created, **kwargs):
         instance.student.save()
 
 
+# --------------------------------------------------------------------
+# Login Identifier Signals
+# --------------------------------------------------------------------
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Staff)
+@receiver(post_save, sender=Parent)
+@receiver(post_save, sender=Student)
+def sync_login_identifiers(sender, instance, update_fields=None, **kwargs):
+    """
+    Keep the login identifier index in sync with phone/email changes
+    Saves that only touch other fields (e.g. set_password) are skipped
+    """
+    if update_fields is not None and not set(update_fields) & set(
+        LoginIdentifier.fields_for(instance._meta.label_lower)
+    ):
+        return
+    try:
+        LoginIdentifier.sync(instance)
+    except Exception as e:
+        logger.error(f"Error syncing login identifiers for {instance._meta.label_lower}:{instance.pk}: {str(e)}")
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Staff)
+@receiver(post_delete, sender=Parent)
+@receiver(post_delete, sender=Student)
+def remove_login_identifiers(sender, instance, **kwargs):
+    """Drop login identifiers of deleted accounts"""
+    try:
+        LoginIdentifier.remove(instance)
+    except Exception as e:
+        logger.error(f"Error removing login identifiers for {instance._meta.label_lower}:{instance.pk}: {str(e)}")
+
+
+@receiver(user_logged_in)
+def store_session_user_model(sender, request, user, **kwargs):
+    """Remember which user table the logged in account lives in"""
+    request.session[SESSION_USER_MODEL_KEY] = user._meta.label_lower
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Staff)
+@receiver(post_save, sender=Parent)
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Staff)
+@receiver(post_delete, sender=Parent)
+@receiver(post_delete, sender=Student)
+def invalidate_cached_session_user(sender, instance, **kwargs):
+    """Evict saved or deleted accounts from the session user cache"""
+    invalidate_session_user(instance)
+
+
+# --------------------------------------------------------------------
+# Device Registry Signals
+# --------------------------------------------------------------------
+
+
+@receiver(post_save, sender=Staff)
+@receiver(post_save, sender=Student)
+def sync_device_owner(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Copy course and role changes onto the owner's registered devices
+    Saves that touch neither course nor designation are skipped
+    """
+    if created or (update_fields is not None and not {"course", "designation"} & set(update_fields)):
+        return
+    try:
+        owner = device_owner(instance)
+        FCMDevice.owned_by(instance).exclude(
+            course_id=owner["course_id"], role=owner["role"]
+        ).update(course_id=owner["course_id"], role=owner["role"])
+    except Exception as e:
+        logger.error(f"Error syncing devices for {instance._meta.label_lower}:{instance.pk}: {str(e)}")
+
+
+@receiver(post_delete, sender=Staff)
+@receiver(post_delete, sender=Parent)
+@receiver(post_delete, sender=Student)
+def remove_owner_devices(sender, instance, **kwargs):
+    """Drop the registered devices of deleted accounts"""
+    try:
+        FCMDevice.owned_by(instance).delete()
+    except Exception as e:
+        logger.error(f"Error removing devices for {instance._meta.label_lower}:{instance.pk}: {str(e)}")
+
+
 # --------------------------------------------------------------------
 # Parent and Student Relationship Signals
 # --------------------------------------------------------------------
@@ -391,6 +452,19 @@ def create_user_groups(sender, **kwargs):
             logger.error(f"Error creating default user groups: {str(e)}")
 
 
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permission_cache(sender, action, **kwargs):
+    """Expire cached permission sets when group permissions change"""
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_group_permissions()
+
+
+@receiver(post_delete, sender=Permission)
+def invalidate_deleted_permission(sender, instance, **kwargs):
+    """Expire cached permission sets when a permission is deleted"""
+    invalidate_group_permissions()
+
+
 # --------------------------------------------------------------------
 # Batch and Student Enrollment Signals
 # --------------------------------------------------------------------
@@ -432,47 +506,102 @@ def handle_student_batch_change(
 @receiver(post_save, sender=Notice)
 def send_notice_notification(sender, instance, created, **kwargs):
     """
-    Send notification when a notice is created or updated
+    Queue a notification when a notice is created or updated
+    Views may set ``_notify_course`` to limit recipients to one course
     """
     try:
+        message = instance.message or ""
+        if len(message) > 100:
+            message = message[:100] + "..."
+
         if created:
-            title = "New Notice"
-            message = instance.message
+            key = f"notice:{instance.id}:created"
+            title = f"New Notice: {instance.title}"
         else:
+            key = f"notice:{instance.id}:updated:{timezone.now().timestamp()}"
             title = "Notice Updated"
-            message = instance.message
-            
-        # Get all active FCM tokens
-        tokens = list(instance.get_notification_tokens())
-        
-        if tokens:
-            send_push_notification(title, message, tokens)
-            logger.info(f"Sent notice notification to {len(tokens)} devices")
+
+        enqueue_notification(
+            key, title, message, course=getattr(instance, "_notify_course", None)
+        )
+        logger.info(f"Queued notice notification {key}")
     except Exception as e:
-        logger.error(f"Error sending notice notification: {str(e)}")
+        logger.error(f"Error queueing notice notification: {str(e)}")
 
 
 @receiver(post_save, sender=TeacherParentMeeting)
 def send_meeting_notification(sender, instance, created, **kwargs):
     """
-    Send notification when a meeting is created or updated
+    Queue a notification when a meeting is created, updated or cancelled
+    Views may set ``_notify_course`` to limit recipients to one course
     """
     try:
+        when = f"{instance.meeting_date} at {instance.meeting_time}"
         if created:
-            title = "New Parent-Teacher Meeting"
-            message = f"Meeting scheduled for {instance.meeting_date} at {instance.meeting_time}"
+            key = f"meeting:{instance.id}:created"
+            title = "New Meeting Scheduled"
+            message = f"A new meeting has been scheduled for {when}"
+        elif instance.status == "cancelled" and instance.tracker.has_changed("status"):
+            key = f"meeting:{instance.id}:cancelled"
+            title = "Meeting Cancelled"
+            message = f"Meeting scheduled for {when} has been cancelled"
         else:
+            key = f"meeting:{instance.id}:updated:{instance.updated_at.timestamp()}"
             title = "Meeting Updated"
-            message = f"Meeting details updated for {instance.meeting_date}"
-            
-        # Get all active FCM tokens
-        tokens = list(instance.get_notification_tokens())
-        
-        if tokens:
-            send_push_notification(title, message, tokens)
-            logger.info(f"Sent meeting notification to {len(tokens)} devices")
+            message = f"Meeting scheduled for {when} has been updated"
+
+        enqueue_notification(
+            key, title, message, course=getattr(instance, "_notify_course", None)
+        )
+        logger.info(f"Queued meeting notification {key}")
     except Exception as e:
-        logger.error(f"Error sending meeting notification: {str(e)}")
+        logger.error(f"Error queueing meeting notification: {str(e)}")
+
+
+# --------------------------------------------------------------------
+# Fragment Cache Signals
+# --------------------------------------------------------------------
+
+
+@receiver(post_save, sender=Notice)
+@receiver(post_save, sender=Routine)
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=SubjectFile)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Staff)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=StudentFeedback)
+@receiver(post_save, sender=ParentFeedback)
+@receiver(post_save, sender=InstituteFeedback)
+@receiver(post_save, sender=StaffInstituteFeedback)
+@receiver(post_save, sender=ParentInstituteFeedback)
+@receiver(post_save, sender=Institute)
+@receiver(post_save, sender=Batch)
+@receiver(post_delete, sender=Notice)
+@receiver(post_delete, sender=Routine)
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=SubjectFile)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Staff)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=StudentFeedback)
+@receiver(post_delete, sender=ParentFeedback)
+@receiver(post_delete, sender=InstituteFeedback)
+@receiver(post_delete, sender=StaffInstituteFeedback)
+@receiver(post_delete, sender=ParentInstituteFeedback)
+@receiver(post_delete, sender=Institute)
+@receiver(post_delete, sender=Batch)
+def expire_dashboard_fragments(sender, instance, update_fields=None, **kwargs):
+    """
+    Expire cached dashboard fragments that render the saved or deleted instance
+
+    Versions are bumped after commit so no request can cache the old rows
+    under the new version.
+    """
+    if update_fields and set(update_fields) <= VOLATILE_FIELDS:
+        return
+    groups = groups_for_model(sender.__name__)
+    transaction.on_commit(lambda: bump_fragment_versions(groups))
 
 
 # --------------------------------------------------------------------
@@ -642,6 +771,36 @@ def validate_staff_data(sender, instance, **kwargs):
         logger.error(f"Error validating staff data: {str(e)}")
         raise
 
+# --------------------------------------------------------------------
+# Attendance Summary Signals
+# --------------------------------------------------------------------
+
+
+@receiver(post_save, sender=AttendanceRecord)
+@receiver(post_delete, sender=AttendanceRecord)
+def refresh_record_attendance_summary(sender, instance, origin=None, **kwargs):
+    """Keep summaries in sync with records edited outside save_attendance (e.g. admin)"""
+    # Cascades from sessions schedule one rebuild for all of their students,
+    # summaries of deleted students are removed by their own cascade
+    if origin is not None and getattr(origin, "model", type(origin)) is not AttendanceRecord:
+        return
+    schedule_summary_rebuild([instance.student_id])
+
+
+@receiver(post_save, sender=Attendance)
+def refresh_session_attendance_summaries(sender, instance, created, update_fields=None, **kwargs):
+    """Rebuild summaries when a session moves to another routine or date"""
+    if created or (update_fields and not {"routine", "date"} & set(update_fields)):
+        return
+    schedule_summary_rebuild(instance.records.values_list("student_id", flat=True))
+
+
+@receiver(pre_delete, sender=Attendance)
+def remove_session_attendance_summaries(sender, instance, **kwargs):
+    """Rebuild summaries of a deleted session's students after it is gone"""
+    schedule_summary_rebuild(list(instance.records.values_list("student_id", flat=True)))
+
+
 # --------------------------------------------------------------------
 # Course Progress Signals
 # --------------------------------------------------------------------
@@ -652,15 +811,11 @@ def update_course_progress(sender, instance, **kwargs):
     Update course progress when tracking data changes
     """
     try:
-        # Update completion percentage
-        instance.update_completion_percentage()
-        
-        # Update progress status
-        if instance.completion_percentage >= 100:
-            instance.progress_status = "Completed"
-            instance.actual_end_date = date.today()
-            instance.save()
-        
+        # Completion percentage and progress status were recomputed by
+        # CourseTracking.save() just before this save, so only caches need
+        # refreshing here; bulk recomputes go through
+        # CourseTracking.objects.recompute_completion()
+
         # Clear cache using individual keys instead of pattern
         cache.delete(f"course_tracking_{instance.id}_percentage")
         cache.delete(f"student_{instance.student.id}_progress")
@@ -2,8 +2,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Q, Avg
+from django.db.models import Count, Q, Avg, Prefetch, prefetch_related_objects
 from django.utils import timezone
+from collections import defaultdict
 from datetime import timedelta, datetime
 from django.views.decorators.http import require_http_methods, require_GET
 from django.contrib.auth.hashers import check_password, make_password
@@ -25,6 +26,10 @@ from app.models import (
     FEEDBACK_TYPE_CHOICES,
 )
 import logging
+from app.attendance import parse_attendance_marks, record_attendance
+from app.branding import get_institute
+from app.metrics import count_queries
+from app.permissions import user_in_group
 from app.utils import (
     handle_file_upload,
     cleanup_failed_upload,
@@ -35,11 +40,12 @@ from app.utils import (
 
 
 @login_required
+@count_queries("teacherDashboard")
 def teacherDashboard(request):
     """View to display the teacher dashboard with their classes and student information"""
 
     # Check if user is in Teacher group
-    if not request.user.groups.filter(name="Teacher").exists():
+    if not user_in_group(request.user, "Teacher"):
         print(request, "You don't have permission to access the teacher dashboard.")
         return redirect("dashboard")
 
@@ -62,42 +68,65 @@ def teacherDashboard(request):
     current_time = timezone.now().time()
     last_week = today - timedelta(days=7)
 
-    # Get only the active routines assigned to this teacher
-    today_routines = Routine.objects.filter(
-        teacher=teacher,  # Filter by the current teacher
-        is_active=True,  # Only include active routines
-    ).order_by("start_time")
+    # Shared templates read teacher.groups.all several times per render
+    prefetch_related_objects([teacher], "groups")
 
-    # Process routines to include status and attendance
-    processed_routines = []
-    for routine in today_routines:
-        attendance = routine.attendances.filter(date=today).first()
-
-        # Get total active students for this routine - matching the get_students logic
-        students = Student.objects.filter(
-            course=routine.subject.course,
-            current_period=routine.period_or_year,
-            status="Active",  # Only count active students
-        )
-
-        # If no students found with exact period match, try more flexible approach
-        if not students.exists():
-            students = Student.objects.filter(
-                course=routine.subject.course,
-                status="Active",  # Still only count active students
+    # Every active routine of the teacher, loaded once and reused by each section
+    routines = list(
+        Routine.objects.filter(teacher=teacher, is_active=True)
+        .select_related("subject__course", "course")
+        .prefetch_related(
+            Prefetch(
+                "subject__subjectfile_set",
+                queryset=SubjectFile.objects.select_related("uploaded_by").order_by("-uploaded_at"),
             )
+        )
+        .order_by("start_time")
+    )
+    course_ids = {routine.subject.course_id for routine in routines} | {
+        routine.course_id for routine in routines
+    }
 
-        total_students = students.count()
+    # Today's attendance sessions with their present counts
+    attendance_map = {
+        attendance.routine_id: attendance
+        for attendance in Attendance.objects.filter(
+            routine_id__in=[routine.id for routine in routines], date=today
+        ).annotate(present_count=Count("records", filter=Q(records__student_attend=True)))
+    }
 
-        attendance_count = (
-            0
-            if not attendance
-            else AttendanceRecord.objects.filter(
-                attendance=attendance, student_attend=True
-            ).count()
+    # Active students per (course, period), the roster of every routine
+    roster_counts = defaultdict(int)
+    course_roster_counts = defaultdict(int)
+    for course_id, period, count in (
+        Student.objects.filter(course_id__in=course_ids, status="Active")
+        .values_list("course_id", "current_period")
+        .annotate(count=Count("id"))
+    ):
+        roster_counts[(course_id, period)] = count
+        course_roster_counts[course_id] += count
+
+    # In progress course trackings per (course, period)
+    tracking_counts = dict(
+        ((course_id, period), count)
+        for course_id, period, count in CourseTracking.objects.filter(
+            course_id__in=course_ids, progress_status="In Progress"
         )
+        .values_list("course_id", "current_period")
+        .annotate(count=Count("id"))
+    )
+
+    # Process routines to include status and attendance
+    processed_routines = []
+    for routine in routines:
+        attendance = attendance_map.get(routine.id)
+        course_id = routine.subject.course_id
+
+        # Students of the routine's period, or the whole course if that period is empty
+        total_students = roster_counts.get(
+            (course_id, routine.period_or_year)
+        ) or course_roster_counts.get(course_id, 0)
 
-        # Add routine to processed_routines
         processed_routines.append(
             {
                 "id": routine.id,
@@ -107,7 +136,7 @@ def teacherDashboard(request):
                 "is_completed": attendance is not None,
                 "is_ongoing": routine.start_time <= current_time <= routine.end_time,
                 "total_students": total_students,
-                "attendance_count": attendance_count,
+                "attendance_count": attendance.present_count if attendance else 0,
                 "period_or_year": routine.period_or_year,
                 "course_name": routine.subject.course.name,
                 "has_attendance": attendance is not None,
@@ -116,20 +145,24 @@ def teacherDashboard(request):
         )
 
     # Calculate class statistics
-    total_classes = today_routines.count()
+    total_classes = len(routines)
     completed_classes = len([r for r in processed_routines if r["is_completed"]])
     remaining_classes = total_classes - completed_classes
 
-    # Get student statistics from course tracking
-    total_students = (
-        CourseTracking.objects.filter(
-            course__in=today_routines.values_list("subject__course", flat=True),
-            progress_status="In Progress",
+    # Distinct students in progress across the teacher's courses and today's classes
+    today_classes = Q()
+    for routine in routines:
+        today_classes |= Q(
+            course_id=routine.subject.course_id, current_period=routine.period_or_year
         )
-        .values("student")
-        .distinct()
-        .count()
+    student_stats = CourseTracking.objects.filter(
+        course_id__in={routine.subject.course_id for routine in routines},
+        progress_status="In Progress",
+    ).aggregate(
+        total_students=Count("student", distinct=True),
+        today_students=Count("student", distinct=True, filter=today_classes),
     )
+    total_students = student_stats["total_students"]
 
     # Get present and absent students for today
     present_students = (
@@ -143,18 +176,8 @@ def teacherDashboard(request):
         .count()
     )
 
-    # Calculate absent students based on teacher's classes today
-    today_class_students = set()
-    for routine in today_routines:
-        students = CourseTracking.objects.filter(
-            course=routine.subject.course,
-            current_period=routine.period_or_year,
-            progress_status="In Progress",
-        ).values_list("student", flat=True)
-        today_class_students.update(students)
-
     # Make sure absent students doesn't go negative
-    total_today_students = len(today_class_students)
+    total_today_students = student_stats["today_students"]
     absent_students = (
         max(0, total_today_students - present_students) if total_today_students else 0
     )
@@ -170,17 +193,24 @@ def teacherDashboard(request):
     remaining_stars = 5 - avg_rating_rounded
 
     # Get leave statistics
-    pending_leaves = StaffLeave.objects.filter(staff=teacher, status=0).count()
-    approved_leaves = StaffLeave.objects.filter(staff=teacher, status=1).count()
-    rejected_leaves = StaffLeave.objects.filter(staff=teacher, status=2).count()
+    leave_stats = StaffLeave.objects.filter(staff=teacher).aggregate(
+        pending=Count("id", filter=Q(status=0)),
+        approved=Count("id", filter=Q(status=1)),
+        rejected=Count("id", filter=Q(status=2)),
+    )
+    pending_leaves = leave_stats["pending"]
+    approved_leaves = leave_stats["approved"]
+    rejected_leaves = leave_stats["rejected"]
 
     # Get recent leaves
     recent_leaves = StaffLeave.objects.filter(staff=teacher).order_by("-created_at")[:5]
 
     # Get recent feedback
-    recent_feedback = StudentFeedback.objects.filter(teacher=teacher).order_by(
-        "-created_at"
-    )[:5]
+    recent_feedback = (
+        StudentFeedback.objects.filter(teacher=teacher)
+        .select_related("student__course")
+        .order_by("-created_at")[:5]
+    )
 
     # Get notices
     notices = Notice.objects.all().order_by("-created_at")[:5]
@@ -189,62 +219,36 @@ def teacherDashboard(request):
     feedback_types = FEEDBACK_TYPE_CHOICES
 
     # Get institute feedback
-    institute_feedback = StaffInstituteFeedback.objects.filter(staff=teacher).order_by(
-        "-created_at"
-    )[:5]
-
-    # Get all routines for the teacher (for the schedule)
-    all_routines = Routine.objects.filter(
-        teacher=teacher,
-        is_active=True,
-        period_or_year__in=CourseTracking.objects.filter(progress_status="In Progress")
-        .values_list("current_period", flat=True)
-        .distinct(),
-    ).order_by("start_time")
-
-    # Get all attendance records for quick access
-    recent_attendance = (
-        Attendance.objects.filter(teacher=teacher, date__gte=last_week)
-        .select_related("routine")
-        .order_by("-date")
-    )
-
-    # Add present/total counts to each attendance record
-    for attendance in recent_attendance:
-        attendance.present_count = AttendanceRecord.objects.filter(
-            attendance=attendance, student_attend=True
-        ).count()
-        attendance.total_count = AttendanceRecord.objects.filter(
-            attendance=attendance
-        ).count()
-
-    # Attendance Management Data
-    routines = Routine.objects.filter(teacher=teacher, is_active=True).order_by(
-        "start_time"
+    institute_feedback = (
+        StaffInstituteFeedback.objects.filter(staff=teacher)
+        .select_related("staff")
+        .order_by("-created_at")[:5]
     )
 
-    # Get all subjects taught by this teacher for the subjects section
-    subject_ids = (
-        Routine.objects.filter(teacher=teacher, is_active=True)
-        .values_list("subject", flat=True)
+    # Routines for periods that have students in progress (for the schedule)
+    active_periods = set(
+        CourseTracking.objects.filter(progress_status="In Progress")
+        .order_by()
+        .values_list("current_period", flat=True)
         .distinct()
     )
+    all_routines = [routine for routine in routines if routine.period_or_year in active_periods]
 
-    teacher_subjects = (
-        Routine.objects.filter(
-            teacher=teacher, is_active=True, subject_id__in=subject_ids
+    # Get all attendance records for quick access, with present/total counts
+    recent_attendance = (
+        Attendance.objects.filter(teacher=teacher, date__gte=last_week)
+        .select_related("routine__subject")
+        .annotate(
+            present_count=Count("records", filter=Q(records__student_attend=True)),
+            total_count=Count("records"),
         )
-        .select_related("subject", "course")
-        .order_by("subject__name")
+        .order_by("-date")
     )
 
-    # Add student count to each routine
+    # Subjects taught by this teacher with their in progress student counts
+    teacher_subjects = sorted(routines, key=lambda routine: routine.subject.name)
     for routine in teacher_subjects:
-        routine.students_count = CourseTracking.objects.filter(
-            course=routine.course,
-            current_period=routine.period_or_year,
-            progress_status="In Progress",
-        ).count()
+        routine.students_count = tracking_counts.get((routine.course_id, routine.period_or_year), 0)
 
     context = {
         "teacher": teacher,
@@ -355,7 +359,7 @@ def submit_staff_institute_feedback(request):
                 return redirect("teacherDashboard")
 
             # Get the institute (assuming one institute for now)
-            institute = Institute.objects.first()
+            institute = get_institute()
 
             if not institute:
                 # Create a default institute if none exists
@@ -432,49 +436,16 @@ def save_attendance(request):
             # Validate date
             attendance_date = timezone.datetime.strptime(date_str, "%Y-%m-%d").date()
 
-            # Get or create attendance record
-            attendance, created = Attendance.objects.get_or_create(
-                routine=routine,
-                date=attendance_date,
-                defaults={
-                    "teacher": teacher,
-                    "class_status": class_status,
-                    "teacher_attend": teacher_attend,
-                },
+            # Save the session and every student record in one transaction
+            record_attendance(
+                routine,
+                teacher,
+                attendance_date,
+                class_status,
+                teacher_attend,
+                parse_attendance_marks(request.POST),
             )
 
-            if not created:
-                # Update existing attendance
-                attendance.class_status = class_status
-                attendance.teacher_attend = teacher_attend
-                attendance.save()
-
-            # Process student attendance
-            for key, value in request.POST.items():
-                if key.startswith("student_"):
-                    student_id = key.replace("student_", "")
-                    student_attend = value == "on"
-
-                    try:
-                        # Convert student_id to integer to ensure proper lookup
-                        student_id_int = int(student_id)
-                        student = Student.objects.get(id=student_id_int)
-
-                        # Get or create attendance record for this student
-                        record, _ = AttendanceRecord.objects.get_or_create(
-                            attendance=attendance,
-                            student=student,
-                            defaults={"student_attend": student_attend},
-                        )
-
-                        # Update if record already exists
-                        if record.student_attend != student_attend:
-                            record.student_attend = student_attend
-                            record.save()
-
-                    except Student.DoesNotExist:
-                        continue
-
             messages.success(
                 request,
                 f"Attendance for {attendance_date.strftime('%d %b, %Y')} saved successfully.",
@@ -4,7 +4,7 @@ from datetime import timedelta
 # Core Django imports
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Q, Sum
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
@@ -14,9 +14,12 @@ from django.views.decorators.http import require_http_methods
 from app.models import (
     Attendance,
     AttendanceRecord,
+    AttendanceStreak,
+    AttendanceSummary,
     Batch,
     Course,
     CourseTracking,
+    Institute,
     InstituteFeedback,
     Notice,
     Parent,
@@ -34,6 +37,7 @@ from app.models import (
     TeacherParentMeeting,
     FEEDBACK_TYPE_CHOICES,
 )
+from app.branding import get_institute
 
 
 @login_required
@@ -123,21 +127,16 @@ def studentDashboard(request):
     # Attendance Statistics with enhanced information
     attendance_records = AttendanceRecord.objects.filter(student=student)
 
-    # Get the current period start and end dates from student's course tracking
-    current_period_start = None
-    current_period_end = None
-
-    # Try to get course tracking for current student
-    try:
-        if active_tracking and active_tracking.period_start_date:
-            current_period_start = active_tracking.period_start_date
-            current_period_end = active_tracking.period_end_date or today
-    except Exception:
-        pass
-
-    # Calculate total attendance
-    total_attendance = attendance_records.filter(student_attend=True).count()
-    total_classes = attendance_records.count()
+    # Attendance totals, overall and for the current period, from the summaries
+    current_period = active_tracking.current_period if active_tracking else None
+    attendance_totals = AttendanceSummary.objects.filter(student=student).aggregate(
+        present=Sum("present_count"),
+        total=Sum("total_count"),
+        period_present=Sum("present_count", filter=Q(period_or_year=current_period)),
+        period_total=Sum("total_count", filter=Q(period_or_year=current_period)),
+    )
+    total_attendance = attendance_totals["present"] or 0
+    total_classes = attendance_totals["total"] or 0
 
     # Calculate attendance percentage
     if total_classes > 0:
@@ -145,16 +144,10 @@ def studentDashboard(request):
     else:
         attendance_percentage = 0
 
-    # Filter attendance by current period date range if available
-    if current_period_start:
-        period_attendance = attendance_records.filter(
-            attendance__date__gte=current_period_start,
-            attendance__date__lte=current_period_end,
-        )
-
-        # Count the actual classes and attendance
-        actual_classes = period_attendance.count()
-        classes_attended = period_attendance.filter(student_attend=True).count()
+    # Count the classes and attendance of the current period if available
+    if current_period:
+        actual_classes = attendance_totals["period_total"] or 0
+        classes_attended = attendance_totals["period_present"] or 0
 
         # Calculate actual attendance percentage
         if actual_classes > 0:
@@ -166,30 +159,10 @@ def studentDashboard(request):
         classes_attended = total_attendance
         attendance_summary_actual = attendance_percentage
 
-    # Calculate attendance streaks
-    current_streak = 0
-    longest_streak = 0
-    temp_streak = 0
-    last_attendance_date = None
-
-    for record in attendance_records.order_by("-attendance__date"):
-        if record.student_attend:
-            if last_attendance_date is None:
-                last_attendance_date = record.attendance.date
-                current_streak = 1
-                temp_streak = 1
-            elif (last_attendance_date - record.attendance.date).days == 1:
-                temp_streak += 1
-                if temp_streak > longest_streak:
-                    longest_streak = temp_streak
-                if record.attendance.date == today - timedelta(days=current_streak):
-                    current_streak += 1
-            else:
-                temp_streak = 1
-        else:
-            temp_streak = 0
-            if record.attendance.date == today:
-                current_streak = 0
+    # Attendance streaks, maintained as attendance is saved
+    streak = AttendanceStreak.objects.filter(student=student).first()
+    current_streak = streak.streak_on(today) if streak else 0
+    longest_streak = streak.longest_streak if streak else 0
 
     # Attendance Summary
     attendance_summary = {
@@ -205,7 +178,7 @@ def studentDashboard(request):
     }
 
     # Add actual recorded classes info if different from expected
-    if current_period_start and actual_classes != total_classes:
+    if current_period and actual_classes != total_classes:
         attendance_summary["actual_classes"] = actual_classes
         attendance_summary["actual_percentage"] = attendance_summary_actual
 
@@ -433,7 +406,7 @@ def submit_institute_feedback(request):
                 return redirect("studentDashboard")
 
             # Get the institute (assuming one institute for now)
-            institute = Institute.objects.first()
+            institute = get_institute()
 
             if not institute:
                 # Create a default institute if none exists
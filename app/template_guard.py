@@ -0,0 +1,124 @@
+# Standard library imports
+import logging
+import sys
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+# Core Django imports
+from django.conf import settings
+from django.db import connections
+from django.template import Node
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+# TEMPLATE_QUERY_GUARD values
+GUARD_OFF = "off"
+GUARD_WARN = "warn"
+GUARD_RAISE = "raise"
+
+
+# Set while rendering code that is expected to query, e.g. a fragment cache miss
+template_queries_allowed = ContextVar("template_queries_allowed", default=False)
+
+
+class TemplateQueryError(Exception):
+    """Raised when a template runs SQL while TEMPLATE_QUERY_GUARD is "raise" """
+
+
+# --------------------------------------------------------------------
+# Query Guard
+# --------------------------------------------------------------------
+
+
+def _template_position():
+    """
+    Find the template node being rendered on the current stack
+
+    Returns:
+        str: ``template:line`` of the innermost node, or None outside a node
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code is Node.render_annotated.__code__:
+            node = frame.f_locals["self"]
+            if node.token is not None:
+                return f"{node.origin.name}:{node.token.lineno}"
+        frame = frame.f_back
+    return None
+
+
+@contextmanager
+def guard_template_queries(template_name, mode):
+    """
+    Flag every SQL query run while a template renders
+
+    A query inside a template means a queryset or lazy relation was handed
+    to the template instead of data prepared by the view, e.g.
+    ``records.all|length`` loading whole tables to count them.
+
+    Args:
+        template_name: Template reported in the message
+        mode: GUARD_WARN logs each query, GUARD_RAISE raises TemplateQueryError
+    """
+
+    def guard(execute, sql, params, many, context):
+        if template_queries_allowed.get():
+            return execute(sql, params, many, context)
+        position = _template_position() or template_name
+        message = f"Query while rendering {position}: {sql}"
+        if mode == GUARD_RAISE:
+            raise TemplateQueryError(message)
+        logger.warning(message)
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for db in connections.all():
+            stack.enter_context(db.execute_wrapper(guard))
+        yield
+
+
+@contextmanager
+def allow_template_queries():
+    """
+    Let the block query while a template renders
+
+    For lazy values meant to be evaluated at render time only, such as the
+    body of a fragment cache miss.
+    """
+    token = template_queries_allowed.set(True)
+    try:
+        yield
+    finally:
+        template_queries_allowed.reset(token)
+
+
+# --------------------------------------------------------------------
+# Template Backend
+# --------------------------------------------------------------------
+
+
+class QueryGuardedTemplate(Template):
+    """Django template whose render runs under ``guard_template_queries``"""
+
+    def render(self, context=None, request=None):
+        mode = settings.TEMPLATE_QUERY_GUARD
+        if mode == GUARD_OFF:
+            return super().render(context, request)
+        with guard_template_queries(self.origin.template_name, mode):
+            return super().render(context, request)
+
+
+class QueryGuardedTemplates(DjangoTemplates):
+    """
+    Django template backend flagging SQL run by templates
+
+    Controlled by TEMPLATE_QUERY_GUARD, "warn" by default when DEBUG is on.
+    """
+
+    def from_string(self, template_code):
+        return QueryGuardedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return QueryGuardedTemplate(template.template, self)
@@ -1,6 +1,9 @@
 # Core Django imports
 from django import template
 
+# Local app imports
+from app.permissions import get_user_groups
+
 register = template.Library()
 
 @register.filter
@@ -38,11 +41,6 @@ def get_item(dictionary, key):
     # Try with the key as string
     return dictionary.get(str(key), None)
 
-@register.filter
-def filter_attended(attendance_records):
-    """Filter attendance records to get only attended ones"""
-    return attendance_records.filter(student_attend=True)
-
 @register.filter
 def div(value, arg):
     """Divide the value by the argument"""
@@ -52,15 +50,10 @@ def div(value, arg):
         return 0
 
 @register.filter
-def filter_by_subject(routines, subject):
+def primary_group(user):
     """
-    Filter routines to get the one for a specific subject.
-    Usage in template: {{ routines|filter_by_subject:subject }}
+    Name of the user's first group, loaded once per user instance
+    Usage in template: {% if user|primary_group == "HOD" %}
     """
-    if not routines:
-        return None
-    
-    for routine in routines:
-        if routine.subject_id == subject.id:
-            return routine
-    return None 
\ No newline at end of file
+    groups = get_user_groups(user)
+    return groups[0][1] if groups else None
@@ -0,0 +1,50 @@
+# Core Django imports
+from django import template
+
+# Local app imports
+from app.fragment_cache import get_fragment
+from app.template_guard import allow_template_queries
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, groups, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.groups = groups
+        self.vary_on = vary_on
+
+    def render(self, context):
+        groups = self.groups.resolve(context).split(",")
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return get_fragment(self.name, groups, vary_on, lambda: self._render_miss(context))
+
+    def _render_miss(self, context):
+        # Fragments receive lazy querysets so a cache hit skips their queries
+        with allow_template_queries():
+            return self.nodelist.render(context)
+
+
+@register.tag("fragment_cache")
+def do_fragment_cache(parser, token):
+    """
+    Cache a template fragment until one of its fragment groups changes
+    Usage in template:
+        {% fragment_cache "routines,subjects" parent_routines course.id period %}
+            ...
+        {% endfragment_cache %}
+    """
+    nodelist = parser.parse(("endfragment_cache",))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires fragment groups and a fragment name."
+        )
+    return FragmentCacheNode(
+        nodelist,
+        bits[2],
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
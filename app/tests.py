@@ -1,4 +1,1412 @@
+# Standard library imports
+import contextvars
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import time, timedelta
+from io import StringIO
+from unittest import mock
+
 # Core Django imports
-from django.test import TestCase
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission, User
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.signals import post_save
+from django.template import engines
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import ResolverMatch, reverse
+from django.utils import timezone
+
+# Local app imports
+from app.attendance import (
+    rebuild_attendance_streaks,
+    rebuild_attendance_summaries,
+    record_attendance,
+    save_attendance_records,
+)
+from app.backends import MultiModelBackend, session_user_model
+from app.branding import get_branding
+from app.firebase import FakeMessaging, FCMDevice, register_device, send_push_notification
+from app.fragment_cache import get_fragment_versions
+from app.management.commands.benchmark_endpoints import Command as BenchmarkEndpointsCommand
+from app.metrics import profile_summary, view_profiles, view_query_counts
+from app.middleware import PRIMARY_PIN_COOKIE, PrimaryPinningMiddleware, QueryProfilerMiddleware
+from app.models import (
+    Attendance,
+    AttendanceRecord,
+    AttendanceStreak,
+    AttendanceSummary,
+    Batch,
+    Course,
+    CourseTracking,
+    Institute,
+    LoginIdentifier,
+    Notice,
+    NotificationDelivery,
+    NotificationEvent,
+    Parent,
+    Routine,
+    Staff,
+    Student,
+    StudentLeave,
+    Subject,
+    SubjectFile,
+)
+from app.notifications import (
+    CLAIM_LEASE,
+    deliver_due,
+    dispatch_event,
+    enqueue_notification,
+    process_event,
+    resolve_event_tokens,
+    retry_delay,
+)
+from app.quota import TokenBucket
+from app.routers import DatabaseRouter, primary_pinned
+from app.template_guard import TemplateQueryError
+
+
+# --------------------------------------------------------------------
+# Authentication Backend
+# --------------------------------------------------------------------
+
+
+class MultiModelBackendTests(TestCase):
+    """Usernames resolve through the identifier index to the right account"""
+
+    @classmethod
+    def setUpTestData(cls):
+        password = make_password("secret")
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "secret")
+        cls.staff = Staff.objects.create(
+            name="Login Staff", phone="9770000000", email="staff@example.com",
+            gender="Male", designation="Teacher", password=password,
+        )
+        cls.parent = Parent.objects.create(name="Login Parent", phone="9770000001", password=password)
+        cls.student = Student.objects.create(
+            name="Login Student", phone="9770000002", email="student@example.com",
+            gender="Female", birth_date=timezone.now().date() - timedelta(days=6000),
+            password=password,
+        )
+
+    def authenticate(self, username, password="secret"):
+        return MultiModelBackend().authenticate(None, username=username, password=password)
+
+    def test_each_model_logs_in(self):
+        cases = [
+            ("admin@example.com", self.admin),
+            ("9770000000", self.staff),
+            ("staff@example.com", self.staff),
+            ("9770000001", self.parent),
+            ("9770000002", self.student),
+            ("student@example.com", self.student),
+        ]
+        for username, user in cases:
+            with self.subTest(username=username):
+                self.assertEqual(self.authenticate(username), user)
+                self.assertIsInstance(self.authenticate(username), type(user))
+
+    def test_shared_phone_tries_each_account(self):
+        parent = Parent.objects.create(
+            name="Staff Parent", phone="9770000000", password=make_password("parent-secret")
+        )
+        self.assertEqual(self.authenticate("9770000000"), self.staff)
+        self.assertEqual(self.authenticate("9770000000", "parent-secret"), parent)
+
+    def test_wrong_password(self):
+        self.assertIsNone(self.authenticate("9770000000", "wrong"))
+        self.assertIsNone(self.authenticate("unknown@example.com"))
+
+    def test_inactive_user(self):
+        Staff.objects.filter(pk=self.staff.pk).update(is_active=False)
+        self.assertIsNone(self.authenticate("9770000000"))
+
+    def test_unindexed_account_is_found_and_backfilled(self):
+        LoginIdentifier.objects.all().delete()
+
+        self.assertEqual(self.authenticate("staff@example.com"), self.staff)
+        self.assertEqual(
+            LoginIdentifier.resolve("9770000000"), [("app.staff", self.staff.pk)]
+        )
+        with self.assertNumQueries(2):
+            self.assertEqual(self.authenticate("9770000000"), self.staff)
+
+
+@override_settings(SESSION_USER_CACHE_TTL=30)
+class SessionUserTests(TestCase):
+    """Sessions load their account by model label from the shared cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = Parent.objects.create(name="Session Parent", phone="9771000000")
+
+    def setUp(self):
+        cache.clear()
+
+    def get_user(self, model_label):
+        token = session_user_model.set(model_label)
+        try:
+            return MultiModelBackend().get_user(self.parent.pk)
+        finally:
+            session_user_model.reset(token)
+
+    def test_model_label_loads_one_model(self):
+        with self.assertNumQueries(1):
+            self.assertIsInstance(self.get_user("app.parent"), Parent)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_user("app.parent"), self.parent)
+
+    def test_sessions_without_a_label_probe_each_table(self):
+        user = self.get_user(None)
+        self.assertEqual(user, self.parent)
+        self.assertIsInstance(user, Parent)
+
+    def test_saving_the_account_expires_it_everywhere(self):
+        self.get_user("app.parent")
+        Parent.objects.filter(pk=self.parent.pk).update(name="Stale Parent")
+        self.assertEqual(self.get_user("app.parent").name, "Session Parent")
+
+        self.parent.name = "Renamed Parent"
+        self.parent.save()
+        self.assertEqual(self.get_user("app.parent").name, "Renamed Parent")
+
+    @override_settings(SESSION_USER_CACHE_TTL=0)
+    def test_zero_ttl_disables_the_cache(self):
+        self.get_user("app.parent")
+        with self.assertNumQueries(1):
+            self.get_user("app.parent")
+
+
+# --------------------------------------------------------------------
+# Group Permissions
+# --------------------------------------------------------------------
+
+
+class GroupPermissionCacheTests(TestCase):
+    """Users with the same groups share one cached permission set"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name="Cache Group")
+        cls.permission = Permission.objects.get(codename="view_notice")
+        cls.staff = Staff.objects.bulk_create([
+            Staff(name=f"Permission Staff {index}", phone=f"9772{index:06d}", gender="Male")
+            for index in range(2)
+        ])
+        for staff in cls.staff:
+            staff.groups.add(cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def has_perm(self, staff):
+        return Staff.objects.get(pk=staff.pk).has_perm("app.view_notice")
+
+    def test_grant_and_revoke_apply_to_the_next_check(self):
+        self.assertFalse(self.has_perm(self.staff[0]))
+
+        self.group.permissions.add(self.permission)
+        self.assertTrue(self.has_perm(self.staff[0]))
+
+        self.group.permissions.remove(self.permission)
+        self.assertFalse(self.has_perm(self.staff[0]))
+
+    def test_users_with_the_same_groups_share_an_entry(self):
+        self.group.permissions.add(self.permission)
+        self.assertTrue(self.has_perm(self.staff[0]))
+
+        other = Staff.objects.get(pk=self.staff[1].pk)
+        with self.assertNumQueries(1):  # the user's groups
+            self.assertTrue(other.has_perm("app.view_notice"))
+
+    def test_evicted_counter_does_not_reuse_stale_entries(self):
+        with mock.patch("app.permissions.time.time", return_value=1000.0):
+            self.assertFalse(self.has_perm(self.staff[0]))
+        cache.delete("group_permissions_version")
+        Group.permissions.through.objects.create(group=self.group, permission=self.permission)
+
+        with mock.patch("app.permissions.time.time", return_value=1001.0):
+            self.assertTrue(self.has_perm(self.staff[0]))
+
+
+# --------------------------------------------------------------------
+# HOD Dashboard Query Budget
+# --------------------------------------------------------------------
+
+
+@override_settings(FRAGMENT_CACHE_TIMEOUT=0)
+class HodDashboardQueryTests(TestCase):
+    """The HOD dashboard must render in a number of queries independent of course size"""
+
+    # Session, user, permission and dashboard queries for one render
+    QUERY_BUDGET = 23
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hod, cls.course = cls.create_course("Large", students=5000)
+        cls.small_hod, cls.small_course = cls.create_course("Small", students=3)
+
+    @classmethod
+    def create_course(cls, name, students):
+        """Create a course with teachers, routines, batches and enrolled students"""
+        course = Course.objects.create(name=f"{name} Course", duration=4, duration_type="Year")
+        prefix = 1 if name == "Large" else 2
+
+        hod = Staff.objects.create(
+            name=f"{name} HOD", phone=f"96{prefix}0000000", gender="Male",
+            designation="HOD", course=course,
+        )
+        hod.groups.add(Group.objects.get(name="HOD"))
+
+        batches = [Batch.objects.create(name=f"{name} Batch {index}") for index in range(2)]
+        for index in range(3):
+            teacher = Staff.objects.create(
+                name=f"{name} Teacher {index}", phone=f"97{prefix}000000{index}",
+                gender="Female", designation="Teacher",
+            )
+            for period in (1, 2):
+                subject = Subject.objects.create(
+                    name=f"{name} Subject {index}-{period}", course=course, period_or_year=period
+                )
+                Routine.objects.create(
+                    course=course, subject=subject, teacher=teacher,
+                    start_time=time(7 + index, 0), end_time=time(8 + index, 0),
+                    period_or_year=period,
+                )
+
+        enrolled = Student.objects.bulk_create([
+            Student(
+                name=f"{name} Student {index}", phone=f"98{prefix}{index:07d}",
+                course=course, status="Active",
+            )
+            for index in range(students)
+        ])
+        CourseTracking.objects.bulk_create([
+            CourseTracking(student=student, course=course, completion_percentage=index % 100)
+            for index, student in enumerate(enrolled)
+        ])
+        Student.batches.through.objects.bulk_create([
+            Student.batches.through(student_id=student.id, batch_id=batches[index % 2].id)
+            for index, student in enumerate(enrolled)
+        ])
+        return hod, course
+
+    def render_dashboard(self):
+        return self.client.get(reverse("hodDashboard"), secure=True)
+
+    def test_query_count_does_not_grow_with_course_size(self):
+        self.client.force_login(self.small_hod, backend="app.backends.MultiModelBackend")
+        with CaptureQueriesContext(connection) as small_queries:
+            response = self.render_dashboard()
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_login(self.hod, backend="app.backends.MultiModelBackend")
+        with self.assertNumQueries(len(small_queries)):
+            response = self.render_dashboard()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total_students"], 5000)
+
+    def test_query_budget(self):
+        self.client.force_login(self.hod, backend="app.backends.MultiModelBackend")
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.render_dashboard()
+        self.assertEqual(response.status_code, 200)
+
+    def test_progress_pages_cover_course_once(self):
+        self.client.force_login(self.hod, backend="app.backends.MultiModelBackend")
+        url = reverse("get_student_progress")
+
+        seen, cursor, page_queries = [], None, set()
+        while True:
+            params = {"limit": 500, **({"cursor": cursor} if cursor else {})}
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url, params, secure=True).json()
+            if cursor:
+                page_queries.add(len(queries))
+            seen.extend(row["id"] for row in data["progress_data"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        self.assertEqual(len(seen), 5000)
+        self.assertEqual(len(set(seen)), 5000)
+        self.assertEqual(len(page_queries), 1)
+
+
+# --------------------------------------------------------------------
+# Teacher Dashboard Query Count
+# --------------------------------------------------------------------
+
+
+@override_settings(FRAGMENT_CACHE_TIMEOUT=0)
+class TeacherDashboardQueryTests(TestCase):
+    """The teacher dashboard query count must not grow with routines or sessions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(name="Teacher Course", duration=4, duration_type="Year")
+        cls.students = Student.objects.bulk_create([
+            Student(
+                name=f"Student {index}", phone=f"9830{index:06d}", course=cls.course,
+                status="Active", current_period=1 + index % 2,
+            )
+            for index in range(40)
+        ])
+        CourseTracking.objects.bulk_create([
+            CourseTracking(
+                student=student, course=cls.course,
+                current_period=student.current_period, progress_status="In Progress",
+            )
+            for student in cls.students
+        ])
+        cls.light_teacher = cls.create_teacher("Light", routines=1)
+        cls.busy_teacher = cls.create_teacher("Busy", routines=8)
+
+    @classmethod
+    def create_teacher(cls, name, routines):
+        """Create a teacher with routines, subject files and a week of attendance"""
+        teacher = Staff.objects.create(
+            name=f"{name} Teacher", phone=f"97{routines:08d}", gender="Male", designation="Teacher"
+        )
+        teacher.groups.add(Group.objects.get(name="Teacher"))
+        today = timezone.now().date()
+
+        for index in range(routines):
+            period = 1 + index % 2
+            subject = Subject.objects.create(
+                name=f"{name} Subject {index}", course=cls.course, period_or_year=period
+            )
+            SubjectFile.objects.create(
+                subject=subject, title="Notes", file="subject_files/notes.pdf", uploaded_by=teacher
+            )
+            routine = Routine.objects.create(
+                course=cls.course, subject=subject, teacher=teacher,
+                start_time=time(7, 0), end_time=time(8, 0), period_or_year=period,
+            )
+            for days_ago in range(3):
+                attendance = Attendance.objects.create(
+                    routine=routine, teacher=teacher, date=today - timedelta(days=days_ago)
+                )
+                AttendanceRecord.objects.bulk_create([
+                    AttendanceRecord(attendance=attendance, student=student, student_attend=True)
+                    for student in cls.students
+                    if student.current_period == period
+                ])
+        return teacher
+
+    def render_dashboard(self, teacher):
+        self.client.force_login(teacher, backend="app.backends.MultiModelBackend")
+        response = self.client.get(reverse("teacherDashboard"), secure=True)
+        self.assertEqual(response.status_code, 200)
+        return view_query_counts["teacherDashboard"][-1]
+
+    def test_query_count_does_not_grow_with_routines(self):
+        light_queries = self.render_dashboard(self.light_teacher)
+        busy_queries = self.render_dashboard(self.busy_teacher)
+        self.assertEqual(light_queries, busy_queries)
+
+    def test_routine_counts(self):
+        self.client.force_login(self.busy_teacher, backend="app.backends.MultiModelBackend")
+        response = self.client.get(reverse("teacherDashboard"), secure=True)
+        routine = response.context["today_routines"][0]
+        self.assertEqual(routine["total_students"], 20)
+        self.assertEqual(routine["attendance_count"], 20)
+        self.assertEqual(response.context["total_students"], 40)
+        self.assertEqual(response.context["recent_attendance"][0].total_count, 20)
+
+
+# --------------------------------------------------------------------
+# Attendance Summaries
+# --------------------------------------------------------------------
+
+
+class AttendanceSummaryTests(TestCase):
+    """Incrementally maintained summaries must match a rebuild from records"""
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="Summary Course", duration=4, duration_type="Year")
+        subject = Subject.objects.create(name="Summary Subject", course=course, period_or_year=1)
+        cls.teacher = Staff.objects.create(
+            name="Summary Teacher", phone="9790000000", gender="Male", designation="Teacher"
+        )
+        cls.routine = Routine.objects.create(
+            course=course, subject=subject, teacher=cls.teacher,
+            start_time=time(7, 0), end_time=time(8, 0), period_or_year=1,
+        )
+        cls.students = Student.objects.bulk_create([
+            Student(name=f"Summary Student {index}", phone=f"9840{index:06d}", course=course, status="Active")
+            for index in range(3)
+        ])
+
+    def snapshot(self):
+        return sorted(
+            AttendanceSummary.objects.values_list(
+                "student_id", "subject_id", "period_or_year", "present_count",
+                "total_count", "last_date", "current_streak", "longest_streak",
+            )
+        )
+
+    def mark(self, days_ago, *attended):
+        session_date = timezone.now().date() - timedelta(days=days_ago)
+        marks = {student.id: flag for student, flag in zip(self.students, attended)}
+        with self.captureOnCommitCallbacks(execute=True):
+            attendance, _ = record_attendance(self.routine, self.teacher, session_date, True, True, marks)
+        return attendance
+
+    def streaks(self):
+        return sorted(
+            AttendanceStreak.objects.values_list(
+                "student_id", "current_streak", "longest_streak", "last_date", "last_present_date"
+            )
+        )
+
+    def assert_matches_rebuild(self):
+        incremental = self.snapshot(), self.streaks()
+        rebuild_attendance_summaries()
+        rebuild_attendance_streaks()
+        self.assertEqual(incremental, (self.snapshot(), self.streaks()))
+
+    def test_new_sessions_update_in_place(self):
+        for days_ago, marks in enumerate([(True, True, False), (True, False, False), (True, True, True)]):
+            self.mark(10 - days_ago, *marks)
+
+        summary = AttendanceSummary.objects.get(student=self.students[0])
+        self.assertEqual((summary.present_count, summary.total_count), (3, 3))
+        self.assertEqual((summary.current_streak, summary.longest_streak), (3, 3))
+        self.assert_matches_rebuild()
+
+    def test_edits_and_backdated_sessions_rebuild(self):
+        self.mark(5, True, True, True)
+        self.mark(3, True, False, True)
+        self.mark(4, False, True, True)  # older than the last session
+        self.mark(3, False, True, False)  # edited marks
+        self.assert_matches_rebuild()
+
+    def test_admin_edits_and_deletes(self):
+        self.mark(5, True, True, True)
+        attendance = self.mark(4, True, True, False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record = AttendanceRecord.objects.get(attendance=attendance, student=self.students[2])
+            record.student_attend = True
+            record.save()
+        self.assertEqual(AttendanceSummary.objects.get(student=self.students[2]).present_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            attendance.delete()
+        self.assertEqual(AttendanceSummary.objects.get(student=self.students[2]).total_count, 1)
+        self.assert_matches_rebuild()
+
+    def test_updates_touch_updated_at(self):
+        self.mark(3, True, True, True)
+        before = AttendanceSummary.objects.get(student=self.students[0]).updated_at
+        self.mark(2, True, True, True)
+        self.assertGreater(AttendanceSummary.objects.get(student=self.students[0]).updated_at, before)
+
+    def test_day_streaks(self):
+        self.mark(6, True, True, False)
+        self.mark(5, True, False, False)
+        self.mark(4, True, True, True)
+        self.mark(2, True, True, True)  # a day without classes breaks the run
+
+        streaks = {streak.student_id: streak for streak in AttendanceStreak.objects.all()}
+        first, second, third = (streaks[student.id] for student in self.students)
+        self.assertEqual((first.current_streak, first.longest_streak), (1, 3))
+        self.assertEqual((second.current_streak, second.longest_streak), (1, 1))
+        self.assertEqual((third.current_streak, third.longest_streak), (1, 1))
+        self.assert_matches_rebuild()
+
+    def test_current_streak_ends_after_a_missed_day(self):
+        self.mark(3, True, True, True)
+        self.mark(2, True, True, False)
+        self.mark(1, True, False, False)
+
+        today = timezone.now().date()
+        streaks = {streak.student_id: streak for streak in AttendanceStreak.objects.all()}
+        first, second, third = (streaks[student.id] for student in self.students)
+        self.assertEqual(first.streak_on(today), 3)
+        self.assertEqual(second.streak_on(today), 0)
+        self.assertEqual(third.streak_on(today), 0)
+
+
+# --------------------------------------------------------------------
+# Attendance Record Writes
+# --------------------------------------------------------------------
+
+
+class AttendanceRecordWriteTests(TestCase):
+    """Submitted marks are filtered to the roster and upserted in bulk"""
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="Record Course", duration=4, duration_type="Year")
+        other_course = Course.objects.create(name="Other Course", duration=4, duration_type="Year")
+        subject = Subject.objects.create(name="Record Subject", course=course, period_or_year=1)
+        cls.teacher = Staff.objects.create(
+            name="Record Teacher", phone="9791000000", gender="Male", designation="Teacher"
+        )
+        cls.routine = Routine.objects.create(
+            course=course, subject=subject, teacher=cls.teacher,
+            start_time=time(9, 0), end_time=time(10, 0), period_or_year=1,
+        )
+        cls.students = Student.objects.bulk_create([
+            Student(name=f"Record Student {index}", phone=f"9841{index:06d}", course=course, status="Active")
+            for index in range(6)
+        ])
+        cls.inactive, cls.outsider = Student.objects.bulk_create([
+            Student(name="Record Inactive", phone="9842000000", course=course, status="Inactive"),
+            Student(name="Record Outsider", phone="9842000001", course=other_course, status="Active"),
+        ])
+
+    def session(self, days_ago):
+        return Attendance.objects.create(
+            routine=self.routine, teacher=self.teacher,
+            date=timezone.now().date() - timedelta(days=days_ago),
+            class_status=True, teacher_attend=True,
+        )
+
+    def test_off_roster_and_inactive_students_are_dropped(self):
+        attendance = self.session(1)
+        marks = {self.students[0].id: True, self.inactive.id: True, self.outsider.id: True}
+
+        self.assertEqual(save_attendance_records(attendance, self.routine, marks), 1)
+        self.assertEqual(
+            list(AttendanceRecord.objects.values_list("student_id", flat=True)), [self.students[0].id]
+        )
+
+    def test_resubmission_updates_existing_records(self):
+        attendance = self.session(1)
+        save_attendance_records(attendance, self.routine, {self.students[0].id: True, self.students[1].id: False})
+        save_attendance_records(attendance, self.routine, {self.students[0].id: False, self.students[1].id: False})
+
+        records = dict(AttendanceRecord.objects.values_list("student_id", "student_attend"))
+        self.assertEqual(records, {self.students[0].id: False, self.students[1].id: False})
+
+    def test_query_count_is_independent_of_class_size(self):
+        small = {student.id: True for student in self.students[:2]}
+        large = {student.id: True for student in self.students[2:]}
+
+        with CaptureQueriesContext(connection) as small_queries:
+            save_attendance_records(self.session(2), self.routine, small)
+        with CaptureQueriesContext(connection) as large_queries:
+            save_attendance_records(self.session(1), self.routine, large)
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(AttendanceRecord.objects.count(), len(self.students))
+
+
+# --------------------------------------------------------------------
+# Parent Dashboard Aggregation
+# --------------------------------------------------------------------
+
+
+@override_settings(FRAGMENT_CACHE_TIMEOUT=0)
+class ParentDashboardQueryTests(TestCase):
+    """A parent with several children must cost the same queries as a parent with one"""
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="Parent Course", duration=4, duration_type="Year")
+        teacher = Staff.objects.create(
+            name="Parent Teacher", phone="9750000000", gender="Male", designation="Teacher"
+        )
+        routines = {}
+        for period in (1, 2, 3):
+            subject = Subject.objects.create(
+                name=f"Parent Subject {period}", course=course, period_or_year=period
+            )
+            routines[period] = Routine.objects.create(
+                course=course, subject=subject, teacher=teacher,
+                start_time=time(7, 0), end_time=time(8, 0), period_or_year=period,
+            )
+
+        children = Student.objects.bulk_create([
+            Student(
+                name=f"Child {index}", phone=f"9850{index:06d}", course=course,
+                status="Active", current_period=index + 1,
+            )
+            for index in range(4)
+        ])
+        CourseTracking.objects.bulk_create([
+            CourseTracking(
+                student=child, course=course, current_period=child.current_period,
+                progress_status="In Progress", completion_percentage=10 * index,
+            )
+            for index, child in enumerate(children)
+        ])
+
+        today = timezone.now().date()
+        for index, child in enumerate(children[:3]):
+            record_attendance(routines[child.current_period], teacher, today, True, True, {child.id: True})
+            StudentLeave.objects.create(
+                student=child, start_date=today, end_date=today, message="Leave", status=index
+            )
+
+        cls.single_parent = Parent.objects.create(name="Single Parent", phone="9760000000")
+        cls.single_parent.students.add(children[0])
+        cls.family_parent = Parent.objects.create(name="Family Parent", phone="9760000001")
+        cls.family_parent.students.add(*children)
+        for parent in (cls.single_parent, cls.family_parent):
+            parent.groups.add(Group.objects.get(name="Parent"))
+
+    def render_dashboard(self, parent):
+        self.client.force_login(parent, backend="app.backends.MultiModelBackend")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("parentDashboard"), secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_children(self):
+        _, single_queries = self.render_dashboard(self.single_parent)
+        response, family_queries = self.render_dashboard(self.family_parent)
+        self.assertEqual(single_queries, family_queries)
+        self.assertEqual(len(response.context["student_data"]), 4)
+
+    def test_children_overview(self):
+        response, _ = self.render_dashboard(self.family_parent)
+        summary = response.context["attendance_summary"]
+        self.assertEqual((summary["students_present_today"], summary["students_absent_today"]), (3, 1))
+
+        by_name = {info["student"].name: info for info in response.context["student_data"]}
+        self.assertEqual(by_name["Child 1"]["attended_classes"], 1)
+        self.assertEqual(by_name["Child 1"]["approved_leaves"], 1)
+        self.assertEqual(len(by_name["Child 2"]["current_period_routines"]), 1)
+        self.assertEqual(by_name["Child 3"]["current_period_routines"], [])
+        self.assertEqual(len(by_name["Child 0"]["recent_attendance"]), 1)
+        self.assertEqual(list(by_name["Child 1"]["routines_by_subject"].values()), by_name["Child 1"]["current_period_routines"])
+
+    @override_settings(TEMPLATE_QUERY_GUARD="raise")
+    def test_template_runs_no_queries(self):
+        response, _ = self.render_dashboard(self.family_parent)
+        self.assertContains(response, "Parent Subject 2")
+
+    @override_settings(FRAGMENT_CACHE_TIMEOUT=900)
+    def test_cached_fragments_do_not_leak_between_families(self):
+        # A child of another family in the same course and period as Child 3
+        course = Course.objects.get(name="Parent Course")
+        other_child = Student.objects.bulk_create([
+            Student(name="Other Child", phone="9850999999", course=course, status="Active", current_period=4)
+        ])[0]
+        CourseTracking.objects.bulk_create([
+            CourseTracking(student=other_child, course=course, current_period=4, progress_status="In Progress")
+        ])
+        other_parent = Parent.objects.create(name="Other Parent", phone="9760000002")
+        other_parent.students.add(other_child)
+        other_parent.groups.add(Group.objects.get(name="Parent"))
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.render_dashboard(self.family_parent)
+        response, _ = self.render_dashboard(other_parent)
+        self.assertContains(response, "No routine available for Other Child")
+        self.assertContains(response, "No subjects available for Other Child")
+        self.assertNotContains(response, "Child 3")
+
+
+# --------------------------------------------------------------------
+# Dashboard Fragment Cache
+# --------------------------------------------------------------------
+
+
+class FragmentCacheTests(TestCase):
+    """Shared fragments render once and expire when their rows change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Staff.objects.create(
+            name="Fragment Teacher", phone="9740000000", gender="Male", designation="Teacher"
+        )
+        cls.teacher.groups.add(Group.objects.get(name="Teacher"))
+        cls.other_teacher = Staff.objects.create(
+            name="Other Teacher", phone="9740000001", gender="Female", designation="Teacher"
+        )
+        cls.other_teacher.groups.add(Group.objects.get(name="Teacher"))
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def render_dashboard(self, teacher):
+        self.client.force_login(teacher, backend="app.backends.MultiModelBackend")
+        response = self.client.get(reverse("teacherDashboard"), secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response, view_query_counts["teacherDashboard"][-1]
+
+    def test_notices_are_shared_across_users(self):
+        Notice.objects.create(title="Exam schedule", message="Exams start Monday")
+        _, cold_queries = self.render_dashboard(self.teacher)
+        response, warm_queries = self.render_dashboard(self.other_teacher)
+        self.assertContains(response, "Exam schedule")
+        self.assertLess(warm_queries, cold_queries)
+
+    def test_saving_a_notice_expires_the_fragment(self):
+        self.render_dashboard(self.teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            Notice.objects.create(title="Holiday announcement", message="Closed on Friday")
+        response, _ = self.render_dashboard(self.teacher)
+        self.assertContains(response, "Holiday announcement")
+
+    def test_login_does_not_expire_fragments(self):
+        versions = get_fragment_versions(["routines", "feedback"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.last_login = timezone.now()
+            self.teacher.save(update_fields=["last_login"])
+        self.assertEqual(get_fragment_versions(["routines", "feedback"]), versions)
+
+
+# --------------------------------------------------------------------
+# Read Replica Routing
+# --------------------------------------------------------------------
+
+
+# Writes a notice after copying the primary to the replicas, then reads it
+# back pinned and unpinned. Prints the results as JSON.
+REPLICA_SCRIPT = """
+import json, os, shutil
+from django.core.management import call_command
+from django.db import connections
+from app.models import Notice
+from app.routers import primary_pinned
+
+call_command("migrate", run_syncdb=True, verbosity=0)
+connections.close_all()
+for replica in os.environ["DB_REPLICAS"].split(","):
+    shutil.copy(os.environ["DB_NAME"], replica)
+
+def read():
+    alias = Notice.objects.all().db
+    return [alias, Notice.objects.using(alias).count()]
+
+Notice.objects.create(title="Fresh notice", message="Not replicated yet")
+results = {"pinned": read()}
+primary_pinned.set(False)
+results["unpinned"] = [read() for _ in range(3)]
+print(json.dumps(results))
+"""
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Reads go to replicas round-robin until the request writes"""
+
+    @override_settings(DATABASE_REPLICAS=["replica_1", "replica_2"])
+    def test_round_robin_until_write(self):
+        router = DatabaseRouter()
+        context = contextvars.copy_context()
+        context.run(primary_pinned.set, False)
+
+        reads = [context.run(router.db_for_read, Notice) for _ in range(4)]
+        self.assertEqual(reads, ["replica_1", "replica_2", "replica_1", "replica_2"])
+        self.assertEqual(context.run(router.db_for_read, Session), "default")
+
+        self.assertEqual(context.run(router.db_for_write, Notice), "default")
+        self.assertEqual(context.run(router.db_for_read, Notice), "default")
+
+    def test_middleware_pins_after_write(self):
+        router = DatabaseRouter()
+
+        def writing_view(request):
+            router.db_for_write(Notice)
+            return HttpResponse()
+
+        def reading_view(request):
+            return HttpResponse(str(primary_pinned.get()))
+
+        request = RequestFactory().post("/")
+        response = PrimaryPinningMiddleware(writing_view)(request)
+        self.assertEqual(response.cookies[PRIMARY_PIN_COOKIE].value, "1")
+
+        response = PrimaryPinningMiddleware(reading_view)(RequestFactory().get("/"))
+        self.assertEqual(response.content, b"False")
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+
+        request = RequestFactory().get("/")
+        request.COOKIES[PRIMARY_PIN_COOKIE] = "1"
+        response = PrimaryPinningMiddleware(reading_view)(request)
+        self.assertEqual(response.content, b"True")
+
+    def test_two_sqlite_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "DB_ENGINE": "django.db.backends.sqlite3",
+                "DB_NAME": os.path.join(directory, "primary.sqlite3"),
+                "DB_REPLICAS": ",".join(
+                    os.path.join(directory, f"replica_{index}.sqlite3") for index in (1, 2)
+                ),
+            }
+            for key in ("DJANGO_SECRET_KEY", "FIREBASE_API_KEY", "SMS_API_KEY"):
+                env.setdefault(key, "test")
+            result = subprocess.run(
+                [sys.executable, "manage.py", "shell", "-c", REPLICA_SCRIPT],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+            )
+
+        results = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertEqual(results["pinned"], ["default", 1])
+        self.assertEqual(results["unpinned"], [["replica_1", 0], ["replica_2", 0], ["replica_1", 0]])
+
+
+# --------------------------------------------------------------------
+# Query Profiler
+# --------------------------------------------------------------------
+
+
+class QueryProfilerTests(TestCase):
+    """The profiler records per-view query and cache activity when enabled"""
+
+    def setUp(self):
+        cache.clear()
+        view_profiles.pop("probe", None)
+
+    @staticmethod
+    def probe_view(request):
+        request.resolver_match = ResolverMatch(QueryProfilerTests.probe_view, (), {}, url_name="probe")
+        list(Notice.objects.filter(id__in=[1, 2]))
+        list(Notice.objects.filter(id__in=[3, 4, 5]))
+        cache.set("probe", 1)
+        cache.get("probe")
+        cache.get_many(["probe", "missing"])
+        return HttpResponse()
+
+    @override_settings(QUERY_PROFILER_ENABLED=False)
+    def test_disabled_middleware_is_removed(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryProfilerMiddleware(self.probe_view)
+
+    @override_settings(QUERY_PROFILER_ENABLED=True, QUERY_BUDGET=1)
+    def test_records_profile_and_logs_offenders(self):
+        middleware = QueryProfilerMiddleware(self.probe_view)
+        with self.assertLogs("app.metrics", "WARNING") as logs:
+            middleware(RequestFactory().get("/"))
+
+        queries, sql_ms, duplicates, hits, misses = view_profiles["probe"][-1]
+        self.assertEqual((queries, duplicates, hits, misses), (2, 1, 2, 1))
+        self.assertIn("probe ran 2 queries (budget 1)", logs.output[0])
+
+        row = next(row for row in profile_summary() if row["view"] == "probe")
+        self.assertEqual((row["requests"], row["queries_p95"]), (1, 2))
+
+
+# --------------------------------------------------------------------
+# Scale Data Generation
+# --------------------------------------------------------------------
+
+
+class GenerateScaleDataTests(TestCase):
+    """--scale inserts in bulk without signals and leaves derived data consistent"""
+
+    def test_scale_generation_is_consistent(self):
+        call_command(
+            "generate_fake_data", "--scale", "--students", "40", "--staff", "8",
+            "--courses", "2", "--subjects", "2", "--years", "2",
+            "--attendance-records", "400", "--seed", "7", stdout=StringIO(),
+        )
+
+        students = Student.objects.all()
+        self.assertEqual(students.count(), 40)
+        self.assertFalse(students.filter(course_trackings__isnull=True).exists())
+        self.assertFalse(students.filter(parents__isnull=True).exists())
+        self.assertEqual(Parent.objects.filter(groups__name="Parent").count(), Parent.objects.count())
+
+        # One consistency pass rebuilt what the suppressed signals maintain
+        self.assertEqual(
+            LoginIdentifier.objects.count(),
+            2 * Staff.objects.count() + Parent.objects.count() + 2 * students.count(),
+        )
+        records = AttendanceRecord.objects.count()
+        self.assertGreater(records, 0)
+        self.assertEqual(AttendanceSummary.objects.aggregate(total=Sum("total_count"))["total"], records)
+        self.assertEqual(
+            AttendanceStreak.objects.count(),
+            AttendanceRecord.objects.values("student_id").distinct().count(),
+        )
+        self.assertTrue(post_save.has_listeners(Student))
+
+
+# --------------------------------------------------------------------
+# Endpoint Benchmark Baseline
+# --------------------------------------------------------------------
+
+
+class EndpointBenchmarkTests(SimpleTestCase):
+    """The endpoint benchmark fails on query growth and on latency or memory past the threshold"""
+
+    baseline = {
+        "hod_dashboard": {"p50_ms": 40.0, "queries": 20, "cold_queries": 23, "peak_kib": 1000},
+    }
+
+    def compare(self, **changes):
+        return BenchmarkEndpointsCommand()._compare(self.baseline, {"hod_dashboard": {**self.baseline["hod_dashboard"], **changes}}, 0.5)
+
+    def test_one_more_query_is_a_regression(self):
+        self.assertEqual(self.compare(queries=21), ["hod_dashboard: queries 20 -> 21"])
+
+    def test_latency_and_memory_within_threshold_pass(self):
+        self.assertEqual(self.compare(p50_ms=59.0, peak_kib=1400), [])
+        self.assertEqual(len(self.compare(p50_ms=61.0, peak_kib=1600)), 2)
+
+
+# --------------------------------------------------------------------
+# Institute Branding Cache
+# --------------------------------------------------------------------
+
+
+class InstituteBrandingTests(TestCase):
+    """The institute is loaded once per process and reloaded when it changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = Institute.objects.create(name="Branding Institute", logo="image/logo.png")
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def institute_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("login"), secure=True)
+        self.assertEqual(response.status_code, 200)
+        queries = [query["sql"] for query in captured if "app_institute" in query["sql"]]
+        return response, queries
+
+    def test_login_page_reuses_the_loaded_institute(self):
+        response, queries = self.institute_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, self.institute.logo.url)
+        _, queries = self.institute_queries()
+        self.assertEqual(queries, [])
+
+    def test_saving_the_institute_reloads_it(self):
+        get_branding()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.institute.logo = "image/new-logo.png"
+            self.institute.save()
+        response, queries = self.institute_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, "image/new-logo.png")
+
+
+# --------------------------------------------------------------------
+# Template Query Guard
+# --------------------------------------------------------------------
+
+
+class TemplateQueryGuardTests(TestCase):
+    """Templates that run SQL are flagged with the offending template line"""
+
+    template = "{% for notice in notices %}{{ notice.title }}{% endfor %}"
+
+    def setUp(self):
+        Notice.objects.create(title="Guarded notice", message="Body")
+
+    @override_settings(TEMPLATE_QUERY_GUARD="raise")
+    def test_queryset_evaluated_in_template_raises(self):
+        template = engines["django"].from_string(self.template)
+        with self.assertRaisesMessage(TemplateQueryError, "<unknown source>:1"):
+            template.render({"notices": Notice.objects.all()})
+        self.assertEqual(template.render({"notices": list(Notice.objects.all())}), "Guarded notice")
+
+    @override_settings(TEMPLATE_QUERY_GUARD="warn")
+    def test_warn_mode_logs_and_renders(self):
+        template = engines["django"].from_string(self.template)
+        with self.assertLogs("app.template_guard", "WARNING"):
+            self.assertEqual(template.render({"notices": Notice.objects.all()}), "Guarded notice")
+
+
+# --------------------------------------------------------------------
+# REST API
+# --------------------------------------------------------------------
+
+
+class RestAPITests(TestCase):
+    """The v1 API paginates by cursor, prunes fields and loads relations in bulk"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(name="API Course", duration=4, duration_type="Year")
+        cls.course.batches.add(Batch.objects.create(name="API Batch"))
+        Subject.objects.create(name="API Subject", course=cls.course, period_or_year=1)
+        cls.hod = Staff.objects.create(
+            name="API HOD", phone="9770000000", gender="Male", designation="HOD", course=cls.course
+        )
+        cls.hod.groups.add(Group.objects.get(name="HOD"))
+        cls.students = Student.objects.bulk_create([
+            Student(
+                name=f"API Student {index}", phone=f"9780{index:06d}", gender="Male",
+                course=cls.course, status="Active",
+            )
+            for index in range(6)
+        ])
+        cls.teacher = Staff.objects.create(
+            name="API Teacher", phone="9770000001", gender="Female", designation="Teacher"
+        )
+        cls.teacher.groups.add(Group.objects.get(name="Teacher"))
+
+    def get(self, name, user=None, **params):
+        self.client.force_login(user or self.hod, backend="app.backends.MultiModelBackend")
+        return self.client.get(reverse(name, kwargs={"version": "v1"}), params, secure=True)
+
+    def count_list_queries(self, **params):
+        self.get("student-list")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get("student-list", **params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_sparse_fieldset(self):
+        response = self.get("student-list", fields="id,name,course.name")
+        self.assertEqual(response.json()["results"][0], {
+            "id": self.students[-1].id, "name": "API Student 5", "course": {"name": "API Course"},
+        })
+        self.assertLess(self.count_list_queries(fields="id,name"), self.count_list_queries())
+        self.assertEqual(self.get("student-list", fields="id,grade").status_code, 400)
+
+    def test_queries_do_not_grow_with_rows(self):
+        self.assertEqual(self.count_list_queries(page_size=2), self.count_list_queries(page_size=6))
+
+    def test_cursor_pagination(self):
+        first = self.get("student-list", page_size=4).json()
+        second = self.client.get(first["next"], secure=True).json()
+        names = [row["name"] for row in first["results"] + second["results"]]
+        self.assertEqual(names, [f"API Student {index}" for index in range(5, -1, -1)])
+        self.assertIsNone(second["next"])
+
+    def test_writes_require_model_permissions(self):
+        url = reverse("notice-list", kwargs={"version": "v1"})
+        self.client.force_login(self.teacher, backend="app.backends.MultiModelBackend")
+        self.assertEqual(self.client.post(url, {"title": "T", "message": "M"}, secure=True).status_code, 403)
+        self.client.force_login(self.hod, backend="app.backends.MultiModelBackend")
+        response = self.client.post(url, {"title": "API notice", "message": "Body"}, secure=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Notice.objects.filter(title="API notice").exists())
+
+    def test_unknown_version_is_not_found(self):
+        self.client.force_login(self.hod, backend="app.backends.MultiModelBackend")
+        self.assertEqual(self.client.get("/api/v2/students/", secure=True).status_code, 404)
+
+
+# --------------------------------------------------------------------
+# Conditional JSON Responses
+# --------------------------------------------------------------------
+
+
+class ConditionalResponseTests(TestCase):
+    """Dropdown endpoints answer 304 from version counters until their rows change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(name="Conditional Course", duration=4, duration_type="Year")
+        cls.officer = Staff.objects.create(
+            name="Conditional Officer", phone="9790000000", gender="Male", designation="Admission Officer"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_login(self.officer, backend="app.backends.MultiModelBackend")
+        self.url = reverse("get_courses")
+
+    def test_matching_etag_is_answered_without_the_view(self):
+        response = self.client.get(self.url, secure=True)
+        self.assertContains(response, "Conditional Course")
+        self.assertIn("private", response["Cache-Control"])
+
+        # Validators come from the cache, the session is read but not saved
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, secure=True, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_saving_a_row_changes_the_etag(self):
+        etag = self.client.get(self.url, secure=True)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.name = "Renamed Course"
+            self.course.save()
+        response = self.client.get(self.url, secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Renamed Course")
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url, secure=True)["Last-Modified"]
+        response = self.client.get(self.url, secure=True, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+# --------------------------------------------------------------------
+# Device Registry
+# --------------------------------------------------------------------
+
+
+class DeviceRegistryTests(TestCase):
+    """Devices are keyed by owner and resolve course recipients in one query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course, cls.other_course = [
+            Course.objects.create(name=name, duration=4, duration_type="Year")
+            for name in ("Device Course", "Other Device Course")
+        ]
+        cls.student, cls.other_student = Student.objects.bulk_create([
+            Student(
+                name=f"Device Student {index}", phone=f"9800{index:06d}", course=course,
+                gender="Male", birth_date=timezone.now().date() - timedelta(days=6000),
+            )
+            for index, course in enumerate((cls.course, cls.other_course))
+        ])
+        cls.parent = Parent.objects.create(name="Device Parent", phone="9810000000")
+        cls.parent.students.add(cls.student)
+        cls.teacher = Staff.objects.create(
+            name="Device Teacher", phone="9820000000", gender="Male",
+            designation="Teacher", course=cls.course,
+        )
+
+    def test_registration_records_owner_without_group_queries(self):
+        self.client.force_login(self.parent, backend="app.backends.MultiModelBackend")
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(
+                reverse("saveFCMToken"), json.dumps({"token": "parent-phone"}),
+                content_type="application/json", secure=True,
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in captured if "groups" in query["sql"]])
+
+        device = FCMDevice.objects.get(token="parent-phone")
+        self.assertEqual((device.owner_model, device.owner_id), ("app.parent", self.parent.pk))
+        self.assertEqual(device.role, "parent")
+        self.assertIsNone(device.course_id)
+
+    def test_owner_keeps_several_devices(self):
+        register_device("teacher-phone", self.teacher)
+        register_device("teacher-laptop", self.teacher)
+        device = FCMDevice.objects.get(token="teacher-laptop")
+        self.assertEqual((device.role, device.course_id), ("teacher", self.course.id))
+        self.assertEqual(self.teacher.get_notification_tokens(), {"teacher-phone", "teacher-laptop"})
+
+    def test_course_event_resolves_in_one_query(self):
+        register_device("student-phone", self.student)
+        register_device("other-student-phone", self.other_student)
+        register_device("parent-phone", self.parent)
+        register_device("teacher-phone", self.teacher)
+
+        with self.assertNumQueries(1):
+            tokens = resolve_event_tokens(NotificationEvent(course=self.course))
+        self.assertEqual(tokens, {"student-phone", "parent-phone"})
+
+        with self.assertNumQueries(1):
+            tokens = resolve_event_tokens(NotificationEvent())
+        self.assertEqual(len(tokens), 4)
+
+    def test_course_change_moves_devices(self):
+        register_device("student-phone", self.student)
+        self.student.course = self.other_course
+        self.student.save()
+        self.assertEqual(FCMDevice.objects.get(token="student-phone").course_id, self.other_course.id)
+
+    def test_deleting_owner_removes_devices(self):
+        register_device("parent-phone", self.parent)
+        self.parent.delete()
+        self.assertFalse(FCMDevice.objects.filter(token="parent-phone").exists())
+
+
+# --------------------------------------------------------------------
+# Firebase Quota
+# --------------------------------------------------------------------
+
+
+class TokenBucketTests(TestCase):
+    """The Firebase quota is a token bucket shared through the cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_bucket_starts_full_and_runs_dry(self):
+        bucket = TokenBucket("test", rate=0.001, capacity=5)
+        self.assertEqual(sum(bucket.acquire() for _ in range(8)), 5)
+        self.assertEqual(bucket.utilisation()["utilisation"], 1)
+
+    def test_processes_share_the_bucket(self):
+        first, second = [TokenBucket("test", rate=0.001, capacity=5) for _ in range(2)]
+        self.assertTrue(first.acquire(3))
+        self.assertTrue(second.acquire(2))
+        self.assertFalse(first.acquire())
+        self.assertFalse(second.acquire())
+
+    def test_permits_are_taken_in_batches(self):
+        bucket = TokenBucket("test", rate=0.001, capacity=50, batch=10)
+        bucket.acquire()
+        with mock.patch.object(bucket, "_take", wraps=bucket._take) as take:
+            for _ in range(9):
+                self.assertTrue(bucket.acquire())
+        take.assert_not_called()
+        self.assertEqual(bucket.utilisation()["available"], 40)
+
+    def test_bucket_refills_up_to_capacity(self):
+        bucket = TokenBucket("test", rate=1, capacity=2)
+        with mock.patch("app.quota.time") as clock:
+            clock.time.return_value = clock.monotonic.return_value = 1000
+            self.assertTrue(bucket.acquire(2))
+            self.assertFalse(bucket.acquire())
+
+            clock.time.return_value = clock.monotonic.return_value = 1002
+            self.assertTrue(bucket.acquire(2))
+
+            # An idle bucket never holds more than its capacity
+            clock.time.return_value = clock.monotonic.return_value = 2000
+            self.assertEqual(bucket.utilisation()["available"], 2)
+            self.assertEqual(sum(bucket.acquire() for _ in range(4)), 2)
+
+    def test_file_cache_fallback(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory}
+        }):
+            bucket = TokenBucket("test", rate=0.001, capacity=3)
+            self.assertEqual(sum(bucket.acquire() for _ in range(5)), 3)
+            self.assertEqual(bucket.utilisation()["available"], 0)
+
+    def test_batches_over_quota_are_deferred(self):
+        tokens = [f"quota-{index}" for index in range(4)]
+        FCMDevice.objects.bulk_create([FCMDevice(token=token) for token in tokens])
+        with mock.patch("app.firebase.FCM_MULTICAST_LIMIT", 2), mock.patch(
+            "app.firebase.fcm_quota", TokenBucket("test", rate=0.001, capacity=1)
+        ):
+            success, failure, failed_tokens, deferred_tokens = send_push_notification(
+                "Title", "Message", tokens, client=FakeMessaging(latency=0)
+            )
+        self.assertEqual((success, failure, failed_tokens, len(deferred_tokens)), (2, 0, [], 2))
+
+    def test_deferred_deliveries_keep_their_attempts(self):
+        FCMDevice.objects.bulk_create([FCMDevice(token=f"quota-{index}") for index in range(4)])
+        event = NotificationEvent.objects.create(key="quota", title="Title", message="Message")
+        NotificationDelivery.objects.bulk_create([
+            NotificationDelivery(event=event, token=f"quota-{index}", attempts=2) for index in range(4)
+        ])
+        send = functools.partial(send_push_notification, client=FakeMessaging(latency=0))
+        with mock.patch("app.notifications.send_push_notification", send), mock.patch(
+            "app.firebase.FCM_MULTICAST_LIMIT", 2
+        ), mock.patch("app.firebase.fcm_quota", TokenBucket("test", rate=0.001, capacity=1)):
+            deliver_due()
+
+        deliveries = NotificationDelivery.objects.order_by("token")
+        self.assertEqual(sorted(delivery.status for delivery in deliveries), ["pending", "pending", "sent", "sent"])
+        deferred = [delivery for delivery in deliveries if delivery.status == "pending"]
+        for delivery in deferred:
+            self.assertEqual(delivery.attempts, 2)
+            self.assertGreater(delivery.next_attempt_at, timezone.now())
+            self.assertIn("quota", delivery.last_error)
+
+
+# --------------------------------------------------------------------
+# Notification Outbox
+# --------------------------------------------------------------------
+
+
+class FailingMessaging(FakeMessaging):
+    """Messaging stand-in whose every multicast request errors"""
+
+    def send_each_for_multicast(self, multicast_message, dry_run=False, app=None):
+        self.calls += 1
+        raise RuntimeError("FCM unreachable")
+
+
+class NotificationOutboxTests(TestCase):
+    """Queued notifications are claimed, sent, retried with backoff and given up on"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        FCMDevice.objects.bulk_create([FCMDevice(token="phone"), FCMDevice(token="dead-phone")])
+        self.event = enqueue_notification("outbox", "Title", "Message")
+
+    def deliver(self, client=None):
+        send = functools.partial(send_push_notification, client=client or FakeMessaging(latency=0))
+        with mock.patch("app.notifications.send_push_notification", send):
+            return deliver_due()
+
+    def make_due(self):
+        NotificationDelivery.objects.update(next_attempt_at=timezone.now())
+
+    def test_same_key_is_enqueued_once(self):
+        event = enqueue_notification("outbox", "Other title", "Other message")
+        self.assertEqual(event, self.event)
+        self.assertEqual(NotificationEvent.objects.count(), 1)
+        self.assertEqual(event.title, "Title")
+
+    def test_retry_delay_doubles_up_to_the_maximum(self):
+        self.assertEqual([retry_delay(attempts) for attempts in (1, 2, 3)], [60, 120, 240])
+        self.assertEqual(retry_delay(20), 3600)
+
+    def test_dead_tokens_are_retried_then_failed_as_inactive(self):
+        self.assertEqual(dispatch_event(self.event), 2)
+        self.assertEqual(self.deliver(), (1, 1))
+
+        sent = NotificationDelivery.objects.get(token="phone")
+        self.assertEqual((sent.status, sent.attempts), ("sent", 1))
+        dead = NotificationDelivery.objects.get(token="dead-phone")
+        self.assertEqual((dead.status, dead.attempts), ("pending", 1))
+        self.assertFalse(FCMDevice.objects.get(token="dead-phone").is_active)
+
+        # Not due until the backoff passes
+        self.assertEqual(self.deliver(), (0, 0))
+        self.make_due()
+        self.assertEqual(self.deliver(), (0, 1))
+        dead.refresh_from_db()
+        self.assertEqual((dead.status, dead.last_error), ("failed", "No active device for this token"))
+
+    def test_errors_back_off_and_fail_after_max_attempts(self):
+        dispatch_event(self.event)
+        NotificationDelivery.objects.filter(token="dead-phone").delete()
+        delivery = NotificationDelivery.objects.get()
+
+        for attempts in range(1, settings.MAX_ATTEMPTS):
+            started = timezone.now()
+            self.assertEqual(self.deliver(FailingMessaging()), (0, 1))
+            delivery.refresh_from_db()
+            self.assertEqual((delivery.status, delivery.attempts), ("pending", attempts))
+            self.assertGreaterEqual(delivery.next_attempt_at, started + timedelta(seconds=retry_delay(attempts)))
+            self.make_due()
+
+        self.deliver(FailingMessaging())
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.status, delivery.attempts), ("failed", settings.MAX_ATTEMPTS))
+
+    def test_claimed_deliveries_are_leased(self):
+        dispatch_event(self.event)
+        due_while_sending = []
+
+        def send(title, message, tokens):
+            due_while_sending.append(
+                NotificationDelivery.objects.filter(status="pending", next_attempt_at__lte=timezone.now()).count()
+            )
+            return send_push_notification(title, message, tokens, client=FakeMessaging(latency=0))
+
+        started = timezone.now()
+        with mock.patch("app.notifications.send_push_notification", send):
+            deliver_due()
+        self.assertEqual(due_while_sending, [0])
+
+        # Only the retried delivery is left, its backoff replaced the lease
+        dead = NotificationDelivery.objects.get(token="dead-phone")
+        self.assertLess(dead.next_attempt_at, started + timedelta(seconds=CLAIM_LEASE))
+
+    def test_process_event_dispatches_and_delivers(self):
+        with mock.patch("app.notifications.send_push_notification", functools.partial(
+            send_push_notification, client=FakeMessaging(latency=0)
+        )):
+            process_event(self.event.id)
 
-# Create your tests here.
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.status, "dispatched")
+        self.assertEqual(NotificationDelivery.objects.get(token="phone").status, "sent")
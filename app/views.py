@@ -36,7 +36,8 @@ from app.admin import custom_admin_site
 import os
 from django.db.models.base import transaction
 from dotenv import load_dotenv
-from app.firebase import save_fcm_token, FCMDevice
+from app.conditional import versioned_response
+from app.firebase import register_device
 from django.views.static import serve
 from app.utils import (
     handle_file_upload,
@@ -319,6 +320,7 @@ def change_password(request):
 
 @login_required
 @require_GET
+@versioned_response("subjects")
 def get_subjects(request):
     """Get subjects for a course."""
     try:
@@ -336,6 +338,7 @@ def get_subjects(request):
 
 @login_required
 @require_GET
+@versioned_response("routines")
 def get_teachers(request):
     """Get teachers for a subject."""
     try:
@@ -354,6 +357,7 @@ def get_teachers(request):
 
 @login_required
 @require_GET
+@versioned_response("courses")
 def get_course_duration(request):
     """Get course duration information."""
     try:
@@ -508,7 +512,7 @@ def delete_notice(request, notice_id):
 @require_POST
 @csrf_exempt
 def save_fcm_token(request):
-    """Save FCM token to database"""
+    """Register the FCM token of this browser in the device registry"""
     try:
         # Get token from request body
         data = json.loads(request.body)
@@ -517,32 +521,8 @@ def save_fcm_token(request):
         if not token:
             return JsonResponse({"error": "Token is required"}, status=400)
             
-        # Check if this is a fallback token
-        is_fallback = token.startswith("fcm-token-") or token.startswith("fallback-token-")
-        
-        # Determine user type if a user is authenticated
-        user_type = "unknown"
-        if request.user.is_authenticated:
-            user_groups = request.user.groups.values_list("name", flat=True)
-            if "Student" in user_groups:
-                user_type = "student"
-            elif "Parent" in user_groups:
-                user_type = "parent"
-            elif "Teacher" in user_groups:
-                user_type = "teacher"
-            elif request.user.is_superuser:
-                user_type = "admin"
-        
-        # Use update_or_create to avoid unnecessary deletes
-        device, created = FCMDevice.objects.update_or_create(
-            token=token,
-            defaults={
-                "is_fallback": is_fallback,
-                "is_active": True,
-                "user_type": user_type,
-            },
-        )
-        
+        register_device(token, request.user)
+
         return JsonResponse({"status": "success"})
         
     except json.JSONDecodeError:
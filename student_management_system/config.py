@@ -46,6 +46,8 @@ class DatabaseConfig(BaseModel):
     port: Optional[int] = None
     user: Optional[str] = None
     password: Optional[str] = None
+    # Read replica hosts, or database file names when using SQLite
+    replicas: list[str] = Field(default_factory=list)
 
     @model_validator(mode="before")
     @classmethod
@@ -158,6 +160,11 @@ def get_config() -> Config:
                 port=os.getenv("DB_PORT"),
                 user=os.getenv("DB_USER"),
                 password=os.getenv("DB_PASSWORD"),
+                replicas=[
+                    replica.strip()
+                    for replica in os.getenv("DB_REPLICAS", "").split(",")
+                    if replica.strip()
+                ],
             ),
             cache=CacheConfig(
                 use_redis=os.getenv("USE_REDIS_CACHE", "False").lower() == "true",
@@ -244,6 +251,43 @@ def get_config() -> Config:
         raise
 
 
+def get_database_settings(config: Config) -> Dict[str, Any]:
+    """
+    Build the DATABASES setting with one ``replica_<n>`` alias per replica.
+
+    Replicas share the primary's engine and credentials. Each replica entry
+    replaces the host, or the database file name when using SQLite. In tests
+    the replicas mirror the primary so fixtures are visible to every alias.
+
+    Args:
+        config: The validated configuration object.
+
+    Returns:
+        Dict[str, Any]: Database aliases and their settings.
+    """
+    primary = {
+        "ENGINE": config.database.engine,
+        "NAME": config.database.name,
+        "HOST": config.database.host,
+        "PORT": config.database.port,
+        "USER": config.database.user,
+        "PASSWORD": config.database.password,
+        "OPTIONS": {
+            "timeout": config.database.timeout,
+        },
+    }
+    databases = {"default": primary}
+
+    replica_field = "NAME" if config.database.engine.endswith("sqlite3") else "HOST"
+    for index, replica in enumerate(config.database.replicas, start=1):
+        databases[f"replica_{index}"] = {
+            **primary,
+            replica_field: replica,
+            "TEST": {"MIRROR": "default"},
+        }
+    return databases
+
+
 def get_django_settings() -> Dict[str, Any]:
     """
     Convert the configuration to Django settings format.
@@ -257,19 +301,7 @@ def get_django_settings() -> Dict[str, Any]:
         "DEBUG": config.debug,
         "SECRET_KEY": config.secret_key,
         "ALLOWED_HOSTS": config.allowed_hosts,
-        "DATABASES": {
-            "default": {
-                "ENGINE": config.database.engine,
-                "NAME": config.database.name,
-                "HOST": config.database.host,
-                "PORT": config.database.port,
-                "USER": config.database.user,
-                "PASSWORD": config.database.password,
-                "OPTIONS": {
-                    "timeout": config.database.timeout,
-                },
-            }
-        },
+        "DATABASES": get_database_settings(config),
         "CACHES": {
             "default": {
                 "BACKEND": "django.core.cache.backends.redis.RedisCache"
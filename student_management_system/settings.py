@@ -48,17 +48,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "app.middleware.QueryProfilerMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
-    "django.middleware.cache.UpdateCacheMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "app.middleware.SessionMiddleware",
+    "app.middleware.PrimaryPinningMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
+    "app.middleware.SessionUserModelMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "app.middleware.HTTP505Middleware",
-    "django.middleware.cache.FetchFromCacheMiddleware",
 ]
 
 AUTHENTICATION_BACKENDS = [
@@ -71,13 +72,17 @@ REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
         "rest_framework.renderers.JSONRenderer",
     ],
+    # REST API under /api/<version>/ (see app/api.py)
+    "DEFAULT_VERSIONING_CLASS": "rest_framework.versioning.URLPathVersioning",
+    "ALLOWED_VERSIONS": ["v1"],
 }
 
 ROOT_URLCONF = "student_management_system.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "app.template_guard.QueryGuardedTemplates",
+        "NAME": "django",
         "DIRS": [os.path.join(BASE_DIR, "templates")],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -86,6 +91,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "app.context_processors.branding",
             ],
         },
     },
@@ -99,8 +105,11 @@ WSGI_APPLICATION = "student_management_system.wsgi.application"
 
 DATABASES = config["DATABASES"]
 
-# Database optimization settings
+# Read replicas (DB_REPLICAS), reads are spread across them by the router
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
 DATABASE_ROUTERS = ['app.routers.DatabaseRouter']
+# Seconds a client keeps reading from the primary after it writes
+REPLICA_PIN_SECONDS = 5
 
 # Query optimization
 DATABASE_OPTIMIZATION = {
@@ -193,10 +202,9 @@ EMAIL_USE_TLS = config["EMAIL_USE_TLS"]
 # Cache configuration
 CACHES = config["CACHES"]
 
-# Cache settings
-CACHE_MIDDLEWARE_ALIAS = 'default'
-CACHE_MIDDLEWARE_SECONDS = 300
-CACHE_MIDDLEWARE_KEY_PREFIX = 'sms'
+# Template fragment cache (see app/fragment_cache.py), fragments are also
+# expired by signals whenever the rows they render change
+FRAGMENT_CACHE_TIMEOUT = 900  # 15 minutes, bounds "x ago" timestamps
 
 # SMS API configuration
 SMS_API_KEY = config["SMS_API_KEY"]
@@ -246,7 +254,9 @@ SECURE_HSTS_PRELOAD = True
 
 # Session settings
 SESSION_COOKIE_AGE = 3600  # 1 hour
-SESSION_SAVE_EVERY_REQUEST = True
+# Seconds a loaded request.user is kept in the cache, 0 disables the cache
+SESSION_USER_CACHE_TTL = int(os.getenv("SESSION_USER_CACHE_TTL", "0"))
+SESSION_SAVE_EVERY_REQUEST = True  # Except 304 responses, see app.middleware.SessionMiddleware
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
 # CSRF settings
@@ -258,7 +268,25 @@ CSRF_USE_SESSIONS = True
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Strict'
 
-# Background Tasks Configuration
-BACKGROUND_TASK_RUN_ASYNC = True
+# Background Tasks Configuration (notification outbox, see `manage.py process_notifications`)
+BACKGROUND_TASK_RUN_ASYNC = True  # False sends queued notifications right after commit
 MAX_ATTEMPTS = 3  # Maximum number of retries for failed tasks
 MAX_RUN_TIME = 3600  # Maximum time a task can run (in seconds)
+
+# Push notifications
+# Number of FCM multicast batches (500 tokens each) sent concurrently
+FCM_DELIVERY_WORKERS = 4
+# Firebase send requests per minute across all processes (see app/quota.py),
+# each process takes FCM_QUOTA_BATCH permits per cache round trip
+FCM_QUOTA_PER_MINUTE = 500
+FCM_QUOTA_BATCH = 10
+
+# Query profiler (see `manage.py query_profile` and /query-profile/ in the admin)
+# Records queries, SQL time, duplicate queries and cache hits per view
+QUERY_PROFILER_ENABLED = os.getenv("QUERY_PROFILER_ENABLED", "False").lower() == "true"
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "30"))  # Requests above this are logged
+QUERY_PROFILER_FLUSH_EVERY = 50  # Requests between publishing samples to the cache
+
+# Template query guard (see app/template_guard.py), flags SQL run while a
+# template renders: "off", "warn" (log each query) or "raise"
+TEMPLATE_QUERY_GUARD = os.getenv("TEMPLATE_QUERY_GUARD", "warn" if DEBUG else "off")
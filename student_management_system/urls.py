@@ -24,6 +24,7 @@ from app.admin import custom_admin_site
 from django.views.generic import RedirectView, TemplateView
 from app import views
 from app import auth
+from app.api import router as api_router
 
 # Main URL patterns for the project
 urlpatterns = [
@@ -37,6 +38,8 @@ urlpatterns = [
     path("logout/", auth_views.LogoutView.as_view(next_page="/login/"), name="logout"),
     # Password Management --------------------------------------------
     path("password-reset/", auth.reset_password_options, name="password_reset"),
+    # REST API -------------------------------------------------------
+    path("api/<str:version>/", include(api_router.urls)),
     # Firebase Service -----------------------------------------------
     path("firebase-messaging-sw.js", views.serve_firebase_sw),
 ]